@@ -0,0 +1,94 @@
+"""
+Management command to benchmark cohort activation (start_mock).
+
+For each cohort size it seeds a variant with that many waiting students, calls
+the real ``start_mock`` view and reports its query count and wall time next to
+the previous per-student activation loop. All rows are rolled back.
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from exams.views import start_mock
+from student_portal.benchmarking import auth_header, measure, rolled_back, seed_cohort
+from student_portal.models import StudentTest, TestQueue
+
+
+def per_student_activation(variant):
+    """The activation loop start_mock used before it became set-based."""
+    waiting_students = TestQueue.objects.filter(
+        test_code=variant.code,
+        status='waiting'
+    ).select_related('student')
+
+    now = timezone.now()
+    for queue_entry in waiting_students:
+        StudentTest.objects.get_or_create(
+            student=queue_entry.student,
+            variant=variant,
+            defaults={'status': 'in_progress'}
+        )
+        queue_entry.assigned_variant = variant
+        queue_entry.status = 'assigned'
+        queue_entry.assigned_at = now
+        queue_entry.save(update_fields=['assigned_variant', 'status', 'assigned_at'])
+
+    TestQueue.objects.filter(test_code=variant.code, status='assigned').update(
+        status='preparation',
+        preparation_started_at=timezone.now()
+    )
+
+
+class Command(BaseCommand):
+    help = 'Benchmark start_mock activation for several queued cohort sizes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default='50,500,5000',
+            help='Comma-separated cohort sizes (default: 50,500,5000)'
+        )
+        parser.add_argument(
+            '--skip-legacy',
+            action='store_true',
+            help='Do not time the previous per-student loop (slow for large cohorts)'
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        factory = APIRequestFactory()
+
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(self.style.SUCCESS('start_mock activation benchmark'))
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(f'{"students":>10} {"queries":>10} {"ms":>10} {"legacy queries":>16} {"legacy ms":>12}')
+
+        for size in sizes:
+            with rolled_back():
+                variant, students, admin = seed_cohort(size)
+                request = factory.post(
+                    f'/api/admin/tests/{variant.id}/start-mock',
+                    **auth_header(admin)
+                )
+                result = measure(start_mock, request, variant_id=variant.id)
+                prepared = TestQueue.objects.filter(
+                    test_code=variant.code, status='preparation'
+                ).count()
+                if prepared != size:
+                    self.stdout.write(self.style.ERROR(
+                        f'Expected {size} entries in preparation, found {prepared}'
+                    ))
+
+            legacy_queries, legacy_ms = '-', '-'
+            if not options['skip_legacy']:
+                with rolled_back():
+                    variant, students, admin = seed_cohort(size, with_admin=False)
+                    legacy = measure(per_student_activation, variant)
+                    legacy_queries, legacy_ms = legacy.queries, f'{legacy.elapsed_ms:.1f}'
+
+            self.stdout.write(
+                f'{size:>10} {result.queries:>10} {result.elapsed_ms:>10.1f} '
+                f'{legacy_queries:>16} {legacy_ms:>12}'
+            )
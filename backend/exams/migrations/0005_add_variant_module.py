@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0004_mocktest_studenttestsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='variant',
+            name='module',
+            field=models.CharField(choices=[('academic', 'Academic'), ('general_training', 'General Training')], default='academic', help_text='IELTS module; selects the Reading band conversion table', max_length=20),
+        ),
+    ]
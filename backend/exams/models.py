@@ -16,6 +16,11 @@ def generate_variant_code():
 class Variant(models.Model):
     """Test variant model."""
     
+    MODULE_CHOICES = [
+        ('academic', 'Academic'),
+        ('general_training', 'General Training'),
+    ]
+    
     name = models.CharField(max_length=200, help_text='Variant name')
     code = models.CharField(
         max_length=6,
@@ -36,6 +41,12 @@ class Variant(models.Model):
         related_name='created_variants'
     )
     is_active = models.BooleanField(default=True)
+    module = models.CharField(
+        max_length=20,
+        choices=MODULE_CHOICES,
+        default='academic',
+        help_text='IELTS module; selects the Reading band conversion table'
+    )
     
     class Meta:
         db_table = 'variant'
@@ -29,7 +29,7 @@ class VariantSerializer(serializers.ModelSerializer):
         model = Variant
         fields = (
             'id', 'name', 'code', 'duration_minutes', 'created_at', 
-            'updated_at', 'created_by', 'is_active', 'test_files', 'answers'
+            'updated_at', 'created_by', 'is_active', 'module', 'test_files', 'answers'
         )
         read_only_fields = ('id', 'code', 'created_at', 'updated_at')
 
@@ -39,7 +39,7 @@ class VariantListSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Variant
-        fields = ('id', 'name', 'code', 'duration_minutes', 'created_at', 'is_active')
+        fields = ('id', 'name', 'code', 'duration_minutes', 'created_at', 'is_active', 'module')
         read_only_fields = ('id', 'code', 'created_at')
 
 
@@ -48,7 +48,7 @@ class VariantCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Variant
-        fields = ('name', 'duration_minutes', 'is_active')
+        fields = ('name', 'duration_minutes', 'is_active', 'module')
 
 
 class MockTestSerializer(serializers.ModelSerializer):
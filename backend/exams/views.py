@@ -4,6 +4,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.db import transaction
 from accounts.models import CustomUser
 from .models import Variant, TestFile, Answer, MockTest, StudentTestSession
 from .serializers import (
@@ -253,6 +254,14 @@ def get_stats(request):
         )
     
     from student_portal.models import StudentTest, TestResult
+    from student_portal.queue_sweeper import get_last_sweep
+    from student_portal.auto_submit import get_last_auto_submit
+    from student_portal.autosave_buffer import get_buffer_stats
+    from grading.jobs import get_queue_stats
+    from grading.grading_cache import get_cache_stats
+    from grading.providers import client_stats
+    from grading.router import get_router
+    from grading.usage import get_usage_summary
     from accounts.models import CustomUser
     
     total_variants = Variant.objects.count()
@@ -264,6 +273,14 @@ def get_stats(request):
         'total_students': total_students,
         'total_variants': total_variants,
         'total_mock_tests_taken': total_mock_tests_taken,
+        'last_queue_sweep': get_last_sweep(),
+        'last_auto_submit': get_last_auto_submit(),
+        'autosave_buffer': get_buffer_stats(),
+        'grading_queue': get_queue_stats(),
+        'ai_grading_cache': get_cache_stats(),
+        'ai_providers': client_stats(),
+        'ai_router': get_router().stats(),
+        'ai_usage': get_usage_summary(days=1)['totals'],
     })
 
 
@@ -294,7 +311,17 @@ def generate_code(request, variant_id):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def start_mock(request, variant_id):
-    """Activate a variant and assign variants to waiting students."""
+    """
+    Activate a variant and move every waiting student straight to preparation.
+
+    Activation is set-based so its cost does not grow with the cohort. After
+    loading and saving the variant it runs, in one transaction:
+      1. one SELECT of the waiting student ids,
+      2. one bulk INSERT of the missing StudentTest rows (existing attempts are
+         left untouched; SQLite splits it into ~166-row chunks because of its
+         999 parameter limit, PostgreSQL sends a single statement),
+      3. one UPDATE of the queue entries to preparation.
+    """
     if not check_is_admin(request.user):
         return Response(
             {'error': 'Admin access required.'},
@@ -302,46 +329,42 @@ def start_mock(request, variant_id):
         )
     
     variant = get_object_or_404(Variant, id=variant_id)
+    # Committed before activation so students joining from now on are
+    # assigned directly by enter_test_code.
     variant.is_active = True
     variant.save()
     
     # Import here to avoid circular imports
     from student_portal.models import TestQueue, StudentTest
-    
-    # Get all waiting students for this test code
-    waiting_students = TestQueue.objects.filter(
-        test_code=variant.code,
-        status='waiting'
-    ).select_related('student')
-    
-    assigned_count = 0
-    now = timezone.now()
-    for queue_entry in waiting_students:
-        StudentTest.objects.get_or_create(
-            student=queue_entry.student,
-            variant=variant,
-            defaults={'status': 'in_progress'}
+    from student_portal.queue_events import notify_queue_change
+    
+    with transaction.atomic():
+        # Get all waiting students for this test code ('assigned' only exists
+        # on rows left behind by the old per-student activation)
+        pending_entries = TestQueue.objects.filter(
+            test_code=variant.code,
+            status__in=['waiting', 'assigned']
         )
+        student_ids = list(pending_entries.values_list('student_id', flat=True))
         
-        queue_entry.assigned_variant = variant
-        queue_entry.status = 'assigned'
-        queue_entry.assigned_at = now
-        queue_entry.save(
-            update_fields=['assigned_variant', 'status', 'assigned_at']
+        StudentTest.objects.bulk_create(
+            [
+                StudentTest(student_id=student_id, variant=variant, status='in_progress')
+                for student_id in student_ids
+            ],
+            ignore_conflicts=True
         )
         
-        assigned_count += 1
-    
-    assigned_entries = TestQueue.objects.filter(
-        test_code=variant.code,
-        status='assigned'
-    )
-    
-    prep_started_at = timezone.now()
-    assigned_entries.update(
-        status='preparation',
-        preparation_started_at=prep_started_at
-    )
+        # Restricted to the ids read above so every moved row has its
+        # StudentTest and is notified; later joiners self-assign.
+        now = timezone.now()
+        assigned_count = pending_entries.filter(student_id__in=student_ids).update(
+            assigned_variant=variant,
+            status='preparation',
+            assigned_at=now,
+            preparation_started_at=now
+        )
+        notify_queue_change(student_ids)
     
     return Response({
         'message': f'Mock test activated. {assigned_count} students assigned variants.',
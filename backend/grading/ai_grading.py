@@ -5,243 +5,528 @@ AI-powered Writing Grading using OpenAI API or similar services.
 import os
 import json
 from decimal import Decimal
+from functools import partial
+
+from .providers import get_client
+from .router import AllProvidersFailed, get_router
+from .score_stream import ScoreStreamParser
+from .usage import (
+    Completion, anthropic_completion, anthropic_stream, gemini_completion, gemini_stream, openai_completion,
+    openai_stream, record_call, record_stream,
+)
+
+# Bump whenever the writing prompt changes, so cached grades are not reused.
+WRITING_PROMPT_VERSION = 3
+
+# Upper bound of a writing assessment; the instructions ask for about 600 words.
+WRITING_MAX_TOKENS = 2000
+
+# Model used by each provider, in the order providers are tried.
+WRITING_MODELS = {
+    'groq': 'llama-3.3-70b-versatile',
+    'gemini': 'gemini-2.0-flash',
+    'openai': 'gpt-4',
+    'anthropic': 'claude-3-5-sonnet-20241022',
+}
+
+PROVIDER_API_KEYS = {
+    'groq': 'GROQ_API_KEY',
+    'gemini': 'GOOGLE_API_KEY',
+    'openai': 'OPENAI_API_KEY',
+    'anthropic': 'ANTHROPIC_API_KEY',
+}
+
+
+# Examiner instructions per task. They are identical for every essay and sent
+# first, as the system message, so providers with prompt caching reuse them;
+# only the part from build_writing_prompt changes between students. The
+# scores come first in the answer, so a streamed answer has them early (see
+# score_stream).
+WRITING_INSTRUCTIONS = {
+    1: """You are an expert IELTS examiner. Assess the IELTS Writing Task 1 response in the user message against the official IELTS band descriptors. Be specific and concise: about 600 words in total.
+
+Start your answer with the scores, as a JSON block in exactly this format (bands 0-9 in steps of 0.5):
+```json
+{"task_achievement": 0.0, "coherence_cohesion": 0.0, "lexical_resource": 0.0, "grammatical_range": 0.0, "overall_score": 0.0, "feedback": "Short summary string"}
+```
 
-
-def grade_writing_task_ai(task_number: int, student_response: str, task_prompt: str = None) -> dict:
-    """
-    Grade a writing task using AI (OpenAI GPT-4, Claude, etc.).
-    
-    Args:
-        task_number: 1 or 2
-        student_response: Student's written response
-        task_prompt: The task prompt/question (optional, for context)
-        
-    Returns:
-        dict: Dictionary with band scores and breakdown
-    """
-    # Check if AI API key is configured (prioritize free Groq/Gemini API)
-    groq_api_key = os.getenv('GROQ_API_KEY')
-    google_api_key = os.getenv('GOOGLE_API_KEY')
-    openai_api_key = os.getenv('OPENAI_API_KEY')
-    anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
-    
-    if not any([groq_api_key, google_api_key, openai_api_key, anthropic_api_key]):
-        # Fallback: Return placeholder scores if AI is not configured
-        return {
-            'task_score': None,
-            'breakdown': {
-                'task_achievement': None,
-                'coherence_cohesion': None,
-                'lexical_resource': None,
-                'grammatical_range': None,
-            },
-            'feedback': 'AI grading not configured. Please set GOOGLE_API_KEY (free), OPENAI_API_KEY, or ANTHROPIC_API_KEY.',
-            'ai_used': False,
-        }
-    
-    # Count words in response
-    import re
-    plain_text = re.sub(r'<[^>]+>', ' ', student_response) if student_response else ''
-    word_count = len(plain_text.split())
-    
-    # Prepare comprehensive AI prompt based on task number
-    if task_number == 1:
-        prompt = f"""You are an expert IELTS examiner with 10+ years of experience. Evaluate this IELTS Writing Task 1 response according to official IELTS band descriptors.
-
-**Task Question:** {task_prompt or 'Not provided'}
-
-**Student's Answer:** {student_response}
-
-**Word Count:** {word_count}
-
----
-
-## Provide detailed assessment in this structure:
+Then give the assessment in markdown with these sections:
 
 ### 1. BAND SCORE BREAKDOWN
-- **Task Achievement:** X/9 
-- **Coherence and Cohesion:** X/9
-- **Lexical Resource:** X/9
-- **Grammatical Range and Accuracy:** X/9
-- **OVERALL BAND:** X/9
-
-### 2. TASK ACHIEVEMENT (Detailed Analysis)
-- Overview statement quality (present/absent/clear/vague)
-- Key features coverage (what's included, what's missing)
-- Data accuracy and relevance
-- Appropriate length and detail
+Task Achievement, Coherence and Cohesion, Lexical Resource, Grammatical Range and Accuracy and OVERALL BAND, each X/9
+
+### 2. TASK ACHIEVEMENT
+Overview (present/absent, clear/vague), key features covered or missing, data accuracy, length and detail
 
 ### 3. COHERENCE AND COHESION
-- Paragraph structure
-- Logical flow
-- Linking devices usage
+Paragraphing, logical flow, linking devices
 
 ### 4. LEXICAL RESOURCE
-- Vocabulary range and accuracy
-- Errors with corrections
+Range and accuracy; errors with corrections
 
 ### 5. GRAMMATICAL RANGE AND ACCURACY
-- Sentence structure variety
-- Grammar errors with corrections
+Sentence variety; errors with corrections
 
 ### 6. SPECIFIC RECOMMENDATIONS
-1. [Improvement 1]
-2. [Improvement 2]
+Two numbered improvements
 
 ### 7. MODEL SENTENCE IMPROVEMENTS
-**Original:** [Problem sentence]
-**Improved:** [Correction]
-**Explanation:** [Why]
-
----
+**Original:** / **Improved:** / **Explanation:** for problem sentences""",
+    2: """You are an expert IELTS examiner. Assess the IELTS Writing Task 2 response in the user message against the official IELTS band descriptors. Be specific and concise: about 600 words in total.
 
-IMPORTANT: Also respond with a JSON block at the end in this exact format:
+Start your answer with the scores, as a JSON block in exactly this format (bands 0-9 in steps of 0.5; task_achievement is the Task Response band):
 ```json
-{{
-    "task_achievement": 0.0,
-    "coherence_cohesion": 0.0,
-    "lexical_resource": 0.0,
-    "grammatical_range": 0.0,
-    "overall_score": 0.0,
-    "feedback": "Short summary string"
-}}
+{"task_achievement": 0.0, "coherence_cohesion": 0.0, "lexical_resource": 0.0, "grammatical_range": 0.0, "overall_score": 0.0, "feedback": "Short summary string"}
 ```
-"""
-    else:  # Task 2
-        prompt = f"""You are an expert IELTS examiner with 10+ years of experience. Evaluate this IELTS Writing Task 2 response according to official IELTS band descriptors.
-
-**Essay Question:** {task_prompt or 'Not provided'}
 
-**Student's Answer:** {student_response}
-
-**Word Count:** {word_count}
-
----
-
-## Provide detailed assessment in this structure:
+Then give the assessment in markdown with these sections:
 
 ### 1. BAND SCORE BREAKDOWN
-- **Task Response:** X/9
-- **Coherence and Cohesion:** X/9
-- **Lexical Resource:** X/9
-- **Grammatical Range and Accuracy:** X/9
-- **OVERALL BAND:** X/9
+Task Response, Coherence and Cohesion, Lexical Resource, Grammatical Range and Accuracy and OVERALL BAND, each X/9
 
-### 2. TASK RESPONSE (Detailed Analysis)
-- Position/opinion clarity
-- Ideas development and support
-- Conclusion effectiveness
+### 2. TASK RESPONSE
+Clarity of position, development and support of ideas, conclusion
 
 ### 3. COHERENCE AND COHESION
-- Essay Structure (Intro/Body/Conclusion)
-- Logical flow and linking
+Essay structure (introduction/body/conclusion), logical flow and linking
 
 ### 4. LEXICAL RESOURCE
-- Vocabulary sophistication and accuracy
-- Errors with corrections
+Sophistication and accuracy; errors with corrections
 
 ### 5. GRAMMATICAL RANGE AND ACCURACY
-- Complex structures usage
-- Grammar errors with corrections
+Complex structures; errors with corrections
 
 ### 6. PRIORITY IMPROVEMENTS
-1. [Improvement 1]
-2. [Improvement 2]
+Two numbered improvements
 
 ### 7. DETAILED SENTENCE CORRECTIONS
-**Original:** [Problem sentence]
-**Corrected:** [Better version]
-**Reason:** [Why]
+**Original:** / **Corrected:** / **Reason:** for problem sentences""",
+}
 
----
 
-IMPORTANT: Also respond with a JSON block at the end in this exact format:
-```json
-{{
-    "task_achievement": 0.0,
-    "coherence_cohesion": 0.0,
-    "lexical_resource": 0.0,
-    "grammatical_range": 0.0,
-    "overall_score": 0.0,
-    "feedback": "Short summary string"
-}}
-```
-"""
+def writing_providers():
+    """Return the providers with an API key set, in preference order."""
+    return [provider for provider in WRITING_MODELS if os.getenv(PROVIDER_API_KEYS[provider])]
+
+
+def grade_writing_task_ai(task_number: int, student_response: str, task_prompt: str = None,
+                          bypass_cache: bool = False) -> dict:
+    """
+    Grade a writing task using AI (OpenAI GPT-4, Claude, etc.).
     
-    print(f"DEBUG: Grading Task {task_number}, Length: {len(student_response) if student_response else 0}, Words: {word_count}")
+    The provider is chosen by the router (see router): fastest healthy
+    provider first, failing over to the next one on errors. Results are
+    cached (see grading_cache), so grading an identical response again with
+    the same prompt version, provider and model costs no LLM call.
+    
+    Args:
+        task_number: 1 or 2
+        student_response: Student's written response
+        task_prompt: The task prompt/question (optional, for context)
+        bypass_cache: Grade afresh even if a cached result exists
+        
+    Returns:
+        dict: Dictionary with band scores and breakdown
+    
+    Raises:
+        AllProvidersFailed: no configured provider returned a grade
+    """
+    providers = writing_providers()
+    if not providers:
+        return _grade_writing_task(task_number, student_response, task_prompt)
+    
+    from .grading_cache import cached_grading
+    return cached_grading(
+        'writing', _writing_cache_keys(providers, task_number, student_response, task_prompt),
+        lambda: _grade_writing_task(task_number, student_response, task_prompt),
+        bypass=bypass_cache
+    )
+
+
+def _writing_cache_keys(providers, task_number, student_response, task_prompt):
+    """Cache key and model per provider (see grading_cache.cached_grading)."""
+    from .grading_cache import cache_key
+    return {
+        provider: (
+            cache_key(
+                'writing', student_response,
+                prompt_version=WRITING_PROMPT_VERSION, provider=provider, model=WRITING_MODELS[provider],
+                task_number=task_number, task_prompt=task_prompt
+            ),
+            WRITING_MODELS[provider]
+        )
+        for provider in providers
+    }
+
+
+def stream_writing_grade(task_number: int, student_response: str, task_prompt: str = None,
+                         bypass_cache: bool = False):
+    """
+    Grade a writing task while streaming the answer.
+    
+    The instructions ask for the score JSON first, so the band scores are
+    known after the first hundred or so tokens; the detailed feedback then
+    follows as it is generated. Same providers, routing and cache as
+    grade_writing_task_ai: a cached result is replayed at once, and a fresh
+    one is stored, so a later grade_writing_task_ai of the same response is
+    a cache hit.
+    
+    Yields:
+        tuple: (event, payload), with event one of
+            'scores': task_score, breakdown, feedback, provider and model
+            'feedback': {'text': ...} next part of the detailed feedback
+            'result': the complete grading result (as grade_writing_task_ai)
+            'error': {'error': ...} grading failed; nothing follows
+    """
+    from .grading_cache import lookup, store
+    
+    providers = writing_providers()
+    if not providers:
+        result = _grade_writing_task(task_number, student_response, task_prompt)
+        yield from _replay(result)
+        return
     
+    keys = _writing_cache_keys(providers, task_number, student_response, task_prompt)
+    result = lookup(keys, bypass=bypass_cache)
+    if result is not None:
+        yield from _replay(result)
+        return
+    
+    instructions = WRITING_INSTRUCTIONS[task_number]
+    prompt = build_writing_prompt(task_number, student_response, task_prompt)
+    calls = {
+        provider: partial(
+            record_stream, 'writing', provider, WRITING_MODELS[provider], WRITING_PROMPT_VERSION,
+            partial(WRITING_STREAMS[provider], instructions, prompt)
+        )
+        for provider in providers
+    }
+    parser = ScoreStreamParser()
+    provider = None
     try:
-        # Try Groq first (Free and fast)
-        if os.getenv('GROQ_API_KEY'):
-            return grade_with_groq(prompt)
-        # Try Google Gemini second (Free tier available)
-        elif os.getenv('GOOGLE_API_KEY'):
-            return grade_with_gemini(prompt)
-        # Try OpenAI as third option
-        elif os.getenv('OPENAI_API_KEY'):
-            return grade_with_openai(prompt)
-        # Try Anthropic Claude as fourth option
-        elif os.getenv('ANTHROPIC_API_KEY'):
-            return grade_with_anthropic(prompt)
-        else:
-            # No AI configured, use fallback
-            return fallback_grading(task_number, student_response)
+        for provider, chunk in get_router().stream(calls):
+            scores, feedback = parser.feed(chunk)
+            if scores is not None:
+                yield 'scores', _scores_payload(_writing_scores(scores), provider)
+            if feedback:
+                yield 'feedback', {'text': feedback}
+    except AllProvidersFailed as e:
+        yield 'error', {'error': str(e)}
+        return
     except Exception as e:
-        print(f"AI grading error: {e}")
-        # Fallback scoring based on word count and basic analysis
-        return fallback_grading(task_number, student_response)
+        yield 'error', {'error': f'AI provider {provider} failed: {e}'}
+        return
+    
+    if parser.scores is None:
+        # Same as grade_with_provider's require_scores, but too late to fail over.
+        yield 'error', {'error': f'AI provider {provider} answered without band scores'}
+        return
+    
+    result = parse_writing_response(parser.text)
+    result['provider'] = provider
+    result['model'] = WRITING_MODELS[provider]
+    store('writing', keys, result)
+    yield 'result', result
 
 
-def grade_with_gemini(prompt: str) -> dict:
-    """Grade using Google Gemini (FREE API tier available)."""
-    try:
-        from google import genai
-        import re
-        
-        # Create client with API key
-        client = genai.Client(api_key=os.getenv('GOOGLE_API_KEY'))
-        
-        # Generate response using gemini-2.0-flash (free tier)
-        response = client.models.generate_content(
-            model='gemini-2.0-flash',
-            contents=prompt
-        )
-        result_text = response.text
-        
-        # Extract detailed feedback (everything before the JSON block)
-        detailed_feedback = ""
-        json_data = {}
-        
-        # Try to find JSON block in the response
-        json_match = re.search(r'```json\s*([\s\S]*?)\s*```', result_text)
-        if json_match:
-            try:
-                json_data = json.loads(json_match.group(1))
-                # Get everything before the JSON block as detailed feedback
-                detailed_feedback = result_text[:json_match.start()].strip()
-            except json.JSONDecodeError:
-                try:
-                    json_data = json.loads(result_text)
-                except:
-                    pass
-        else:
-            try:
-                json_data = json.loads(result_text)
-            except:
-                detailed_feedback = result_text
-        
+def _writing_scores(json_data):
+    """Band scores and summary from a score JSON, as in parse_writing_response."""
+    return {
+        'task_score': float(json_data.get('overall_score', 0)),
+        'breakdown': {
+            'task_achievement': float(json_data.get('task_achievement', 0)),
+            'coherence_cohesion': float(json_data.get('coherence_cohesion', 0)),
+            'lexical_resource': float(json_data.get('lexical_resource', 0)),
+            'grammatical_range': float(json_data.get('grammatical_range', 0)),
+        },
+        'feedback': json_data.get('feedback', ''),
+    }
+
+
+def _scores_payload(result, provider):
+    provider = provider or result.get('provider')
+    return {
+        'task_score': result['task_score'],
+        'breakdown': result['breakdown'],
+        'feedback': result['feedback'],
+        'provider': provider,
+        'model': WRITING_MODELS.get(provider),
+    }
+
+
+def _replay(result):
+    """Stream events of an already complete result (cached or not from an AI)."""
+    yield 'scores', _scores_payload(result, None)
+    if result.get('detailed_feedback'):
+        yield 'feedback', {'text': result['detailed_feedback']}
+    yield 'result', result
+
+
+def count_words(student_response: str) -> int:
+    """Count the words of a response, ignoring HTML tags."""
+    import re
+    plain_text = re.sub(r'<[^>]+>', ' ', student_response) if student_response else ''
+    return len(plain_text.split())
+
+
+def build_writing_prompt(task_number: int, student_response: str, task_prompt: str = None) -> str:
+    """
+    Build the per-student part of a writing prompt.
+    
+    It is sent after the task's WRITING_INSTRUCTIONS, which are the same for
+    every essay.
+    """
+    word_count = count_words(student_response)
+    question_label = 'Task Question' if task_number == 1 else 'Essay Question'
+    return f"""**{question_label}:** {task_prompt or 'Not provided'}
+
+**Student's Answer:** {student_response}
+
+**Word Count:** {word_count}"""
+
+
+def _grade_writing_task(task_number: int, student_response: str, task_prompt: str = None) -> dict:
+    """Grade a writing task through the provider router (no caching)."""
+    # Check if AI API key is configured (prioritize free Groq/Gemini API)
+    groq_api_key = os.getenv('GROQ_API_KEY')
+    google_api_key = os.getenv('GOOGLE_API_KEY')
+    openai_api_key = os.getenv('OPENAI_API_KEY')
+    anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
+    
+    if not any([groq_api_key, google_api_key, openai_api_key, anthropic_api_key]):
+        # Fallback: Return placeholder scores if AI is not configured
         return {
-            'task_score': float(json_data.get('overall_score', 0)),
+            'task_score': None,
             'breakdown': {
-                'task_achievement': float(json_data.get('task_achievement', 0)),
-                'coherence_cohesion': float(json_data.get('coherence_cohesion', 0)),
-                'lexical_resource': float(json_data.get('lexical_resource', 0)),
-                'grammatical_range': float(json_data.get('grammatical_range', 0)),
+                'task_achievement': None,
+                'coherence_cohesion': None,
+                'lexical_resource': None,
+                'grammatical_range': None,
             },
-            'feedback': json_data.get('feedback', ''),
-            'detailed_feedback': detailed_feedback,
-            'ai_used': True,
+            'feedback': 'AI grading not configured. Please set GOOGLE_API_KEY (free), OPENAI_API_KEY, or ANTHROPIC_API_KEY.',
+            'ai_used': False,
         }
+    
+    prompt = build_writing_prompt(task_number, student_response, task_prompt)
+    word_count = count_words(student_response)
+    
+    print(f"DEBUG: Grading Task {task_number}, Length: {len(student_response) if student_response else 0}, Words: {word_count}")
+    
+    # The router picks the provider (fastest healthy first) and fails over
+    calls = {
+        provider: partial(grade_with_provider, provider, task_number, prompt)
+        for provider in writing_providers()
+    }
+    provider, result = get_router().call(calls)
+    result['provider'] = provider
+    result['model'] = WRITING_MODELS[provider]
+    return result
+
+
+def parse_writing_response(result_text: str, require_scores: bool = False) -> dict:
+    """
+    Turn a model's answer (a ```json score block and markdown feedback) into a grading result.
+    
+    The feedback is the answer without the JSON block, wherever the block is
+    (first in the current prompts, last in earlier versions).
+    
+    With ``require_scores`` a response without a score JSON raises ValueError
+    (so the router tries another provider) instead of scoring 0.
+    """
+    import re
+    
+    # Extract detailed feedback (everything around the JSON block)
+    detailed_feedback = ""
+    json_data = {}
+    
+    # Try to find JSON block in the response
+    json_match = re.search(r'```json\s*([\s\S]*?)\s*```', result_text)
+    if json_match:
+        try:
+            json_data = json.loads(json_match.group(1))
+            # Everything but the JSON block is detailed feedback
+            detailed_feedback = (
+                result_text[:json_match.start()].strip() + '\n\n' + result_text[json_match.end():].strip()
+            ).strip()
+        except json.JSONDecodeError:
+            # If JSON parsing fails, try to parse the entire response
+            try:
+                json_data = json.loads(result_text)
+            except:
+                pass
+    else:
+        # No JSON block found, try to parse entire response as JSON
+        try:
+            json_data = json.loads(result_text)
+        except:
+            # If all fails, use the entire response as feedback
+            detailed_feedback = result_text
+    
+    if require_scores and not (isinstance(json_data, dict) and 'overall_score' in json_data):
+        raise ValueError('No band scores in the model response')
+    
+    return {
+        **_writing_scores(json_data),
+        'detailed_feedback': detailed_feedback,
+        'ai_used': True,
+    }
+
+
+def complete_with_gemini(instructions: str, prompt: str) -> Completion:
+    """Send a writing prompt to Google Gemini and return the completion."""
+    # Shared client, created on first use
+    client = get_client('gemini')
+    response = client.models.generate_content(
+        model=WRITING_MODELS['gemini'],
+        contents=prompt,
+        config={
+            'system_instruction': instructions,
+            'temperature': 0.3,
+            'max_output_tokens': WRITING_MAX_TOKENS,
+        }
+    )
+    return gemini_completion(response)
+
+
+def complete_with_groq(instructions: str, prompt: str) -> Completion:
+    """Send a writing prompt to Groq and return the completion."""
+    client = get_client('groq')
+    completion = client.chat.completions.create(
+        messages=[
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": prompt}
+        ],
+        model=WRITING_MODELS['groq'],
+        temperature=0.3,
+        max_tokens=WRITING_MAX_TOKENS,
+    )
+    return openai_completion(completion)
+
+
+def complete_with_openai(instructions: str, prompt: str) -> Completion:
+    """Send a writing prompt to OpenAI and return the completion."""
+    client = get_client('openai')
+    response = client.chat.completions.create(
+        model=WRITING_MODELS['openai'],
+        messages=[
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        max_tokens=WRITING_MAX_TOKENS,
+    )
+    return openai_completion(response)
+
+
+def complete_with_anthropic(instructions: str, prompt: str) -> Completion:
+    """Send a writing prompt to Anthropic Claude and return the completion."""
+    client = get_client('anthropic')
+    message = client.messages.create(
+        model=WRITING_MODELS['anthropic'],
+        max_tokens=WRITING_MAX_TOKENS,
+        temperature=0.3,
+        # Marked for Anthropic's prompt cache
+        system=[{"type": "text", "text": instructions, "cache_control": {"type": "ephemeral"}}],
+        messages=[
+            {"role": "user", "content": prompt}
+        ],
+    )
+    return anthropic_completion(message)
+
+
+WRITING_COMPLETIONS = {
+    'groq': complete_with_groq,
+    'gemini': complete_with_gemini,
+    'openai': complete_with_openai,
+    'anthropic': complete_with_anthropic,
+}
+
+
+def stream_with_gemini(instructions: str, prompt: str):
+    """Stream a writing answer from Google Gemini; returns the Completion."""
+    client = get_client('gemini')
+    chunks = client.models.generate_content_stream(
+        model=WRITING_MODELS['gemini'],
+        contents=prompt,
+        config={
+            'system_instruction': instructions,
+            'temperature': 0.3,
+            'max_output_tokens': WRITING_MAX_TOKENS,
+        }
+    )
+    return (yield from gemini_stream(chunks))
+
+
+def stream_with_groq(instructions: str, prompt: str):
+    """Stream a writing answer from Groq; returns the Completion."""
+    client = get_client('groq')
+    chunks = client.chat.completions.create(
+        messages=[
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": prompt}
+        ],
+        model=WRITING_MODELS['groq'],
+        temperature=0.3,
+        max_tokens=WRITING_MAX_TOKENS,
+        stream=True,
+    )
+    return (yield from openai_stream(chunks))
+
+
+def stream_with_openai(instructions: str, prompt: str):
+    """Stream a writing answer from OpenAI; returns the Completion."""
+    client = get_client('openai')
+    chunks = client.chat.completions.create(
+        model=WRITING_MODELS['openai'],
+        messages=[
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        max_tokens=WRITING_MAX_TOKENS,
+        stream=True,
+        stream_options={'include_usage': True},
+    )
+    return (yield from openai_stream(chunks))
+
+
+def stream_with_anthropic(instructions: str, prompt: str):
+    """Stream a writing answer from Anthropic Claude; returns the Completion."""
+    client = get_client('anthropic')
+    events = client.messages.create(
+        model=WRITING_MODELS['anthropic'],
+        max_tokens=WRITING_MAX_TOKENS,
+        temperature=0.3,
+        system=[{"type": "text", "text": instructions, "cache_control": {"type": "ephemeral"}}],
+        messages=[
+            {"role": "user", "content": prompt}
+        ],
+        stream=True,
+    )
+    return (yield from anthropic_stream(events))
+
+
+WRITING_STREAMS = {
+    'groq': stream_with_groq,
+    'gemini': stream_with_gemini,
+    'openai': stream_with_openai,
+    'anthropic': stream_with_anthropic,
+}
+
+
+def grade_with_provider(provider: str, task_number: int, prompt: str) -> dict:
+    """Grade with one provider; raises on API errors and on answers without scores."""
+    text = record_call(
+        'writing', provider, WRITING_MODELS[provider], WRITING_PROMPT_VERSION,
+        partial(WRITING_COMPLETIONS[provider], WRITING_INSTRUCTIONS[task_number], prompt)
+    )
+    return parse_writing_response(text, require_scores=True)
+
+
+def grade_with_gemini(prompt: str, task_number: int = 2) -> dict:
+    """Grade using Google Gemini (FREE API tier available)."""
+    try:
+        return parse_writing_response(complete_with_gemini(WRITING_INSTRUCTIONS[task_number], prompt).text)
     except ImportError as e:
         print(f"google-genai library not installed: {e}")
         return fallback_grading(1, "")
@@ -250,66 +535,16 @@ def grade_with_gemini(prompt: str) -> dict:
         return fallback_grading(1, "")
 
 
-def grade_with_groq(prompt: str) -> dict:
+def grade_with_groq(prompt: str, task_number: int = 2) -> dict:
     """Grade using Groq API (FREE and Fast)."""
     try:
-        from groq import Groq
-        import re
-        
-        client = Groq(api_key=os.getenv('GROQ_API_KEY'))
-        
-        completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You are an expert IELTS Writing examiner. Provide detailed markdown feedback followed by a JSON block with scores."},
-                {"role": "user", "content": prompt}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,
-            max_tokens=4000,
-        )
-        
-        result_text = completion.choices[0].message.content
-        
-        # Extract detailed feedback (everything before the JSON block)
-        detailed_feedback = ""
-        json_data = {}
-        
-        # Try to find JSON block in the response
-        json_match = re.search(r'```json\s*([\s\S]*?)\s*```', result_text)
-        if json_match:
-            try:
-                json_data = json.loads(json_match.group(1))
-                # Get everything before the JSON block as detailed feedback
-                detailed_feedback = result_text[:json_match.start()].strip()
-            except json.JSONDecodeError:
-                try:
-                    json_data = json.loads(result_text)
-                except:
-                    pass
-        else:
-            try:
-                json_data = json.loads(result_text)
-            except:
-                detailed_feedback = result_text
-        
-        return {
-            'task_score': float(json_data.get('overall_score', 0)),
-            'breakdown': {
-                'task_achievement': float(json_data.get('task_achievement', 0)),
-                'coherence_cohesion': float(json_data.get('coherence_cohesion', 0)),
-                'lexical_resource': float(json_data.get('lexical_resource', 0)),
-                'grammatical_range': float(json_data.get('grammatical_range', 0)),
-            },
-            'feedback': json_data.get('feedback', ''),
-            'detailed_feedback': detailed_feedback,
-            'ai_used': True,
-        }
+        return parse_writing_response(complete_with_groq(WRITING_INSTRUCTIONS[task_number], prompt).text)
     except ImportError:
         print("groq library not installed")
         raise  # Re-raise to let parent handle usage of other providers or fallback
     except Exception as e:
         print(f"Groq grading error: {e}")
-        raise  # Re-raise so grade_writing_task_ai catches it and uses original student_response for fallback
+        raise  # Re-raise so the caller can use the original student_response for fallback
 
 
 def grade_with_huggingface_gpt2(prompt: str, task_number: int, student_response: str) -> dict:
@@ -366,63 +601,10 @@ def grade_with_huggingface_gpt2(prompt: str, task_number: int, student_response:
         return fallback_grading(task_number, student_response)
 
 
-def grade_with_openai(prompt: str) -> dict:
+def grade_with_openai(prompt: str, task_number: int = 2) -> dict:
     """Grade using OpenAI GPT-4."""
     try:
-        import openai
-        import re
-        
-        openai.api_key = os.getenv('OPENAI_API_KEY')
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert IELTS Writing examiner. Provide detailed markdown feedback followed by a JSON block with scores."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=4000,
-        )
-        
-        result_text = response.choices[0].message.content
-        
-        # Extract detailed feedback (everything before the JSON block)
-        detailed_feedback = ""
-        json_data = {}
-        
-        # Try to find JSON block in the response
-        json_match = re.search(r'```json\s*([\s\S]*?)\s*```', result_text)
-        if json_match:
-            try:
-                json_data = json.loads(json_match.group(1))
-                # Get everything before the JSON block as detailed feedback
-                detailed_feedback = result_text[:json_match.start()].strip()
-            except json.JSONDecodeError:
-                # If JSON parsing fails, try to parse the entire response
-                try:
-                    json_data = json.loads(result_text)
-                except:
-                    pass
-        else:
-            # No JSON block found, try to parse entire response as JSON
-            try:
-                json_data = json.loads(result_text)
-            except:
-                # If all fails, use the entire response as feedback
-                detailed_feedback = result_text
-        
-        return {
-            'task_score': float(json_data.get('overall_score', 0)),
-            'breakdown': {
-                'task_achievement': float(json_data.get('task_achievement', 0)),
-                'coherence_cohesion': float(json_data.get('coherence_cohesion', 0)),
-                'lexical_resource': float(json_data.get('lexical_resource', 0)),
-                'grammatical_range': float(json_data.get('grammatical_range', 0)),
-            },
-            'feedback': json_data.get('feedback', ''),
-            'detailed_feedback': detailed_feedback,
-            'ai_used': True,
-        }
+        return parse_writing_response(complete_with_openai(WRITING_INSTRUCTIONS[task_number], prompt).text)
     except ImportError:
         return fallback_grading(1, "")
     except Exception as e:
@@ -430,59 +612,10 @@ def grade_with_openai(prompt: str) -> dict:
         return fallback_grading(1, "")
 
 
-def grade_with_anthropic(prompt: str) -> dict:
+def grade_with_anthropic(prompt: str, task_number: int = 2) -> dict:
     """Grade using Anthropic Claude."""
     try:
-        import anthropic
-        import re
-        
-        client = anthropic.Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
-        
-        message = client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=4000,
-            temperature=0.3,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-        )
-        
-        result_text = message.content[0].text
-        
-        # Extract detailed feedback (everything before the JSON block)
-        detailed_feedback = ""
-        json_data = {}
-        
-        # Try to find JSON block in the response
-        json_match = re.search(r'```json\s*([\s\S]*?)\s*```', result_text)
-        if json_match:
-            try:
-                json_data = json.loads(json_match.group(1))
-                # Get everything before the JSON block as detailed feedback
-                detailed_feedback = result_text[:json_match.start()].strip()
-            except json.JSONDecodeError:
-                try:
-                    json_data = json.loads(result_text)
-                except:
-                    pass
-        else:
-            try:
-                json_data = json.loads(result_text)
-            except:
-                detailed_feedback = result_text
-        
-        return {
-            'task_score': float(json_data.get('overall_score', 0)),
-            'breakdown': {
-                'task_achievement': float(json_data.get('task_achievement', 0)),
-                'coherence_cohesion': float(json_data.get('coherence_cohesion', 0)),
-                'lexical_resource': float(json_data.get('lexical_resource', 0)),
-                'grammatical_range': float(json_data.get('grammatical_range', 0)),
-            },
-            'feedback': json_data.get('feedback', ''),
-            'detailed_feedback': detailed_feedback,
-            'ai_used': True,
-        }
+        return parse_writing_response(complete_with_anthropic(WRITING_INSTRUCTIONS[task_number], prompt).text)
     except ImportError:
         return fallback_grading(1, "")
     except Exception as e:
@@ -6,135 +6,306 @@ import os
 import json
 import logging
 from decimal import Decimal
+from functools import partial
+
+from .providers import get_client
+from .router import get_router
+from .usage import Completion, anthropic_completion, gemini_completion, openai_completion, record_call
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the speaking prompt changes, so cached grades are not reused.
+SPEAKING_PROMPT_VERSION = 3
 
-SPEAKING_EVALUATION_PROMPT = """You are an expert IELTS Speaking examiner with 15+ years of experience. Evaluate this IELTS Speaking response according to official IELTS band descriptors.
+# Upper bound of a speaking assessment; the instructions ask for about 500 words.
+SPEAKING_MAX_TOKENS = 1500
 
-## EVALUATION CRITERIA (Each scored 0-9)
+# Model used by each provider, in the order providers are tried.
+SPEAKING_MODELS = {
+    'openai': 'gpt-4o-mini',
+    'groq': 'llama-3.3-70b-versatile',
+    'gemini': 'gemini-2.0-flash-exp',
+    'anthropic': 'claude-3-5-sonnet-20241022',
+}
 
-### 1. Fluency and Coherence (FC)
-- Speech rate and continuity
-- Use of discourse markers and connectives
-- Logical sequencing of ideas
-- Hesitation patterns (natural vs. unnatural)
-- Self-correction ability
+PROVIDER_API_KEYS = {
+    'openai': 'OPENAI_API_KEY',
+    'groq': 'GROQ_API_KEY',
+    'gemini': 'GOOGLE_API_KEY',
+    'anthropic': 'ANTHROPIC_API_KEY',
+}
 
-### 2. Lexical Resource (LR)
-- Range of vocabulary
-- Precision of word choice
-- Use of idiomatic expressions
-- Paraphrasing ability
-- Topic-specific vocabulary
 
-### 3. Grammatical Range and Accuracy (GRA)
-- Sentence structure variety
-- Accuracy of grammar
-- Use of complex structures
-- Error frequency and impact
+def speaking_providers():
+    """Return the providers with an API key set, in preference order."""
+    return [provider for provider in SPEAKING_MODELS if os.getenv(PROVIDER_API_KEYS[provider])]
 
-### 4. Pronunciation (P)
-- Inferred from text patterns: natural phrasing, contractions, connected speech indicators
-- Word stress patterns evident in transcription
-- Overall intelligibility based on sentence structure
 
----
+# Examiner instructions, identical for every part and student. They are sent
+# first, as the system message, so providers with prompt caching reuse them;
+# only SPEAKING_RESPONSE_PROMPT changes between students.
+SPEAKING_INSTRUCTIONS = """You are an expert IELTS Speaking examiner. Assess the transcribed IELTS Speaking response in the user message against the official IELTS band descriptors. Be specific and concise: about 500 words in total.
 
-## PART-SPECIFIC EVALUATION
+Criteria (each 0-9):
+1. Fluency and Coherence: speech rate and continuity, discourse markers, logical sequencing, hesitation, self-correction
+2. Lexical Resource: range, precision, idiomatic language, paraphrasing, topic vocabulary
+3. Grammatical Range and Accuracy: variety of structures, accuracy, complex structures, error frequency and impact
+4. Pronunciation: inferred from the transcript (natural phrasing, contractions, connected speech, intelligibility)
 
-### Part 1 (Interview)
-- Expects SHORT, DIRECT answers (2-4 sentences per question)
-- Natural conversation style
-- Personal and relevant responses
+Part expectations:
+- Part 1 (Interview): short, direct, personal answers (2-4 sentences per question)
+- Part 2 (Long Turn): 1-2 minute monologue covering all bullet points with a clear structure
+- Part 3 (Discussion): developed answers with reasons and examples, abstract ideas, justified opinions
 
-### Part 2 (Long Turn)
-- EXTENDED monologue (1-2 minutes)
-- Must cover ALL bullet points
-- Clear structure (introduction, body, conclusion)
-- Cohesive devices essential
+Start your answer with the scores, as a JSON block in exactly this format (bands 0-9 in steps of 0.5):
+```json
+{"fluency_coherence": 0.0, "lexical_resource": 0.0, "grammatical_range": 0.0, "pronunciation": 0.0, "overall_score": 0.0, "feedback": "Brief performance summary"}
+```
 
-### Part 3 (Discussion)
-- DEVELOPED answers with explanations and examples
-- Ability to discuss abstract ideas
-- Critical thinking and opinion justification
-- More complex vocabulary and grammar expected
+Then give the assessment in markdown with these sections:
 
----
+### BAND SCORE BREAKDOWN
+Fluency and Coherence, Lexical Resource, Grammatical Range and Accuracy, Pronunciation and OVERALL BAND, each X.0/9
 
-## INPUT DATA
+### DETAILED ANALYSIS
+One short paragraph per criterion, with examples of strong vocabulary and structures and errors with corrections
 
-**Part {part_number}**
+### SPECIFIC FEEDBACK
+Two strengths, two priority improvements with examples, and a brief Band 8-9 model answer excerpt"""
+
+
+SPEAKING_RESPONSE_PROMPT = """**Part {part_number}**
 **Topic:** {topic}
 **Question(s):** {questions}
 
 **Student's Transcribed Response:**
-{student_response}
+{student_response}"""
+
+
+def complete_with_openai(prompt: str) -> Completion:
+    """Send a speaking prompt to OpenAI and return the completion."""
+    client = get_client('openai')
+    response = client.chat.completions.create(
+        model=SPEAKING_MODELS['openai'],
+        messages=[
+            {"role": "system", "content": SPEAKING_INSTRUCTIONS},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=SPEAKING_MAX_TOKENS
+    )
+    return openai_completion(response)
+
+
+def complete_with_groq(prompt: str) -> Completion:
+    """Send a speaking prompt to Groq and return the completion."""
+    client = get_client('groq')
+    response = client.chat.completions.create(
+        model=SPEAKING_MODELS['groq'],
+        messages=[
+            {"role": "system", "content": SPEAKING_INSTRUCTIONS},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=SPEAKING_MAX_TOKENS
+    )
+    return openai_completion(response)
+
+
+def complete_with_gemini(prompt: str) -> Completion:
+    """Send a speaking prompt to Google Gemini and return the completion."""
+    client = get_client('gemini')
+    response = client.models.generate_content(
+        model=SPEAKING_MODELS['gemini'],
+        contents=prompt,
+        config={
+            'system_instruction': SPEAKING_INSTRUCTIONS,
+            'max_output_tokens': SPEAKING_MAX_TOKENS,
+        }
+    )
+    return gemini_completion(response)
+
+
+def complete_with_anthropic(prompt: str) -> Completion:
+    """Send a speaking prompt to Anthropic Claude and return the completion."""
+    client = get_client('anthropic')
+    message = client.messages.create(
+        model=SPEAKING_MODELS['anthropic'],
+        max_tokens=SPEAKING_MAX_TOKENS,
+        # Marked for Anthropic's prompt cache
+        system=[{"type": "text", "text": SPEAKING_INSTRUCTIONS, "cache_control": {"type": "ephemeral"}}],
+        messages=[
+            {"role": "user", "content": prompt}
+        ]
+    )
+    return anthropic_completion(message)
 
----
 
-## REQUIRED OUTPUT FORMAT
+SPEAKING_COMPLETIONS = {
+    'openai': complete_with_openai,
+    'groq': complete_with_groq,
+    'gemini': complete_with_gemini,
+    'anthropic': complete_with_anthropic,
+}
 
-### BAND SCORE BREAKDOWN
-- **Fluency and Coherence:** X.0/9
-- **Lexical Resource:** X.0/9
-- **Grammatical Range and Accuracy:** X.0/9
-- **Pronunciation:** X.0/9
-- **OVERALL BAND:** X.0/9
 
-### DETAILED ANALYSIS
+def _complete(provider, prompt):
+    response_text = record_call(
+        'speaking', provider, SPEAKING_MODELS[provider], SPEAKING_PROMPT_VERSION,
+        partial(SPEAKING_COMPLETIONS[provider], prompt)
+    )
+    if not response_text:
+        raise ValueError('Empty response')
+    return response_text
+
+
+def build_speaking_prompt(part_number: int, topic: str, questions, student_response: str) -> str:
+    """Build the per-student part of a speaking prompt (sent after SPEAKING_INSTRUCTIONS)."""
+    # Format questions
+    if isinstance(questions, list):
+        questions_text = '\n'.join([f"{i+1}. {q}" for i, q in enumerate(questions)])
+    else:
+        questions_text = str(questions)
+
+    return SPEAKING_RESPONSE_PROMPT.format(
+        part_number=part_number,
+        topic=topic,
+        questions=questions_text,
+        student_response=student_response
+    )
 
-#### Fluency and Coherence
-[Specific observations]
 
-#### Lexical Resource
-- **Strong vocabulary:** [examples]
-- **Improvements needed:** [with corrections]
+def parse_speaking_response(response_text: str) -> dict:
+    """Turn a model's answer into a speaking part result."""
+    # Extract JSON from response
+    scores = extract_scores_from_response(response_text)
 
-#### Grammatical Range and Accuracy
-- **Correct complex structures:** [examples]
-- **Errors found:** [with corrections]
+    return {
+        'overall_score': scores.get('overall_score'),
+        'breakdown': {
+            'fluency_coherence': scores.get('fluency_coherence'),
+            'lexical_resource': scores.get('lexical_resource'),
+            'grammatical_range': scores.get('grammatical_range'),
+            'pronunciation': scores.get('pronunciation'),
+        },
+        'feedback': scores.get('feedback', 'No feedback provided'),
+        'detailed_feedback': response_text,
+        'ai_used': True,
+    }
 
-#### Pronunciation Assessment
-[Based on text patterns indicating natural speech]
 
-### SPECIFIC FEEDBACK
+def speaking_parts(questions_data: dict, responses) -> dict:
+    """
+    Build the grading input of each speaking part from its recorded answers.
 
-#### Strengths:
-1. [Point 1]
-2. [Point 2]
+    Args:
+        questions_data: The variant's speaking TestFile.questions_data
+        responses: SpeakingResponse rows of the attempt with a transcript
 
-#### Priority Improvements:
-1. [Improvement 1 with example]
-2. [Improvement 2 with example]
+    Returns:
+        dict: {part_number: (topic, questions, student_response)}, only parts
+        with at least one transcribed answer
+    """
+    # Group responses by part
+    responses_by_part = {}
+    for response in responses:
+        responses_by_part.setdefault(response.part_number, []).append(response)
 
-#### Model Answer Excerpt:
-[Brief Band 8-9 example response]
+    parts = {}
+    for part_num in [1, 2, 3]:
+        if part_num not in responses_by_part:
+            continue
 
----
+        part_responses = responses_by_part[part_num]
 
-IMPORTANT: End with this exact JSON format:
-```json
-{{
-    "fluency_coherence": 0.0,
-    "lexical_resource": 0.0,
-    "grammatical_range": 0.0,
-    "pronunciation": 0.0,
-    "overall_score": 0.0,
-    "feedback": "Brief performance summary"
-}}
-```"""
+        # Get questions for this part
+        if part_num == 1:
+            part_data = questions_data.get('part1', {})
+            topic = part_data.get('topic', 'Interview')
+            questions = part_data.get('questions', [])
+
+            # Combine all responses for part 1
+            combined_text = '\n\n'.join([
+                f"Q{i+1}: {questions[i] if i < len(questions) else 'Question'}\nA: {resp.transcribed_text}"
+                for i, resp in enumerate(part_responses)
+            ])
+
+        elif part_num == 2:
+            part_data = questions_data.get('part2', {})
+            topic = part_data.get('topic', 'Long Turn')
+            prompt = part_data.get('prompt', '')
+            points = part_data.get('points', [])
+            final = part_data.get('final', '')
+
+            questions = [f"{prompt}\n\nYou should say:\n" + "\n".join(points) + f"\n{final}"]
+            combined_text = part_responses[0].transcribed_text if part_responses else ''
+
+        elif part_num == 3:
+            part_data = questions_data.get('part3', {})
+            topics = part_data.get('topics', [])
+
+            all_questions = []
+            for topic_group in topics:
+                all_questions.extend(topic_group.get('questions', []))
+
+            topic = 'Discussion'
+            questions = all_questions
+
+            # Combine all responses for part 3
+            combined_text = '\n\n'.join([
+                f"Q{i+1}: {all_questions[i] if i < len(all_questions) else 'Question'}\nA: {resp.transcribed_text}"
+                for i, resp in enumerate(part_responses)
+            ])
+
+        parts[part_num] = (topic, questions, combined_text)
+
+    return parts
 
 
 def grade_speaking_part_ai(
     part_number: int,
     topic: str,
     questions: list,
-    student_response: str
+    student_response: str,
+    bypass_cache: bool = False
 ) -> dict:
     """
     Grade a speaking part using AI (Claude, GPT-4, etc.).
 
+    The provider is chosen by the router (see grading.router) and results are
+    cached (see grading.grading_cache), so grading an identical transcript
+    again costs no LLM call. Pass ``bypass_cache=True`` to grade afresh.
+    """
+    providers = speaking_providers()
+    if not providers:
+        return _grade_speaking_part(part_number, topic, questions, student_response)
+
+    from .grading_cache import cache_key, cached_grading
+    keys = {
+        provider: (
+            cache_key(
+                'speaking', student_response,
+                prompt_version=SPEAKING_PROMPT_VERSION, provider=provider, model=SPEAKING_MODELS[provider],
+                part_number=part_number, topic=topic, questions=questions
+            ),
+            SPEAKING_MODELS[provider]
+        )
+        for provider in providers
+    }
+    return cached_grading(
+        'speaking', keys,
+        lambda: _grade_speaking_part(part_number, topic, questions, student_response),
+        bypass=bypass_cache
+    )
+
+
+def _grade_speaking_part(
+    part_number: int,
+    topic: str,
+    questions: list,
+    student_response: str
+) -> dict:
+    """
+    Grade a speaking part through the provider router (no caching).
+
     Args:
         part_number: 1, 2, or 3
         topic: Topic/theme of the part
@@ -176,127 +347,21 @@ def grade_speaking_part_ai(
             'ai_used': False,
         }
 
-    # Format questions
-    if isinstance(questions, list):
-        questions_text = '\n'.join([f"{i+1}. {q}" for i, q in enumerate(questions)])
-    else:
-        questions_text = str(questions)
-
-    # Build the prompt
-    prompt = SPEAKING_EVALUATION_PROMPT.format(
-        part_number=part_number,
-        topic=topic,
-        questions=questions_text,
-        student_response=student_response
-    )
+    prompt = build_speaking_prompt(part_number, topic, questions, student_response)
 
     try:
-        response_text = None
-
-        # Try OpenAI first (most reliable)
-        if openai_api_key and not response_text:
-            try:
-                import openai
-                client = openai.OpenAI(api_key=openai_api_key)
-
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are an expert IELTS Speaking examiner."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=2048
-                )
-
-                response_text = response.choices[0].message.content
-                logger.info(f"Successfully graded speaking Part {part_number} using OpenAI")
-
-            except ImportError:
-                logger.warning("OpenAI library not installed, trying alternatives")
-            except Exception as e:
-                logger.error(f"OpenAI API error: {str(e)}")
-
-        # Try Groq (free tier, fast)
-        if groq_api_key and not response_text:
-            try:
-                import groq
-                client = groq.Groq(api_key=groq_api_key)
-
-                response = client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[
-                        {"role": "system", "content": "You are an expert IELTS Speaking examiner."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=2048
-                )
-
-                response_text = response.choices[0].message.content
-                logger.info(f"Successfully graded speaking Part {part_number} using Groq")
-
-            except ImportError:
-                logger.warning("Groq library not installed")
-            except Exception as e:
-                logger.error(f"Groq API error: {str(e)}")
-
-        # Try Google Gemini
-        if google_api_key and not response_text:
-            try:
-                import google.genai as genai
-                client = genai.Client(api_key=google_api_key)
-
-                response = client.models.generate_content(
-                    model='gemini-2.0-flash-exp',
-                    contents=prompt
-                )
-                response_text = response.text
-                logger.info(f"Successfully graded speaking Part {part_number} using Gemini")
-
-            except ImportError:
-                logger.warning("Google GenAI library not installed, trying alternatives")
-            except Exception as e:
-                logger.error(f"Gemini API error: {str(e)}")
-
-        # Try Claude (Anthropic) - best quality
-        if anthropic_api_key and not response_text:
-            try:
-                import anthropic
-                client = anthropic.Anthropic(api_key=anthropic_api_key)
-
-                message = client.messages.create(
-                    model="claude-3-5-sonnet-20241022",
-                    max_tokens=2048,
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ]
-                )
-
-                response_text = message.content[0].text
-                logger.info(f"Successfully graded speaking Part {part_number} using Claude")
-
-            except ImportError:
-                logger.warning("Anthropic library not installed")
-            except Exception as e:
-                logger.error(f"Claude API error: {str(e)}")
-
-        if not response_text:
-            raise Exception("All AI services failed or are not configured properly")
-
-        # Extract JSON from response
-        scores = extract_scores_from_response(response_text)
-
-        return {
-            'overall_score': scores.get('overall_score'),
-            'breakdown': {
-                'fluency_coherence': scores.get('fluency_coherence'),
-                'lexical_resource': scores.get('lexical_resource'),
-                'grammatical_range': scores.get('grammatical_range'),
-                'pronunciation': scores.get('pronunciation'),
-            },
-            'feedback': scores.get('feedback', 'No feedback provided'),
-            'detailed_feedback': response_text,
-            'ai_used': True,
+        # The router picks the provider (fastest healthy first) and fails over
+        calls = {
+            provider: partial(_complete, provider, prompt)
+            for provider in speaking_providers()
         }
+        provider, response_text = get_router().call(calls)
+        logger.info(f"Successfully graded speaking Part {part_number} using {provider}")
+
+        result = parse_speaking_response(response_text)
+        result['provider'] = provider
+        result['model'] = SPEAKING_MODELS[provider]
+        return result
 
     except Exception as e:
         logger.error(f"Error grading speaking Part {part_number}: {str(e)}")
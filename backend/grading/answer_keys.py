@@ -0,0 +1,106 @@
+"""
+Compiled reading/listening answer keys.
+
+Grading used to query every Answer of a variant and re-normalize its
+alternatives for each graded test. The compiled key holds, per section, every
+question's accepted options already stripped (and upper-cased unless the
+question is case-sensitive), so checking an answer is one set lookup. Keys are
+cached per variant and dropped whenever an Answer row is saved or deleted.
+Only a shared cache is used: with per-process LocMem the drop would only reach
+the process that edited the Answer, and the other workers would grade with
+the old key, so then every grade compiles the key (one query).
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+
+from exams.models import Answer
+from student_portal.active_attempts import cache_is_shared
+
+ANSWER_KEY_CACHE_KEY = 'answer_key:{variant_id}'
+
+# Keys only change through Answer saves/deletes, which invalidate them; the
+# TTL bounds the damage of bulk writes that bypass signals.
+ANSWER_KEY_TTL = 24 * 60 * 60
+
+SECTIONS = ('listening', 'reading')
+
+
+class AnswerKeyItem:
+    """The accepted answers of one question."""
+
+    __slots__ = ('question_number', 'correct_answer', 'alternative_answers', 'case_sensitive', 'options')
+
+    def __init__(self, question_number, correct_answer, alternative_answers, case_sensitive):
+        self.question_number = question_number
+        self.correct_answer = correct_answer
+        self.alternative_answers = alternative_answers
+        self.case_sensitive = case_sensitive
+
+        options = [correct_answer]
+        if isinstance(alternative_answers, list):
+            options.extend(alternative_answers)
+        self.options = frozenset(self.normalize(option) for option in options)
+
+    def normalize(self, value):
+        value = str(value).strip()
+        return value if self.case_sensitive else value.upper()
+
+    def matches(self, student_answer):
+        return self.normalize(student_answer) in self.options
+
+
+class AnswerKey:
+    """A variant's compiled key: AnswerKeyItems per section, ordered by question number."""
+
+    __slots__ = ('variant_id', 'sections')
+
+    def __init__(self, variant_id, sections):
+        self.variant_id = variant_id
+        self.sections = sections
+
+
+def compile_answer_key(variant_id) -> AnswerKey:
+    """Build a variant's answer key with one query."""
+    sections = {section: [] for section in SECTIONS}
+    rows = Answer.objects.filter(variant_id=variant_id).order_by('section', 'question_number').values_list(
+        'section', 'question_number', 'correct_answer', 'alternative_answers', 'case_sensitive'
+    )
+    for section, question_number, correct_answer, alternative_answers, case_sensitive in rows:
+        sections.setdefault(section, []).append(
+            AnswerKeyItem(question_number, correct_answer, alternative_answers, case_sensitive)
+        )
+    return AnswerKey(variant_id, sections)
+
+
+def answer_key_cache_key(variant_id) -> str:
+    return ANSWER_KEY_CACHE_KEY.format(variant_id=variant_id)
+
+
+def get_answer_key(variant_id) -> AnswerKey:
+    """Return the variant's compiled answer key, compiling and caching it on a miss."""
+    if not cache_is_shared():
+        return compile_answer_key(variant_id)
+    key = answer_key_cache_key(variant_id)
+    answer_key = cache.get(key)
+    if answer_key is None:
+        answer_key = compile_answer_key(variant_id)
+        cache.set(key, answer_key, timeout=ANSWER_KEY_TTL)
+    return answer_key
+
+
+def invalidate_answer_key(variant_id) -> None:
+    """
+    Drop a variant's cached key, now and again once the transaction commits.
+
+    Call it after bulk writes to Answer (bulk_create/update), which do not
+    send the signals that invalidate keys automatically.
+    """
+    key = answer_key_cache_key(variant_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def answer_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver for Answer (connected in GradingConfig.ready)."""
+    invalidate_answer_key(instance.variant_id)
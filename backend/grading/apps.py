@@ -1,7 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class GradingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'grading'
 
+    def ready(self):
+        from exams.models import Answer
+        from .answer_keys import answer_changed
+
+        # Compiled answer keys are cached per variant; drop them on any change.
+        post_save.connect(answer_changed, sender=Answer, dispatch_uid='grading_answer_key_saved')
+        post_delete.connect(answer_changed, sender=Answer, dispatch_uid='grading_answer_key_deleted')
@@ -0,0 +1,503 @@
+"""
+Cohort regrades through provider batch APIs.
+
+Regrading a cohort after a prompt change or a provider switch used to mean
+one synchronous chat call per writing task and speaking part. A
+GradingBatch instead builds every prompt of the selected attempts into one
+JSONL request file (the OpenAI batch format), submits it, polls until the
+provider has answered all of it, and writes the grades with bulk updates.
+
+Each step records its outcome on the GradingBatch before the next one
+starts, so ``run_batch`` picks up an interrupted batch where it stopped:
+
+    building -> built -> submitted -> completed -> applied
+
+Backends:
+
+- ``openai``: the OpenAI Batch API (files upload, 24h completion window,
+  about half the price of synchronous calls)
+- ``local``: a stand-in for development and tests that answers a chunk of
+  requests from the request file on every poll and adds them to the
+  result file, with deterministic fake scores; no provider is called
+
+Writing and speaking grades are written like the synchronous graders write
+them, and every request is recorded as an AICallRecord (see grading.usage). A writing task or speaking part whose request failed keeps the
+attempt's current grade for that section.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from exams.models import TestFile
+from student_portal.models import SpeakingResponse, StudentTest, TestResponse, TestResult
+from .ai_grading import (
+    WRITING_INSTRUCTIONS, WRITING_MAX_TOKENS, WRITING_MODELS, WRITING_PROMPT_VERSION,
+    build_writing_prompt, parse_writing_response
+)
+from .ai_speaking_grading import (
+    SPEAKING_INSTRUCTIONS, SPEAKING_MAX_TOKENS, SPEAKING_MODELS, SPEAKING_PROMPT_VERSION,
+    build_speaking_prompt, calculate_speaking_overall_score, parse_speaking_response, speaking_parts
+)
+from .cohort import overall_band
+from .models import AICallRecord, GradingBatch
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ('writing', 'speaking')
+
+# The OpenAI Batch API accepts at most this many requests per batch.
+MAX_REQUESTS = 50000
+
+# Requests the local backend answers per poll.
+LOCAL_CHUNK_SIZE = 50
+
+
+def _path(batch, name):
+    return os.path.join(settings.GRADING_BATCH_DIR, f'batch_{batch.id}_{name}.jsonl')
+
+
+def input_path(batch):
+    return _path(batch, 'input')
+
+
+def output_path(batch):
+    return _path(batch, 'output')
+
+
+def read_jsonl(path):
+    """
+    Read the complete lines of a JSONL file.
+
+    A line cut off by an interrupted write is dropped (it is answered again).
+    """
+    if not os.path.exists(path):
+        return []
+    rows = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return rows
+
+
+def _request(custom_id, model, system_message, prompt, **params):
+    return {
+        'custom_id': custom_id,
+        'method': 'POST',
+        'url': '/v1/chat/completions',
+        'body': {
+            'model': model,
+            'messages': [
+                {'role': 'system', 'content': system_message},
+                {'role': 'user', 'content': prompt},
+            ],
+            **params,
+        },
+    }
+
+
+def build_requests(student_test_ids, sections=SECTIONS):
+    """
+    Build the chat completion requests of the given attempts.
+
+    Custom ids are ``writing:<attempt id>:<task>`` and
+    ``speaking:<attempt id>:<part>``.
+
+    Returns:
+        list: Batch request dicts
+    """
+    requests = []
+    if 'writing' in sections:
+        responses = TestResponse.objects.filter(
+            student_test_id__in=student_test_ids,
+            section='writing',
+            question_number__in=[1, 2]
+        ).exclude(answer='').order_by('student_test_id', 'question_number')
+        for attempt_id, task_number, answer in responses.values_list('student_test_id', 'question_number', 'answer'):
+            requests.append(_request(
+                f'writing:{attempt_id}:{task_number}',
+                WRITING_MODELS['openai'], WRITING_INSTRUCTIONS[task_number],
+                build_writing_prompt(task_number, answer),
+                temperature=0.3, max_tokens=WRITING_MAX_TOKENS
+            ))
+
+    if 'speaking' in sections:
+        by_attempt = defaultdict(list)
+        for response in SpeakingResponse.objects.filter(
+            student_test_id__in=student_test_ids,
+            transcription_status='completed'
+        ).order_by('student_test_id', 'part_number', 'question_number'):
+            by_attempt[response.student_test_id].append(response)
+        variants = dict(
+            StudentTest.objects.filter(id__in=list(by_attempt)).values_list('id', 'variant_id')
+        )
+        questions = dict(
+            TestFile.objects.filter(variant_id__in=set(variants.values()), file_type='speaking')
+            .values_list('variant_id', 'questions_data')
+        )
+        for attempt_id, responses in by_attempt.items():
+            questions_data = questions.get(variants[attempt_id])
+            if not questions_data:
+                continue
+            for part_number, (topic, part_questions, text) in speaking_parts(questions_data, responses).items():
+                requests.append(_request(
+                    f'speaking:{attempt_id}:{part_number}',
+                    SPEAKING_MODELS['openai'], SPEAKING_INSTRUCTIONS,
+                    build_speaking_prompt(part_number, topic, part_questions, text),
+                    max_tokens=SPEAKING_MAX_TOKENS
+                ))
+    return requests
+
+
+class LocalBackend:
+    """File-based stand-in for a provider batch API (no AI calls)."""
+
+    name = 'local'
+    poll_interval = 0
+
+    def __init__(self, chunk_size=LOCAL_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def submit(self, batch):
+        return f'local-{batch.id}'
+
+    @staticmethod
+    def answer(request):
+        """A deterministic fake examiner answer in the requested format."""
+        prompt = request['body']['messages'][-1]['content']
+        band = 4.0 + int(hashlib.sha256(prompt.encode('utf-8')).hexdigest(), 16) % 9 / 2
+        if request['custom_id'].startswith('writing:'):
+            scores = {
+                'task_achievement': band, 'coherence_cohesion': band,
+                'lexical_resource': band, 'grammatical_range': band,
+            }
+        else:
+            scores = {
+                'fluency_coherence': band, 'lexical_resource': band,
+                'grammatical_range': band, 'pronunciation': band,
+            }
+        scores.update(overall_score=band, feedback='Graded by the local batch stand-in.')
+        return f'## Local batch grading\n\n```json\n{json.dumps(scores)}\n```'
+
+    def poll(self, batch):
+        requests = read_jsonl(input_path(batch))
+        answered = read_jsonl(output_path(batch))
+        done = {row['custom_id'] for row in answered}
+        todo = [request for request in requests if request['custom_id'] not in done][:self.chunk_size]
+        # Replaced atomically, so an interrupted poll leaves the previous file.
+        path = output_path(batch)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(row) + '\n' for row in answered)
+            for request in todo:
+                f.write(json.dumps({
+                    'id': f'local-{request["custom_id"]}',
+                    'custom_id': request['custom_id'],
+                    'response': {
+                        'status_code': 200,
+                        'body': {'choices': [{'message': {'role': 'assistant', 'content': self.answer(request)}}]},
+                    },
+                    'error': None,
+                }) + '\n')
+        os.replace(path + '.tmp', path)
+        completed = len(done) + len(todo)
+        return {
+            'state': 'completed' if completed >= len(requests) else 'running',
+            'completed': completed,
+            'failed': 0,
+        }
+
+    def download(self, batch):
+        """The result file is written in place."""
+
+
+class OpenAIBackend:
+    """The OpenAI Batch API (POST /v1/chat/completions, 24h window)."""
+
+    name = 'openai'
+    poll_interval = 60
+
+    def _client(self):
+        from .providers import get_client
+        return get_client('openai')
+
+    def submit(self, batch):
+        client = self._client()
+        with open(input_path(batch), 'rb') as f:
+            uploaded = client.files.create(file=f, purpose='batch')
+        remote = client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h',
+            metadata={'grading_batch': str(batch.id)}
+        )
+        return remote.id
+
+    def poll(self, batch):
+        remote = self._client().batches.retrieve(batch.external_id)
+        counts = remote.request_counts
+        if remote.status in ('completed', 'expired'):
+            # Requests not run before expiry are reported as failed lines.
+            state = 'completed'
+        elif remote.status in ('failed', 'cancelled', 'cancelling'):
+            state = 'failed'
+        else:
+            state = 'running'
+        errors = '; '.join(error.message or '' for error in (remote.errors.data or [])) if remote.errors else ''
+        return {
+            'state': state,
+            'completed': counts.completed if counts else 0,
+            'failed': counts.failed if counts else 0,
+            'error': errors or f'Batch {remote.status}',
+        }
+
+    def download(self, batch):
+        """Save the result and error files (same line format) as the output file."""
+        client = self._client()
+        remote = client.batches.retrieve(batch.external_id)
+        with open(output_path(batch), 'w', encoding='utf-8') as f:
+            for file_id in (remote.output_file_id, remote.error_file_id):
+                if file_id:
+                    content = client.files.content(file_id).text
+                    f.write(content if content.endswith('\n') or not content else content + '\n')
+
+
+BACKENDS = {
+    'local': LocalBackend,
+    'openai': OpenAIBackend,
+}
+
+
+def get_backend(name):
+    return BACKENDS[name]()
+
+
+def create_batch(student_tests, sections=SECTIONS, backend='local'):
+    """
+    Create a batch for the given attempts and write its request file.
+
+    Returns:
+        GradingBatch: In status ``built`` (or ``applied`` if nothing to grade)
+    """
+    sections = [section for section in SECTIONS if section in sections]
+    ids = sorted(student_test.id if hasattr(student_test, 'id') else student_test for student_test in student_tests)
+    batch = GradingBatch.objects.create(backend=backend, sections=sections, student_test_ids=ids)
+    build(batch)
+    return batch
+
+
+def build(batch):
+    """Write the request file (again, if building was interrupted)."""
+    requests = build_requests(batch.student_test_ids, batch.sections)
+    if len(requests) > MAX_REQUESTS:
+        raise ValueError(f'{len(requests)} requests exceed the batch limit of {MAX_REQUESTS}; select fewer attempts')
+    os.makedirs(settings.GRADING_BATCH_DIR, exist_ok=True)
+    path = input_path(batch)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps(request) + '\n' for request in requests)
+    os.replace(path + '.tmp', path)
+    batch.request_count = len(requests)
+    batch.status = 'built' if requests else 'applied'
+    batch.save(update_fields=['request_count', 'status'])
+
+
+def submit(batch):
+    """Send the request file to the backend."""
+    batch.external_id = get_backend(batch.backend).submit(batch)
+    batch.status = 'submitted'
+    batch.submitted_at = timezone.now()
+    batch.save(update_fields=['external_id', 'status', 'submitted_at'])
+
+
+def poll(batch):
+    """
+    Check the batch once and download the results when it is done.
+
+    Returns:
+        str: The batch status afterwards
+    """
+    backend = get_backend(batch.backend)
+    progress = backend.poll(batch)
+    batch.completed_count = progress['completed']
+    batch.failed_count = progress['failed']
+    fields = ['completed_count', 'failed_count']
+    if progress['state'] == 'completed':
+        backend.download(batch)
+        batch.status = 'completed'
+        batch.completed_at = timezone.now()
+        fields += ['status', 'completed_at']
+    elif progress['state'] == 'failed':
+        batch.status = 'failed'
+        batch.error = progress.get('error', '')
+        fields += ['status', 'error']
+    batch.save(update_fields=fields)
+    return batch.status
+
+
+def _response_text(row):
+    response = row.get('response') or {}
+    if row.get('error') or response.get('status_code') != 200:
+        return None
+    choices = (response.get('body') or {}).get('choices') or []
+    return choices[0]['message']['content'] if choices else None
+
+
+def _call_record(batch, section, row, text):
+    """The AICallRecord of one batch request, from the usage in its result line."""
+    usage = ((row.get('response') or {}).get('body') or {}).get('usage') or {}
+    return AICallRecord(
+        kind=section,
+        provider=batch.backend,
+        model=WRITING_MODELS['openai'] if section == 'writing' else SPEAKING_MODELS['openai'],
+        prompt_version=WRITING_PROMPT_VERSION if section == 'writing' else SPEAKING_PROMPT_VERSION,
+        input_tokens=usage.get('prompt_tokens'),
+        cached_input_tokens=(usage.get('prompt_tokens_details') or {}).get('cached_tokens'),
+        output_tokens=usage.get('completion_tokens'),
+        ok=text is not None,
+        error=str((row.get('error') or {}).get('message') or '')[:255],
+        batch=True,
+    )
+
+
+def _parse_results(batch):
+    """
+    Parse the result file.
+
+    Returns:
+        tuple: ({attempt id: {'writing': {task: result}, 'speaking': {part: result}}},
+        set of attempt ids with a failed request per section, AICallRecords)
+    """
+    model = {'writing': WRITING_MODELS['openai'], 'speaking': SPEAKING_MODELS['openai']}
+    results = defaultdict(lambda: {'writing': {}, 'speaking': {}})
+    failed = defaultdict(set)
+    answered = set()
+    records = []
+    for row in read_jsonl(output_path(batch)):
+        section, attempt_id, number = row['custom_id'].split(':')
+        attempt_id, number = int(attempt_id), int(number)
+        answered.add(row['custom_id'])
+        text = _response_text(row)
+        records.append(_call_record(batch, section, row, text))
+        try:
+            if text is None:
+                raise ValueError((row.get('error') or {}).get('message') or 'request failed')
+            if section == 'writing':
+                result = parse_writing_response(text, require_scores=True)
+            else:
+                result = parse_speaking_response(text)
+                if result['overall_score'] is None:
+                    raise ValueError('No band scores in the model response')
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning('Batch %s: %s not graded: %s', batch.id, row['custom_id'], e)
+            failed[section].add(attempt_id)
+            continue
+        result['provider'] = f'batch:{batch.backend}'
+        result['model'] = model[section]
+        results[attempt_id][section][number] = result
+
+    # Requests without a result line were never answered.
+    for request in read_jsonl(input_path(batch)):
+        if request['custom_id'] not in answered:
+            section, attempt_id, _ = request['custom_id'].split(':')
+            failed[section].add(int(attempt_id))
+    return results, failed, records
+
+
+def apply(batch):
+    """
+    Write the batch's grades to the attempts' TestResults in bulk.
+
+    Returns:
+        int: TestResults updated
+    """
+    results, failed, records = _parse_results(batch)
+    existing = {
+        result.student_test_id: result
+        for result in TestResult.objects.filter(student_test_id__in=list(results))
+    }
+    to_create, to_update, graded_ids = [], [], []
+    for attempt_id, sections in results.items():
+        result = existing.get(attempt_id) or TestResult(student_test_id=attempt_id)
+        if sections['writing'] and attempt_id not in failed['writing']:
+            tasks = sections['writing']
+            scores = [tasks[number]['task_score'] for number in sorted(tasks)]
+            result.writing_score = Decimal(str(round(sum(scores) / len(scores) * 2) / 2))
+            result.writing_task1_score = tasks[1]['task_score'] if 1 in tasks else None
+            result.writing_task2_score = tasks[2]['task_score'] if 2 in tasks else None
+            result.writing_breakdown = {
+                f'task{number}{suffix}': (tasks[number][key] if number in tasks else None)
+                for suffix, key in (('', 'breakdown'), ('_feedback', 'feedback'),
+                                    ('_detailed_feedback', 'detailed_feedback'))
+                for number in (1, 2)
+            }
+            graded_ids.append(attempt_id)
+        if sections['speaking'] and attempt_id not in failed['speaking']:
+            parts = sections['speaking']
+            result.speaking_score = calculate_speaking_overall_score(
+                [parts[number]['overall_score'] for number in sorted(parts)]
+            )
+            result.speaking_breakdown = {f'part{number}': parts[number] for number in sorted(parts)}
+        result.overall_score = overall_band(
+            result.listening_score, result.reading_score, result.writing_score, result.speaking_score
+        )
+        (to_update if result.pk else to_create).append(result)
+
+    fields = ['overall_score']
+    if 'writing' in batch.sections:
+        fields += ['writing_score', 'writing_task1_score', 'writing_task2_score', 'writing_breakdown']
+    if 'speaking' in batch.sections:
+        fields += ['speaking_score', 'speaking_breakdown']
+    with transaction.atomic():
+        TestResult.objects.bulk_create(to_create, batch_size=500)
+        TestResult.objects.bulk_update(to_update, fields, batch_size=500)
+        AICallRecord.objects.bulk_create(records, batch_size=500)
+        StudentTest.objects.filter(id__in=graded_ids, status='submitted').update(status='graded')
+        batch.status = 'applied'
+        batch.results_applied = len(to_create) + len(to_update)
+        batch.failed_count = sum(len(ids) for ids in failed.values())
+        batch.applied_at = timezone.now()
+        batch.save(update_fields=['status', 'results_applied', 'failed_count', 'applied_at'])
+    return batch.results_applied
+
+
+def run_batch(batch, wait=False, poll_interval=None, on_progress=None):
+    """
+    Advance a batch as far as it goes: build, submit, poll, apply.
+
+    Without ``wait`` a running batch is polled once and left ``submitted``;
+    run it again later to continue. ``on_progress(batch)`` is called after
+    each step.
+
+    Returns:
+        GradingBatch: The batch in its new status
+    """
+    backend = get_backend(batch.backend)
+    interval = backend.poll_interval if poll_interval is None else poll_interval
+    while batch.status not in ('applied', 'failed'):
+        if batch.status == 'building':
+            build(batch)
+        elif batch.status == 'built':
+            submit(batch)
+        elif batch.status == 'submitted':
+            if poll(batch) == 'submitted':
+                if on_progress:
+                    on_progress(batch)
+                if not wait:
+                    return batch
+                time.sleep(interval)
+                continue
+        elif batch.status == 'completed':
+            apply(batch)
+        if on_progress:
+            on_progress(batch)
+    return batch
@@ -0,0 +1,221 @@
+"""
+Vectorized reading/listening grading of a whole cohort.
+
+After a mock every attempt of a variant is graded at once: all responses are
+loaded in one query into a students x questions answer matrix, normalized and
+compared against the compiled answer key with NumPy, and raw and band scores
+come out for everyone together. TestResult rows are written with one bulk
+insert and one bulk update. The same matrix gives per-question item
+statistics:
+
+- facility: share of students who answered the question correctly
+- discrimination: facility in the top 27% of the section minus facility in
+  the bottom 27% (ranked by section raw score)
+
+Writing and speaking are not touched; attempts with ungraded writing stay
+``submitted`` until their writing is graded.
+"""
+
+import time
+from decimal import Decimal
+
+from django.db import transaction
+
+from student_portal.models import StudentTest, TestResponse, TestResult
+from .answer_keys import get_answer_key
+from .ielts_conversion import LISTENING_BANDS, band_scores, reading_table_for
+
+# Share of students in the upper and lower groups of the discrimination index.
+DISCRIMINATION_GROUP = 0.27
+
+SECTIONS = ('listening', 'reading')
+
+
+def _answer_matrix(attempts, attempt_ids, columns):
+    """
+    Load responses into an answer matrix.
+
+    Returns:
+        tuple: (answers as a str array, answered mask), both attempts x columns
+    """
+    import numpy as np
+
+    rows = {attempt_id: index for index, attempt_id in enumerate(attempt_ids)}
+    answers = np.full((len(attempt_ids), len(columns)), '', dtype=object)
+    answered = np.zeros((len(attempt_ids), len(columns)), dtype=bool)
+    responses = TestResponse.objects.filter(
+        student_test__in=attempts,
+        section__in=SECTIONS
+    ).values_list('student_test_id', 'section', 'question_number', 'answer')
+    for attempt_id, section, question_number, answer in responses.iterator(chunk_size=5000):
+        column = columns.get((section, question_number))
+        row = rows.get(attempt_id)
+        if column is not None and row is not None:
+            answers[row, column] = answer
+            answered[row, column] = True
+    return answers.astype(str), answered
+
+
+def _correct_matrix(answers, answered, items):
+    """Compare normalized answers with each question's accepted options."""
+    import numpy as np
+
+    normalized = np.char.strip(answers)
+    insensitive = np.array([not item.case_sensitive for item in items], dtype=bool)
+    if insensitive.any():
+        normalized[:, insensitive] = np.char.upper(normalized[:, insensitive])
+
+    correct = np.zeros(answers.shape, dtype=bool)
+    for column, item in enumerate(items):
+        correct[:, column] = np.isin(normalized[:, column], list(item.options))
+    return correct & answered
+
+
+def item_statistics(correct, raw_scores):
+    """
+    Facility and discrimination index of each question of one section.
+
+    Args:
+        correct: Boolean matrix, students x questions of the section
+        raw_scores: Section raw score per student
+
+    Returns:
+        tuple: (facility, discrimination) arrays, one value per question
+    """
+    import numpy as np
+
+    students = correct.shape[0]
+    facility = correct.mean(axis=0)
+    group = max(1, int(round(students * DISCRIMINATION_GROUP)))
+    if students < 2:
+        return facility, np.zeros(correct.shape[1])
+    order = np.argsort(raw_scores, kind='stable')
+    lower = correct[order[:group]].mean(axis=0)
+    upper = correct[order[-group:]].mean(axis=0)
+    return facility, upper - lower
+
+
+def overall_band(*scores):
+    """Overall band as TestResult.calculate_overall_score computes it."""
+    scores = [float(score) for score in scores if score is not None]
+    if not scores:
+        return None
+    return round(sum(scores) / len(scores) * 2) / 2
+
+
+def _breakdown(items, answers, answered, correct, raw_score, band):
+    question_results = {}
+    for column, item in enumerate(items):
+        if answered[column]:
+            question_results[item.question_number] = {
+                'correct': bool(correct[column]),
+                'student_answer': str(answers[column]),
+                'correct_answer': item.correct_answer,
+                'alternative_answers': item.alternative_answers,
+            }
+    return {
+        'correct': raw_score,
+        'total': len(items),
+        'raw_score': raw_score,
+        'band_score': band,
+        'question_results': question_results,
+    }
+
+
+def grade_cohort(variant, include_graded=True):
+    """
+    Grade reading and listening of every submitted attempt of a variant at once.
+
+    Args:
+        variant: Variant whose attempts are graded
+        include_graded: Also regrade attempts that are already graded
+
+    Returns:
+        dict: attempts graded, results created/updated, attempts marked
+        graded, duration in ms and per-question item statistics
+    """
+    started = time.perf_counter()
+    statuses = ['submitted', 'graded'] if include_graded else ['submitted']
+    # Used as a subquery below so large cohorts do not hit parameter limits.
+    attempts = StudentTest.objects.filter(variant=variant, status__in=statuses).values('id')
+    attempt_ids = list(attempts.order_by('id').values_list('id', flat=True))
+    report = {'attempts': len(attempt_ids), 'created': 0, 'updated': 0, 'marked_graded': 0, 'items': []}
+    if not attempt_ids:
+        report['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return report
+
+    answer_key = get_answer_key(variant.id)
+    ordered = [(section, item) for section in SECTIONS for item in answer_key.sections.get(section, [])]
+    items = [item for _, item in ordered]
+    columns = {(section, item.question_number): index for index, (section, item) in enumerate(ordered)}
+    answers, answered = _answer_matrix(attempts, attempt_ids, columns)
+    correct = _correct_matrix(answers, answered, items)
+
+    tables = {'listening': LISTENING_BANDS, 'reading': reading_table_for(variant)}
+    sections = {}
+    offset = 0
+    for section in SECTIONS:
+        section_items = answer_key.sections.get(section, [])
+        if not section_items:
+            continue
+        span = slice(offset, offset + len(section_items))
+        offset += len(section_items)
+        raw_scores = correct[:, span].sum(axis=1)
+        facility, discrimination = item_statistics(correct[:, span], raw_scores)
+        sections[section] = (span, section_items, raw_scores, band_scores(raw_scores, tables[section]))
+        for item, item_facility, item_discrimination, answered_count in zip(
+            section_items, facility, discrimination, answered[:, span].sum(axis=0)
+        ):
+            report['items'].append({
+                'section': section,
+                'question_number': item.question_number,
+                'facility': round(float(item_facility), 3),
+                'discrimination': round(float(item_discrimination), 3),
+                'answered': int(answered_count),
+            })
+
+    existing = {
+        result.student_test_id: result
+        for result in TestResult.objects.filter(student_test__in=attempts)
+    }
+    to_create, to_update = [], []
+    for row, attempt_id in enumerate(attempt_ids):
+        result = existing.get(attempt_id) or TestResult(student_test_id=attempt_id)
+        for section, (span, section_items, raw_scores, bands) in sections.items():
+            raw_score = int(raw_scores[row])
+            band = float(bands[row])
+            setattr(result, f'{section}_score', Decimal(str(band)))
+            setattr(result, f'{section}_breakdown', _breakdown(
+                section_items, answers[row, span], answered[row, span], correct[row, span], raw_score, band
+            ))
+        result.overall_score = overall_band(
+            result.listening_score, result.reading_score, result.writing_score, result.speaking_score
+        )
+        (to_update if result.pk else to_create).append(result)
+
+    # Attempts with writing still to grade stay submitted for the writing grader.
+    with_writing = set(
+        TestResponse.objects.filter(student_test__in=attempts, section='writing')
+        .exclude(answer='').values_list('student_test_id', flat=True)
+    )
+    done_ids = [
+        attempt_id for attempt_id in attempt_ids
+        if attempt_id not in with_writing
+        or (attempt_id in existing and existing[attempt_id].writing_score is not None)
+    ]
+
+    with transaction.atomic():
+        TestResult.objects.bulk_create(to_create, batch_size=500)
+        TestResult.objects.bulk_update(
+            to_update,
+            ['listening_score', 'reading_score', 'listening_breakdown', 'reading_breakdown', 'overall_score'],
+            batch_size=500
+        )
+        report['marked_graded'] = StudentTest.objects.filter(
+            id__in=done_ids, status='submitted'
+        ).update(status='graded')
+
+    report['created'] = len(to_create)
+    report['updated'] = len(to_update)
+    report['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return report
@@ -0,0 +1,191 @@
+"""
+Persistent cache of AI grading results.
+
+Grading the same response again (an admin regrading, a retried submit or
+grading job) used to call the LLM every time. Results are now stored in the
+database under a SHA-256 of everything that determines them: the kind of
+grading, the normalized response text, the task details, the prompt template
+version, the provider and the model. Changing the prompt or the model changes
+the key, so stale results are never served.
+
+Only real AI results (``ai_used``) are stored. The table is capped at
+AI_GRADING_CACHE_MAX_ENTRIES rows; the least recently used entries are
+evicted first (0 disables the cache). Pass ``bypass=True`` to force a fresh
+grade; its result replaces the stored one. Hit/miss counters are kept as
+ProcessStat rows, so the admin stats add up the grading workers' counts.
+"""
+
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from student_portal.process_stats import get_counts, increment
+from .models import AIGradingCacheEntry
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = 'ai_grading_cache:{name}'
+METRICS = ('hits', 'misses', 'bypassed', 'stored', 'evicted')
+
+
+def max_entries() -> int:
+    return settings.AI_GRADING_CACHE_MAX_ENTRIES
+
+
+def normalize_response(text) -> str:
+    """
+    Normalize a response so whitespace-only differences share a key.
+
+    Paragraph breaks are kept: they matter for coherence and cohesion.
+    """
+    text = unicodedata.normalize('NFC', str(text or '')).replace('\r\n', '\n')
+    text = re.sub(r'[ \t\f\v]+', ' ', text)
+    text = re.sub(r' ?\n ?', '\n', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+def cache_key(kind, response, *, prompt_version, provider, model, **details) -> str:
+    """Hash what determines a grading result into a cache key."""
+    payload = json.dumps(
+        {
+            'kind': kind,
+            'response': normalize_response(response),
+            'prompt_version': prompt_version,
+            'provider': provider,
+            'model': model,
+            'details': details,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _count(name, amount=1):
+    try:
+        increment(METRICS_KEY.format(name=name), amount)
+    except Exception:
+        logger.exception('Counting AI grading cache %s failed', name)
+
+
+def _lookup(keys):
+    """Return the stored result of the first of ``keys`` (preference order) present."""
+    entries = {
+        key: (entry_id, result)
+        for key, entry_id, result in AIGradingCacheEntry.objects.filter(key__in=keys).values_list('key', 'id', 'result')
+    }
+    for key in keys:
+        if key in entries:
+            entry_id, result = entries[key]
+            AIGradingCacheEntry.objects.filter(id=entry_id).update(hits=F('hits') + 1, last_used_at=timezone.now())
+            return result
+    return None
+
+
+def _store(key, kind, provider, model, result):
+    AIGradingCacheEntry.objects.bulk_create(
+        [AIGradingCacheEntry(
+            key=key, kind=kind, provider=provider, model=model, result=result, last_used_at=timezone.now()
+        )],
+        update_conflicts=True,
+        unique_fields=['key'],
+        update_fields=['provider', 'model', 'result', 'last_used_at']
+    )
+    _count('stored')
+    evict()
+
+
+def evict(limit=None) -> int:
+    """Delete the least recently used entries above ``limit``. Returns the number deleted."""
+    limit = max_entries() if limit is None else limit
+    excess = AIGradingCacheEntry.objects.count() - limit
+    if excess <= 0:
+        return 0
+    stale_ids = list(
+        AIGradingCacheEntry.objects.order_by('last_used_at', 'id').values_list('id', flat=True)[:excess]
+    )
+    deleted, _ = AIGradingCacheEntry.objects.filter(id__in=stale_ids).delete()
+    if deleted:
+        _count('evicted', deleted)
+    return deleted
+
+
+def lookup(keys, bypass=False):
+    """
+    Return the stored result of one of ``keys``, or None (counted as a miss).
+
+    Args:
+        keys: {provider: (key from cache_key(), model)} in preference order
+        bypass: Skip the lookup (forced regrade)
+    """
+    if max_entries() <= 0 or not keys:
+        return None
+    if bypass:
+        _count('bypassed')
+        return None
+    try:
+        result = _lookup([key for key, _ in keys.values()])
+    except Exception:
+        logger.exception('AI grading cache lookup failed')
+        result = None
+    _count('hits' if result is not None else 'misses')
+    return result
+
+
+def store(kind, keys, result):
+    """
+    Store a fresh result under the key of the provider that produced it.
+
+    The provider that answers is only known after the call, so there is a key
+    per provider that may answer; the result is stored under the key of the
+    provider named in its ``provider`` field. Non-AI results are not stored.
+    """
+    if max_entries() <= 0 or not keys:
+        return
+    provider = result.get('provider') if isinstance(result, dict) else None
+    if provider in keys and result.get('ai_used'):
+        key, model = keys[provider]
+        try:
+            _store(key, kind, provider, model, result)
+        except Exception:
+            logger.exception('Storing AI grading result failed')
+
+
+def cached_grading(kind, keys, grade, bypass=False):
+    """
+    Return a stored result for one of ``keys``, or call ``grade()`` and store its result.
+
+    Args:
+        kind: 'writing' or 'speaking'
+        keys: {provider: (key from cache_key(), model)} in preference order
+        grade: Callable producing the grading result
+        bypass: Skip the lookup (forced regrade); the new result is stored
+
+    Returns:
+        dict: The grading result
+    """
+    result = lookup(keys, bypass)
+    if result is not None:
+        return result
+    result = grade()
+    store(kind, keys, result)
+    return result
+
+
+def get_cache_stats():
+    """Return hit/miss counters, hit rate and the number of stored entries."""
+    counts = get_counts([METRICS_KEY.format(name=name) for name in METRICS])
+    stats = {name: counts[METRICS_KEY.format(name=name)] for name in METRICS}
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+    stats['entries'] = AIGradingCacheEntry.objects.count()
+    stats['max_entries'] = max_entries()
+    return stats
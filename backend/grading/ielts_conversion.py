@@ -1,140 +1,96 @@
 """
 IELTS Band Score Conversion Tables
 Official conversion charts for Listening and Reading sections.
+
+Each table is a 41-entry tuple indexed by the raw score (0-40), built once
+at import, so a conversion is a clamp and an index. ``band_scores`` converts
+a whole array of raw scores at once with NumPy.
 """
 
+MAX_RAW_SCORE = 40
 
-def listening_band_score(raw_score: int) -> float:
+ACADEMIC = 'academic'
+GENERAL_TRAINING = 'general_training'
+
+
+def _expand(thresholds):
+    """Expand {lowest raw score: band} into a band per raw score 0-40."""
+    bands = []
+    for raw_score in range(MAX_RAW_SCORE + 1):
+        bands.append(thresholds[max(score for score in thresholds if score <= raw_score)])
+    return tuple(bands)
+
+
+# Official IELTS Listening conversion table:
+# 39-40 = 9.0, 37-38 = 8.5, 35-36 = 8.0, 33-34 = 7.5, 30-32 = 7.0,
+# 27-29 = 6.5, 23-26 = 6.0, 20-22 = 5.5, 16-19 = 5.0, 13-15 = 4.5,
+# 10-12 = 4.0, 7-9 = 3.5, 4-6 = 3.0, 2-3 = 2.5, 1 = 2.0, 0 = 1.0
+LISTENING_BANDS = _expand({
+    39: 9.0, 37: 8.5, 35: 8.0, 33: 7.5, 30: 7.0, 27: 6.5, 23: 6.0, 20: 5.5,
+    16: 5.0, 13: 4.5, 10: 4.0, 7: 3.5, 4: 3.0, 2: 2.5, 1: 2.0, 0: 1.0,
+})
+
+# Academic Reading uses the same boundaries as Listening.
+ACADEMIC_READING_BANDS = LISTENING_BANDS
+
+# Official IELTS General Training Reading conversion table:
+# 40 = 9.0, 39 = 8.5, 37-38 = 8.0, 36 = 7.5, 34-35 = 7.0, 32-33 = 6.5,
+# 30-31 = 6.0, 27-29 = 5.5, 23-26 = 5.0, 19-22 = 4.5, 15-18 = 4.0,
+# 12-14 = 3.5, 9-11 = 3.0, 6-8 = 2.5; below 6 is not published and
+# continues with 1-5 = 2.0, 0 = 1.0 like the Academic table.
+GENERAL_TRAINING_READING_BANDS = _expand({
+    40: 9.0, 39: 8.5, 37: 8.0, 36: 7.5, 34: 7.0, 32: 6.5, 30: 6.0, 27: 5.5,
+    23: 5.0, 19: 4.5, 15: 4.0, 12: 3.5, 9: 3.0, 6: 2.5, 1: 2.0, 0: 1.0,
+})
+
+READING_BANDS = {
+    ACADEMIC: ACADEMIC_READING_BANDS,
+    GENERAL_TRAINING: GENERAL_TRAINING_READING_BANDS,
+}
+
+# NumPy copies of the tables, created on first batch conversion.
+_table_arrays = {}
+
+
+def band_score(raw_score: int, table=LISTENING_BANDS) -> float:
+    """Convert one raw score (out of 40) to a band score with ``table``."""
+    return table[max(0, min(MAX_RAW_SCORE, int(raw_score)))]
+
+
+def band_scores(raw_scores, table=LISTENING_BANDS):
     """
-    Convert Listening raw score (out of 40) to IELTS band score.
-    
-    Official IELTS Listening conversion table:
-    39-40 = 9.0
-    37-38 = 8.5
-    35-36 = 8.0
-    33-34 = 7.5
-    30-32 = 7.0
-    27-29 = 6.5
-    23-26 = 6.0
-    20-22 = 5.5
-    16-19 = 5.0
-    13-15 = 4.5
-    10-12 = 4.0
-    7-9 = 3.5
-    4-6 = 3.0
-    2-3 = 2.5
-    1 = 2.0
-    0 = 1.0
+    Convert an array of raw scores to band scores in one vectorized lookup.
+
+    Args:
+        raw_scores: Sequence or NumPy array of raw scores (any shape)
+        table: One of the 41-entry band tables
+
+    Returns:
+        numpy.ndarray: Band scores (float) with the shape of ``raw_scores``
     """
-    conversion_table = {
-        39: 9.0, 40: 9.0,
-        37: 8.5, 38: 8.5,
-        35: 8.0, 36: 8.0,
-        33: 7.5, 34: 7.5,
-        30: 7.0, 31: 7.0, 32: 7.0,
-        27: 6.5, 28: 6.5, 29: 6.5,
-        23: 6.0, 24: 6.0, 25: 6.0, 26: 6.0,
-        20: 5.5, 21: 5.5, 22: 5.5,
-        16: 5.0, 17: 5.0, 18: 5.0, 19: 5.0,
-        13: 4.5, 14: 4.5, 15: 4.5,
-        10: 4.0, 11: 4.0, 12: 4.0,
-        7: 3.5, 8: 3.5, 9: 3.5,
-        4: 3.0, 5: 3.0, 6: 3.0,
-        2: 2.5, 3: 2.5,
-        1: 2.0,
-        0: 1.0,
-    }
-    
-    # Clamp score to valid range
-    raw_score = max(0, min(40, raw_score))
-    
-    # Find band score
-    for score, band in sorted(conversion_table.items(), reverse=True):
-        if raw_score >= score:
-            return band
-    
-    return 1.0
+    import numpy as np
+
+    bands = _table_arrays.get(id(table))
+    if bands is None:
+        bands = _table_arrays[id(table)] = np.array(table, dtype=float)
+    raw_scores = np.clip(np.asarray(raw_scores, dtype=np.int64), 0, MAX_RAW_SCORE)
+    return bands[raw_scores]
+
+
+def listening_band_score(raw_score: int) -> float:
+    """Convert Listening raw score (out of 40) to IELTS band score."""
+    return band_score(raw_score, LISTENING_BANDS)
 
 
 def reading_band_score(raw_score: int, academic: bool = True) -> float:
     """
     Convert Reading raw score (out of 40) to IELTS band score.
-    
-    Note: Academic and General Training have different conversion tables.
-    This implementation uses Academic conversion (more common for mock tests).
-    
-    Official IELTS Academic Reading conversion table:
-    39-40 = 9.0
-    37-38 = 8.5
-    35-36 = 8.0
-    33-34 = 7.5
-    30-32 = 7.0
-    27-29 = 6.5
-    23-26 = 6.0
-    20-22 = 5.5
-    16-19 = 5.0
-    13-15 = 4.5
-    10-12 = 4.0
-    7-9 = 3.5
-    4-6 = 3.0
-    2-3 = 2.5
-    1 = 2.0
-    0 = 1.0
+
+    Academic and General Training have different conversion tables.
     """
-    if academic:
-        # Academic Reading conversion (same as Listening)
-        return listening_band_score(raw_score)
-    else:
-        # General Training Reading conversion (slightly different)
-        conversion_table = {
-            40: 9.0,
-            39: 9.0,
-            38: 8.5,
-            37: 8.5,
-            36: 8.0,
-            35: 8.0,
-            34: 7.5,
-            33: 7.5,
-            32: 7.0,
-            31: 7.0,
-            30: 7.0,
-            29: 6.5,
-            28: 6.5,
-            27: 6.5,
-            26: 6.0,
-            25: 6.0,
-            24: 6.0,
-            23: 6.0,
-            22: 5.5,
-            21: 5.5,
-            20: 5.5,
-            19: 5.0,
-            18: 5.0,
-            17: 5.0,
-            16: 5.0,
-            15: 4.5,
-            14: 4.5,
-            13: 4.5,
-            12: 4.0,
-            11: 4.0,
-            10: 4.0,
-            9: 3.5,
-            8: 3.5,
-            7: 3.5,
-            6: 3.0,
-            5: 3.0,
-            4: 3.0,
-            3: 2.5,
-            2: 2.5,
-            1: 2.0,
-            0: 1.0,
-        }
-        
-        raw_score = max(0, min(40, raw_score))
-        
-        for score, band in sorted(conversion_table.items(), reverse=True):
-            if raw_score >= score:
-                return band
-        
-        return 1.0
+    return band_score(raw_score, ACADEMIC_READING_BANDS if academic else GENERAL_TRAINING_READING_BANDS)
+
 
+def reading_table_for(variant):
+    """Return the Reading conversion table for a variant's module."""
+    return READING_BANDS.get(getattr(variant, 'module', ACADEMIC), ACADEMIC_READING_BANDS)
@@ -0,0 +1,206 @@
+"""
+Database-backed grading job queue.
+
+Submitting a test grades reading and listening inline (no AI involved) and
+enqueues a GradingJob for writing, whose AI calls take seconds to tens of
+seconds. ``manage.py run_grading_worker`` processes the queue; run several for
+more throughput.
+
+A worker claims a batch with a conditional UPDATE stamped with its own id and
+claim time, like the auto-submitter; on PostgreSQL candidate rows are also
+locked with SKIP LOCKED so workers pick disjoint batches. A failed run is
+retried with exponential backoff until ``max_attempts``; the last attempt
+grades a task whose AI call fails by word count (as grading did before the
+queue), so every submitted attempt ends up graded. A job left ``running`` by a
+worker that died is picked up again once its lease expires.
+"""
+
+import logging
+import os
+import random
+import socket
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from student_portal.models import TestResponse
+from student_portal.process_stats import get_stats, record_stats
+from .models import GradingJob
+from .services import store_reading_listening, store_writing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5
+
+# A running job not finished within this long is considered abandoned.
+LEASE_SECONDS = 10 * 60
+
+# Retry delays: BACKOFF_BASE_SECONDS * 2^(attempt - 1), capped, plus jitter.
+BACKOFF_BASE_SECONDS = 15
+BACKOFF_MAX_SECONDS = 15 * 60
+
+# ProcessStat holding the stats of the most recent worker run (for monitoring).
+LAST_WORKER_RUN_KEY = 'grading_jobs:last_run'
+
+
+def worker_name() -> str:
+    """Identify this worker process in ``locked_by``."""
+    return f'{socket.gethostname()}:{os.getpid()}'[:64]
+
+
+def backoff_seconds(attempt: int) -> float:
+    """Delay before retrying after the given (1-based) failed attempt."""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+    return delay * random.uniform(1.0, 1.25)
+
+
+def enqueue_writing(student_test) -> GradingJob:
+    """Queue writing grading for an attempt, reusing a pending job if there is one."""
+    pending = GradingJob.objects.filter(
+        student_test=student_test,
+        kind='writing',
+        status__in=['queued', 'running']
+    ).first()
+    if pending:
+        return pending
+    return GradingJob.objects.create(student_test=student_test, kind='writing', run_after=timezone.now())
+
+
+def grade_submitted_test(student_test):
+    """
+    Grade reading/listening now and queue writing.
+
+    Attempts without any writing are graded completely right away (there is
+    nothing to send to the AI).
+
+    Returns:
+        tuple: (TestResult, GradingJob or None)
+    """
+    result = store_reading_listening(student_test)
+    has_writing = TestResponse.objects.filter(
+        student_test=student_test,
+        section='writing'
+    ).exclude(answer='').exists()
+    if not has_writing:
+        return store_writing(student_test), None
+    return result, enqueue_writing(student_test)
+
+
+def _claimable(now):
+    return Q(status='queued', run_after__lte=now) | Q(
+        status='running', locked_at__lt=now - timedelta(seconds=LEASE_SECONDS)
+    )
+
+
+def _claim_batch(worker, batch_size, job_ids=None):
+    """Claim up to ``batch_size`` due jobs (among ``job_ids`` if given). Returns the claimed jobs."""
+    with transaction.atomic():
+        now = timezone.now()
+        candidates = GradingJob.objects.filter(_claimable(now))
+        if job_ids is not None:
+            candidates = candidates.filter(id__in=job_ids)
+        candidate_ids = list(
+            candidates
+            .order_by('run_after')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not candidate_ids:
+            return []
+        GradingJob.objects.filter(_claimable(now), id__in=candidate_ids).update(
+            status='running',
+            locked_by=worker,
+            locked_at=now,
+            attempts=F('attempts') + 1
+        )
+    return list(
+        GradingJob.objects.filter(id__in=candidate_ids, locked_by=worker, locked_at=now)
+        .select_related('student_test__variant')
+    )
+
+
+def claim_job(job_id, worker):
+    """Claim one due job by id, e.g. to grade it while streaming. Returns the job or None."""
+    jobs = _claim_batch(worker, 1, [job_id])
+    return jobs[0] if jobs else None
+
+
+def _finish(job, worker, status, error=''):
+    GradingJob.objects.filter(id=job.id, locked_by=worker, status='running').update(
+        status=status,
+        last_error=error,
+        finished_at=timezone.now()
+    )
+
+
+def run_job(job, worker):
+    """
+    Run one claimed job.
+
+    Returns:
+        str: 'succeeded', 'retried' or 'failed'
+    """
+    student_test = job.student_test
+    if student_test.status not in ('submitted', 'graded'):
+        # Reset by start-test after it was queued; nothing to grade.
+        _finish(job, worker, 'failed', 'Attempt is no longer submitted.')
+        return 'failed'
+
+    last_attempt = job.attempts >= job.max_attempts
+    try:
+        store_writing(student_test, fallback_on_error=last_attempt)
+    except Exception as e:
+        logger.exception('Grading job %s (attempt %s) failed', job.id, job.attempts)
+        error = f'{type(e).__name__}: {e}'
+        if last_attempt:
+            _finish(job, worker, 'failed', error)
+            return 'failed'
+        GradingJob.objects.filter(id=job.id, locked_by=worker, status='running').update(
+            status='queued',
+            last_error=error,
+            run_after=timezone.now() + timedelta(seconds=backoff_seconds(job.attempts)),
+            locked_by=''
+        )
+        return 'retried'
+
+    _finish(job, worker, 'succeeded')
+    return 'succeeded'
+
+
+def process_jobs(batch_size=DEFAULT_BATCH_SIZE, worker=None, job_ids=None):
+    """
+    Claim and run one batch of due jobs, only among ``job_ids`` if given.
+
+    Returns:
+        dict: jobs claimed/succeeded/retried/failed and duration in ms
+    """
+    worker = worker or worker_name()
+    started = time.perf_counter()
+    stats = {'claimed': 0, 'succeeded': 0, 'retried': 0, 'failed': 0}
+
+    jobs = _claim_batch(worker, batch_size, job_ids)
+    stats['claimed'] = len(jobs)
+    for job in jobs:
+        stats[run_job(job, worker)] += 1
+
+    stats['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    stats['run_at'] = timezone.now().isoformat()
+    if jobs:
+        record_stats(LAST_WORKER_RUN_KEY, stats)
+    return stats
+
+
+def get_queue_stats():
+    """Return job counts per status and the most recent non-empty worker run."""
+    counts = dict(
+        GradingJob.objects.values_list('status').annotate(count=Count('id')).values_list('status', 'count')
+    )
+    return {
+        'queued': counts.get('queued', 0),
+        'running': counts.get('running', 0),
+        'failed': counts.get('failed', 0),
+        'last_run': get_stats(LAST_WORKER_RUN_KEY),
+    }
@@ -0,0 +1,131 @@
+"""
+Management command to regrade writing/speaking of a cohort through a batch API.
+
+Creates a GradingBatch for the selected attempts and advances it; run it
+again with --resume to continue a batch that is still running or was
+interrupted.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.models import Variant
+from grading.batch_grading import BACKENDS, SECTIONS, create_batch, run_batch
+from grading.models import GradingBatch
+from student_portal.models import StudentTest
+
+
+class Command(BaseCommand):
+    help = 'Regrade writing/speaking of many attempts through a provider batch API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--variant',
+            type=str,
+            help='Regrade the submitted and graded attempts of this variant (code or id)'
+        )
+        parser.add_argument(
+            '--attempts',
+            type=str,
+            help='Comma-separated StudentTest ids to regrade'
+        )
+        parser.add_argument(
+            '--sections',
+            nargs='+',
+            choices=SECTIONS,
+            default=list(SECTIONS),
+            help='Sections to regrade (default: writing speaking)'
+        )
+        parser.add_argument(
+            '--backend',
+            choices=sorted(BACKENDS),
+            default='local',
+            help='Batch backend (default: local file stand-in)'
+        )
+        parser.add_argument(
+            '--resume',
+            nargs='?',
+            const='latest',
+            help='Continue batch ID (default: the latest unfinished batch)'
+        )
+        parser.add_argument(
+            '--wait',
+            action='store_true',
+            help='Poll until the batch is done and apply it'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=None,
+            help="Seconds between polls with --wait (default: the backend's)"
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List recent batches and exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for batch in GradingBatch.objects.all()[:20]:
+                self._report(batch)
+            return
+
+        if options['resume']:
+            batch = self._resumed(options['resume'])
+        else:
+            batch = create_batch(self._attempts(options), options['sections'], options['backend'])
+            self.stdout.write(
+                f'Batch {batch.id}: {batch.request_count} requests for '
+                f'{len(batch.student_test_ids)} attempts'
+            )
+
+        batch = run_batch(
+            batch,
+            wait=options['wait'],
+            poll_interval=options['poll_interval'],
+            on_progress=self._report if options['verbosity'] > 1 else None
+        )
+        if batch.status == 'failed':
+            raise CommandError(f'Batch {batch.id} failed: {batch.error}')
+        if batch.status == 'applied':
+            self.stdout.write(self.style.SUCCESS(
+                f'Batch {batch.id} applied: {batch.results_applied} results updated, '
+                f'{batch.failed_count} attempts kept their grade for a failed section'
+            ))
+        else:
+            self._report(batch)
+            self.stdout.write(f'Continue with: manage.py batch_regrade --resume {batch.id}')
+
+    def _resumed(self, batch_id):
+        unfinished = GradingBatch.objects.exclude(status__in=['applied', 'failed'])
+        if batch_id == 'latest':
+            batch = unfinished.first()
+        else:
+            batch = GradingBatch.objects.filter(id=batch_id).first() if batch_id.isdigit() else None
+        if batch is None:
+            raise CommandError(f'No unfinished batch "{batch_id}"')
+        if batch.status in ('applied', 'failed'):
+            raise CommandError(f'Batch {batch.id} is already {batch.status}')
+        return batch
+
+    def _attempts(self, options):
+        if options['attempts']:
+            ids = [int(attempt_id) for attempt_id in options['attempts'].split(',') if attempt_id.strip()]
+            return list(StudentTest.objects.filter(id__in=ids).values_list('id', flat=True))
+        if not options['variant']:
+            raise CommandError('Select attempts with --variant or --attempts (or use --resume/--list)')
+        variant = Variant.objects.filter(code=options['variant']).first()
+        if variant is None and options['variant'].isdigit():
+            variant = Variant.objects.filter(id=int(options['variant'])).first()
+        if variant is None:
+            raise CommandError(f'Variant "{options["variant"]}" not found')
+        return list(
+            StudentTest.objects.filter(variant=variant, status__in=['submitted', 'graded'])
+            .values_list('id', flat=True)
+        )
+
+    def _report(self, batch):
+        self.stdout.write(
+            f'Batch {batch.id} [{batch.backend}] {batch.status}: '
+            f'{batch.completed_count}/{batch.request_count} answered, {batch.failed_count} failed'
+        )
@@ -0,0 +1,124 @@
+"""
+Management command to benchmark reading/listening grading.
+
+Seeds a variant with a full answer key (with alternatives and a few
+case-sensitive questions) and a cohort of submitted attempts, then grades
+every attempt with the compiled answer key next to the previous per-question
+loop and checks both produce the same results. All rows are rolled back.
+"""
+
+import random
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from exams.models import Answer
+from grading.answer_keys import answer_key_cache_key
+from student_portal.active_attempts import cache_is_shared
+from grading.services import grade_reading_listening
+from student_portal.benchmarking import measure, percentile, rolled_back, seed_cohort
+from student_portal.models import StudentTest, TestResponse
+
+QUESTIONS_PER_SECTION = 40
+CHOICES = ['A', 'B', 'C', 'D', 'TRUE', 'FALSE', 'NOT GIVEN', 'river', 'Oxford']
+
+
+def per_question_grade(student_test):
+    """The matching loop grade_reading_listening used before compiled keys."""
+    responses = TestResponse.objects.filter(student_test=student_test, section__in=['reading', 'listening'])
+    results = {'reading': {'correct': 0, 'total': 0}, 'listening': {'correct': 0, 'total': 0}}
+    for answer in Answer.objects.filter(variant=student_test.variant):
+        results[answer.section]['total'] += 1
+        student_response = responses.filter(section=answer.section, question_number=answer.question_number).first()
+        if not student_response:
+            continue
+        student_answer = str(student_response.answer).strip()
+        correct_options = [str(answer.correct_answer).strip()]
+        if isinstance(answer.alternative_answers, list):
+            correct_options.extend(str(a).strip() for a in answer.alternative_answers)
+        if answer.case_sensitive:
+            is_correct = student_answer in correct_options
+        else:
+            is_correct = student_answer.upper() in [option.upper() for option in correct_options]
+        if is_correct:
+            results[answer.section]['correct'] += 1
+    return results
+
+
+class Command(BaseCommand):
+    help = 'Benchmark reading/listening grading: compiled answer key against the per-question loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--attempts',
+            type=int,
+            default=100,
+            help='Submitted attempts graded per variant (default: 100)'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(15)
+
+        with rolled_back():
+            variant, students, _ = seed_cohort(options['attempts'], with_admin=False)
+            keys = {}
+            for section in ('listening', 'reading'):
+                for question in range(1, QUESTIONS_PER_SECTION + 1):
+                    correct = rng.choice(CHOICES)
+                    keys[(section, question)] = correct
+                    Answer.objects.create(
+                        variant=variant,
+                        section=section,
+                        question_number=question,
+                        correct_answer=correct,
+                        alternative_answers=[correct.lower(), f'{correct} '] if question % 3 == 0 else None,
+                        case_sensitive=question % 10 == 0
+                    )
+
+            StudentTest.objects.bulk_create([
+                StudentTest(student=student, variant=variant, status='submitted') for student in students
+            ])
+            attempts = list(StudentTest.objects.filter(variant=variant).select_related('variant'))
+            TestResponse.objects.bulk_create([
+                TestResponse(
+                    student_test=attempt,
+                    section=section,
+                    question_number=question,
+                    answer=f' {correct.lower()}' if rng.random() < 0.6 else rng.choice(CHOICES)
+                )
+                for attempt in attempts
+                for (section, question), correct in keys.items()
+                if rng.random() < 0.95
+            ], batch_size=1000)
+
+            cache.delete(answer_key_cache_key(variant.id))
+            cold = measure(grade_reading_listening, attempts[0])
+            compiled = [measure(grade_reading_listening, attempt) for attempt in attempts]
+            legacy = [measure(per_question_grade, attempt) for attempt in attempts]
+
+            mismatches = sum(
+                1 for new, old in zip(compiled, legacy)
+                if any(new.result[section]['correct'] != old.result[section]['correct']
+                       or new.result[section]['total'] != old.result[section]['total']
+                       for section in ('reading', 'listening'))
+            )
+
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(self.style.SUCCESS(
+            f'Reading/listening grading: {len(attempts)} attempts, {len(keys)} questions'
+        ))
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(f'{"":<28} {"queries":>8} {"p50 ms":>9} {"p95 ms":>9} {"total ms":>10}')
+        self.stdout.write(f'{"compiled key (cold cache)":<28} {cold.queries:>8} {cold.elapsed_ms:>9.2f}')
+        # Keys are only cached in a shared cache; otherwise every grade compiles one.
+        warm = 'compiled key (warm)' if cache_is_shared() else 'compiled key (no cache)'
+        for label, samples in ((warm, compiled), ('per-question loop', legacy)):
+            latencies = [sample.elapsed_ms for sample in samples]
+            self.stdout.write(
+                f'{label:<28} {samples[-1].queries:>8} {percentile(latencies, 50):>9.2f} '
+                f'{percentile(latencies, 95):>9.2f} {sum(latencies):>10.1f}'
+            )
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'{mismatches} attempts graded differently'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Both graders agree on every attempt'))
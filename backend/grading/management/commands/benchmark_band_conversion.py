@@ -0,0 +1,80 @@
+"""
+Management command to micro-benchmark raw score to band conversion.
+
+Converts the same random raw scores with the previous dict-and-sort
+conversion, the table lookup one score at a time and the NumPy batch
+conversion, and checks that all three agree. Needs no database.
+"""
+
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from grading.ielts_conversion import LISTENING_BANDS, band_scores, listening_band_score
+
+
+def sorted_dict_band_score(raw_score):
+    """The Listening conversion before the precomputed tables."""
+    conversion_table = {
+        39: 9.0, 40: 9.0, 37: 8.5, 38: 8.5, 35: 8.0, 36: 8.0, 33: 7.5, 34: 7.5,
+        30: 7.0, 31: 7.0, 32: 7.0, 27: 6.5, 28: 6.5, 29: 6.5,
+        23: 6.0, 24: 6.0, 25: 6.0, 26: 6.0, 20: 5.5, 21: 5.5, 22: 5.5,
+        16: 5.0, 17: 5.0, 18: 5.0, 19: 5.0, 13: 4.5, 14: 4.5, 15: 4.5,
+        10: 4.0, 11: 4.0, 12: 4.0, 7: 3.5, 8: 3.5, 9: 3.5, 4: 3.0, 5: 3.0, 6: 3.0,
+        2: 2.5, 3: 2.5, 1: 2.0, 0: 1.0,
+    }
+    raw_score = max(0, min(40, raw_score))
+    for score, band in sorted(conversion_table.items(), reverse=True):
+        if raw_score >= score:
+            return band
+    return 1.0
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark band conversion: sorted dict, table lookup and NumPy batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scores',
+            type=int,
+            default=100_000,
+            help='Raw scores converted per method (default: 100000)'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(16)
+        raw_scores = [rng.randint(-2, 42) for _ in range(options['scores'])]
+
+        def timed(func):
+            started = time.perf_counter()
+            result = func()
+            return result, (time.perf_counter() - started) * 1000
+
+        legacy, legacy_ms = timed(lambda: [sorted_dict_band_score(score) for score in raw_scores])
+        table, table_ms = timed(lambda: [listening_band_score(score) for score in raw_scores])
+        batch, batch_ms = timed(lambda: band_scores(raw_scores, LISTENING_BANDS))
+        # The cohort grader already holds raw scores in an array.
+        raw_array = np.asarray(raw_scores)
+        array_batch, array_batch_ms = timed(lambda: band_scores(raw_array, LISTENING_BANDS))
+
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(self.style.SUCCESS(f'Band conversion: {len(raw_scores)} raw scores'))
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(f'{"":<24} {"total ms":>10} {"ns/score":>10} {"speedup":>8}')
+        for label, elapsed_ms in (
+            ('sorted dict (before)', legacy_ms),
+            ('table lookup', table_ms),
+            ('NumPy batch (list)', batch_ms),
+            ('NumPy batch (array)', array_batch_ms),
+        ):
+            self.stdout.write(
+                f'{label:<24} {elapsed_ms:>10.2f} {elapsed_ms * 1e6 / len(raw_scores):>10.1f} '
+                f'{legacy_ms / elapsed_ms:>7.1f}x'
+            )
+
+        if legacy == table == batch.tolist() == array_batch.tolist():
+            self.stdout.write(self.style.SUCCESS('All conversions agree'))
+        else:
+            self.stdout.write(self.style.ERROR('Conversions disagree'))
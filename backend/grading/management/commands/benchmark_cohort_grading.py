@@ -0,0 +1,121 @@
+"""
+Management command to benchmark cohort grading.
+
+Seeds a variant with a full answer key and N submitted attempts whose
+accuracy depends on a per-student ability, then grades them with the
+vectorized cohort grader and with a per-test loop (grade_reading_listening
+and a TestResult write per attempt, as grade_test does). All rows are rolled
+back.
+"""
+
+import random
+
+from django.core.management.base import BaseCommand
+
+from exams.models import Answer
+from grading.cohort import grade_cohort
+from grading.services import grade_reading_listening
+from student_portal.benchmarking import measure, rolled_back, seed_cohort
+from student_portal.models import StudentTest, TestResponse, TestResult
+
+QUESTIONS_PER_SECTION = 40
+CHOICES = ['A', 'B', 'C', 'D', 'TRUE', 'FALSE', 'NOT GIVEN']
+
+
+def per_test_grade(attempts):
+    """Grade and store reading/listening one attempt at a time."""
+    for attempt in attempts:
+        results = grade_reading_listening(attempt)
+        result, _ = TestResult.objects.get_or_create(student_test=attempt)
+        result.listening_score = results['listening']['score']
+        result.reading_score = results['reading']['score']
+        result.listening_breakdown = results['listening'].get('breakdown')
+        result.reading_breakdown = results['reading'].get('breakdown')
+        result.save()
+        result.calculate_overall_score()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the vectorized cohort grader against grading attempts one by one'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=1000,
+            help='Submitted attempts to grade (default: 1000)'
+        )
+        parser.add_argument(
+            '--skip-loop',
+            action='store_true',
+            help='Only time the cohort grader'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(17)
+
+        with rolled_back():
+            variant, students, _ = seed_cohort(options['students'], with_admin=False)
+            keys = {
+                (section, question): rng.choice(CHOICES)
+                for section in ('listening', 'reading')
+                for question in range(1, QUESTIONS_PER_SECTION + 1)
+            }
+            Answer.objects.bulk_create([
+                Answer(variant=variant, section=section, question_number=question, correct_answer=correct)
+                for (section, question), correct in keys.items()
+            ])
+            StudentTest.objects.bulk_create([
+                StudentTest(student=student, variant=variant, status='submitted') for student in students
+            ], batch_size=1000)
+            attempts = list(StudentTest.objects.filter(variant=variant).select_related('variant'))
+            responses = []
+            for attempt in attempts:
+                ability = rng.random()
+                for (section, question), correct in keys.items():
+                    # Later questions are harder.
+                    if rng.random() < ability * (1.2 - question / QUESTIONS_PER_SECTION / 2):
+                        answer = correct.lower()
+                    else:
+                        answer = rng.choice(CHOICES)
+                    responses.append(TestResponse(
+                        student_test=attempt, section=section, question_number=question, answer=answer
+                    ))
+            TestResponse.objects.bulk_create(responses, batch_size=2000)
+
+            cohort = measure(grade_cohort, variant)
+            cohort_scores = dict(
+                TestResult.objects.filter(student_test__variant=variant)
+                .values_list('student_test_id', 'listening_score')
+            )
+            loop = None
+            if not options['skip_loop']:
+                TestResult.objects.filter(student_test__variant=variant).delete()
+                loop = measure(per_test_grade, attempts)
+                loop_scores = dict(
+                    TestResult.objects.filter(student_test__variant=variant)
+                    .values_list('student_test_id', 'listening_score')
+                )
+
+        report = cohort.result
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(self.style.SUCCESS(
+            f'Cohort grading: {report["attempts"]} attempts, {len(keys)} questions'
+        ))
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(f'{"":<24} {"queries":>8} {"seconds":>9}')
+        self.stdout.write(f'{"cohort grader":<24} {cohort.queries:>8} {cohort.elapsed_ms / 1000:>9.2f}')
+        if loop:
+            self.stdout.write(f'{"per-test loop":<24} {loop.queries:>8} {loop.elapsed_ms / 1000:>9.2f}')
+            self.stdout.write(f'speedup: {loop.elapsed_ms / cohort.elapsed_ms:.1f}x')
+            if cohort_scores == loop_scores:
+                self.stdout.write(self.style.SUCCESS('Both graders agree on every listening score'))
+            else:
+                self.stdout.write(self.style.ERROR('Graders disagree'))
+
+        hardest = sorted(report['items'], key=lambda item: item['facility'])[:3]
+        self.stdout.write('hardest items: ' + ', '.join(
+            f'{item["section"]} q{item["question_number"]} (facility {item["facility"]}, '
+            f'discrimination {item["discrimination"]})'
+            for item in hardest
+        ))
@@ -0,0 +1,171 @@
+"""
+Management command to benchmark AI provider client reuse.
+
+Starts a local stub server speaking the OpenAI chat completions API (Groq
+uses the same shape) and sends the same requests through a client built per
+call, as the graders used to, and through the pooled registry client. It
+reports per-call latency and how many TCP connections the server accepted.
+The stub uses plain HTTP on localhost, so the TLS handshakes the pool also
+saves against real providers are not included.
+"""
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+
+from grading import ai_grading
+from grading.providers import PROVIDERS, client_stats, close_clients, get_client
+from student_portal.benchmarking import percentile
+
+STUB_CONTENT = (
+    'Feedback.\n```json\n{"task_achievement": 6.5, "coherence_cohesion": 6.5, '
+    '"lexical_resource": 6.5, "grammatical_range": 6.5, "overall_score": 6.5, '
+    '"feedback": "Stub"}\n```'
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Send each response in one write; split writes stall on delayed ACKs.
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000)
+        body = json.dumps({
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': 'stub',
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': STUB_CONTENT},
+                'finish_reason': 'stop',
+            }],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def new_client(provider, api_key, base_url):
+    """Build a client the way the graders did before the registry."""
+    if provider == 'openai':
+        import openai
+        return openai.OpenAI(api_key=api_key, base_url=base_url)
+    import groq
+    return groq.Groq(api_key=api_key, base_url=base_url)
+
+
+def complete(client):
+    return client.chat.completions.create(
+        model='stub',
+        messages=[{'role': 'user', 'content': 'Grade this essay.'}],
+        max_tokens=10
+    )
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-call AI client creation against the pooled provider clients on a local stub server'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--provider',
+            choices=['openai', 'groq'],
+            default='openai',
+            help='SDK to benchmark (default: openai)'
+        )
+        parser.add_argument(
+            '--calls',
+            type=int,
+            default=200,
+            help='Requests sent per mode (default: 200)'
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=0.0,
+            help='Simulated model latency added by the stub server (default: 0)'
+        )
+
+    def handle(self, *args, **options):
+        provider = options['provider']
+        calls = options['calls']
+        key_var, base_url_var = PROVIDERS[provider]
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        server.daemon_threads = True
+        server.lock = threading.Lock()
+        server.connections = 0
+        server.latency_ms = options['latency_ms']
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_address[1]}'
+        if provider == 'openai':
+            base_url += '/v1'
+
+        rows = []
+        try:
+            with mock.patch.dict(os.environ, {key_var: 'stub-key', base_url_var: base_url}):
+                close_clients()
+
+                def per_call():
+                    complete(new_client(provider, 'stub-key', base_url))
+
+                def pooled():
+                    complete(get_client(provider))
+
+                grader = getattr(ai_grading, f'grade_with_{provider}')
+
+                def pooled_grader():
+                    grader('Grade this essay.')
+
+                # One untimed call per mode imports the SDK and warms up.
+                for label, call in (
+                    ('client per call', per_call),
+                    ('pooled client', pooled),
+                    (f'grade_with_{provider} (pooled)', pooled_grader),
+                ):
+                    call()
+                    connections_before = server.connections
+                    latencies = []
+                    for _ in range(calls):
+                        started = time.perf_counter()
+                        call()
+                        latencies.append((time.perf_counter() - started) * 1000)
+                    rows.append((label, latencies, server.connections - connections_before))
+                stats = client_stats().get(provider)
+        finally:
+            close_clients()
+            server.shutdown()
+            server.server_close()
+
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(self.style.SUCCESS(
+            f'{provider} client reuse: {calls} calls per mode, stub latency {options["latency_ms"]:g} ms'
+        ))
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(f'{"":<30} {"mean ms":>9} {"p50 ms":>9} {"p95 ms":>9} {"connections":>12}')
+        for label, latencies, connections in rows:
+            self.stdout.write(
+                f'{label:<30} {sum(latencies) / len(latencies):>9.2f} {percentile(latencies, 50):>9.2f} '
+                f'{percentile(latencies, 95):>9.2f} {connections:>12}'
+            )
+        self.stdout.write(f'Registry stats: {stats}')
@@ -0,0 +1,103 @@
+"""
+Management command to benchmark the AI provider router with fake providers.
+
+Two fake providers stand in for the real ones: a preferred provider that is
+fast but has a slow tail, rate-limit errors and (optionally) an outage in the
+middle of the run, and a slower but reliable second provider. The same
+request sequence is sent through the old fixed chain (first configured
+provider, word-count fallback on error), the router, and the router with
+hedging. Nothing touches the network or the database.
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from grading.router import AllProvidersFailed, ProviderRouter
+from student_portal.benchmarking import percentile
+
+
+class FakeProvider:
+    """A provider call with configurable latency, slow tail and errors."""
+
+    def __init__(self, name, latency_ms, slow_ms=0.0, slow_rate=0.0, error_rate=0.0, seed=0):
+        self.name = name
+        self.latency_ms = latency_ms
+        self.slow_ms = slow_ms
+        self.slow_rate = slow_rate
+        self.error_rate = error_rate
+        self.down = False
+        self.calls = 0
+        self.rng = random.Random(seed)
+
+    def __call__(self):
+        self.calls += 1
+        slow = self.rng.random() < self.slow_rate
+        failed = self.down or self.rng.random() < self.error_rate
+        time.sleep((self.slow_ms if slow else self.latency_ms) * self.rng.uniform(0.8, 1.2) / 1000)
+        if failed:
+            raise RuntimeError(f'{self.name}: 429 rate limited')
+        return {'task_score': 6.5, 'ai_used': True}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the fixed provider chain against the latency-aware router on fake providers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=80, help='Grading requests per strategy (default: 80)')
+        parser.add_argument('--primary-ms', type=float, default=60.0, help='Preferred provider latency (default: 60)')
+        parser.add_argument('--primary-slow-ms', type=float, default=600.0, help='Its slow-tail latency (default: 600)')
+        parser.add_argument('--primary-slow-rate', type=float, default=0.1, help='Share of slow calls (default: 0.1)')
+        parser.add_argument('--primary-error-rate', type=float, default=0.05, help='Share of failing calls (default: 0.05)')
+        parser.add_argument('--secondary-ms', type=float, default=100.0, help='Second provider latency (default: 100)')
+        parser.add_argument('--hedge-ms', type=float, default=150.0, help='Hedging delay for the hedged run (default: 150)')
+        parser.add_argument('--no-outage', action='store_true', help='Keep the preferred provider up for the whole run')
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        rows = []
+        for label in ('fixed chain', 'router', 'router + hedging'):
+            primary = FakeProvider(
+                'primary', options['primary_ms'], options['primary_slow_ms'],
+                options['primary_slow_rate'], options['primary_error_rate'], seed=22
+            )
+            secondary = FakeProvider('secondary', options['secondary_ms'], seed=23)
+            calls = {'primary': primary, 'secondary': secondary}
+            router = ProviderRouter(
+                failure_threshold=3, window=20, cooldown_seconds=1.0,
+                hedge_after_seconds=options['hedge_ms'] / 1000 if label == 'router + hedging' else 0.0
+            )
+
+            latencies = []
+            fallbacks = 0
+            for index in range(requests):
+                # Outage of the preferred provider in the middle half of the run.
+                primary.down = not options['no_outage'] and requests // 4 <= index < requests * 3 // 4
+                started = time.perf_counter()
+                if label == 'fixed chain':
+                    try:
+                        primary()
+                    except RuntimeError:
+                        fallbacks += 1
+                else:
+                    try:
+                        router.call(calls)
+                    except AllProvidersFailed:
+                        fallbacks += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+            rows.append((label, latencies, fallbacks, primary.calls, secondary.calls))
+
+        self.stdout.write(self.style.SUCCESS('=' * 78))
+        self.stdout.write(self.style.SUCCESS(f'Provider routing: {requests} grading requests per strategy'))
+        self.stdout.write(self.style.SUCCESS('=' * 78))
+        self.stdout.write(
+            f'{"":<18} {"p50 ms":>8} {"p95 ms":>8} {"max ms":>8} {"fallbacks":>10} '
+            f'{"primary":>8} {"secondary":>10}'
+        )
+        for label, latencies, fallbacks, primary_calls, secondary_calls in rows:
+            self.stdout.write(
+                f'{label:<18} {percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} '
+                f'{max(latencies):>8.1f} {fallbacks:>10} {primary_calls:>8} {secondary_calls:>10}'
+            )
+        self.stdout.write('fallbacks = requests that got the word-count grade (or no grade) instead of an AI grade')
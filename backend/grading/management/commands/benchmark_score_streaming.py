@@ -0,0 +1,113 @@
+"""
+Management command to benchmark time-to-score of streamed writing grades.
+
+A fake provider streams a writing assessment of about 600 words token by
+token at a fixed rate. Three ways of reading it are timed: waiting for the
+whole answer and parsing the JSON block at its end (the old prompt layout,
+non-streaming), streaming the old layout through ScoreStreamParser, and
+streaming the current layout (JSON first). Nothing touches the network or the
+database.
+"""
+
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from grading.ai_grading import parse_writing_response
+from grading.score_stream import ScoreStreamParser
+from student_portal.benchmarking import percentile
+
+SCORES = {
+    'task_achievement': 6.5, 'coherence_cohesion': 7.0, 'lexical_resource': 6.5,
+    'grammatical_range': 6.0, 'overall_score': 6.5, 'feedback': 'Clear position, some repetition.',
+}
+
+SECTIONS = [
+    '1. BAND SCORE BREAKDOWN', '2. TASK ACHIEVEMENT', '3. COHERENCE AND COHESION', '4. LEXICAL RESOURCE',
+    '5. GRAMMATICAL RANGE AND ACCURACY', '6. SPECIFIC RECOMMENDATIONS', '7. MODEL SENTENCE IMPROVEMENTS',
+]
+
+WORDS = 'the essay argues position clearly although several paragraphs repeat ideas without examples'.split()
+
+
+def fake_answer(words, json_first, seed=0):
+    """Build an assessment of about ``words`` words with the score block first or last."""
+    rng = random.Random(seed)
+    per_section = max(1, words // len(SECTIONS))
+    markdown = '\n\n'.join(
+        f'### {title}\n' + ' '.join(rng.choice(WORDS) for _ in range(per_section)) + '.'
+        for title in SECTIONS
+    )
+    block = f'```json\n{json.dumps(SCORES)}\n```'
+    return f'{block}\n\n{markdown}' if json_first else f'{markdown}\n\n{block}'
+
+
+def fake_stream(text, tokens_per_second):
+    """Yield ``text`` in chunks of about one token (4 characters) at the given rate."""
+    delay = 1 / tokens_per_second
+    for index in range(0, len(text), 4):
+        time.sleep(delay)
+        yield text[index:index + 4]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark time-to-score of blocking vs streamed (JSON last / JSON first) writing grades'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help='Answers per strategy (default: 3)')
+        parser.add_argument('--words', type=int, default=600, help='Words of feedback per answer (default: 600)')
+        parser.add_argument(
+            '--tokens-per-second', type=float, default=400.0,
+            help='Fake provider output rate (default: 400; real providers are often 50-150)'
+        )
+
+    def handle(self, *args, **options):
+        rate = options['tokens_per_second']
+        rows = []
+        for label, json_first, streamed in (
+            ('blocking, JSON last', False, False),
+            ('streamed, JSON last', False, True),
+            ('streamed, JSON first', True, True),
+        ):
+            to_score, to_feedback, totals = [], [], []
+            for run in range(options['runs']):
+                text = fake_answer(options['words'], json_first, seed=run)
+                started = time.perf_counter()
+                score_at = feedback_at = None
+                if streamed:
+                    parser = ScoreStreamParser()
+                    for chunk in fake_stream(text, rate):
+                        scores, feedback = parser.feed(chunk)
+                        now = (time.perf_counter() - started) * 1000
+                        if scores is not None:
+                            score_at = now
+                        if feedback and feedback_at is None:
+                            feedback_at = now
+                    if feedback_at is None:
+                        # Old layout: the feedback can only be shown once the scores are known.
+                        feedback_at = score_at
+                else:
+                    result = parse_writing_response(''.join(fake_stream(text, rate)), require_scores=True)
+                    assert result['task_score'] == SCORES['overall_score']
+                    score_at = feedback_at = (time.perf_counter() - started) * 1000
+                to_score.append(score_at)
+                to_feedback.append(feedback_at)
+                totals.append((time.perf_counter() - started) * 1000)
+            rows.append((label, to_score, to_feedback, totals))
+
+        self.stdout.write(self.style.SUCCESS('=' * 78))
+        self.stdout.write(self.style.SUCCESS(
+            f'Score streaming: {options["runs"]} answers of ~{options["words"]} words at {rate:g} tokens/s'
+        ))
+        self.stdout.write(self.style.SUCCESS('=' * 78))
+        self.stdout.write(f'{"":<22} {"score ms":>10} {"feedback ms":>12} {"total ms":>10} {"score/total":>12}')
+        for label, to_score, to_feedback, totals in rows:
+            score = percentile(to_score, 50)
+            total = percentile(totals, 50)
+            self.stdout.write(
+                f'{label:<22} {score:>10.1f} {percentile(to_feedback, 50):>12.1f} {total:>10.1f} '
+                f'{score / total:>12.0%}'
+            )
+        self.stdout.write('medians; score = band scores known, feedback = first feedback text shown')
@@ -0,0 +1,52 @@
+"""
+Management command to grade reading/listening for every attempt of a variant.
+
+Uses the vectorized cohort grader and prints the per-question facility and
+discrimination indices.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.models import Variant
+from grading.cohort import grade_cohort
+
+
+class Command(BaseCommand):
+    help = 'Grade reading/listening of all submitted attempts of a variant at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'variant',
+            type=str,
+            help='Variant code or id'
+        )
+        parser.add_argument(
+            '--submitted-only',
+            action='store_true',
+            help='Skip attempts that are already graded'
+        )
+
+    def handle(self, *args, **options):
+        variant = Variant.objects.filter(code=options['variant']).first()
+        if variant is None and options['variant'].isdigit():
+            variant = Variant.objects.filter(id=int(options['variant'])).first()
+        if variant is None:
+            raise CommandError(f'Variant "{options["variant"]}" not found')
+
+        report = grade_cohort(variant, include_graded=not options['submitted_only'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{variant}: {report["attempts"]} attempts graded in {report["duration_ms"]} ms '
+            f'({report["created"]} results created, {report["updated"]} updated, '
+            f'{report["marked_graded"]} marked graded)'
+        ))
+        if not report['items']:
+            return
+        self.stdout.write(f'{"section":<10} {"q":>3} {"answered":>9} {"facility":>9} {"discrim.":>9}')
+        for item in report['items']:
+            line = (
+                f'{item["section"]:<10} {item["question_number"]:>3} {item["answered"]:>9} '
+                f'{item["facility"]:>9.3f} {item["discrimination"]:>9.3f}'
+            )
+            # Items that do not separate strong from weak students need review.
+            self.stdout.write(self.style.WARNING(line) if item['discrimination'] < 0.2 else line)
@@ -0,0 +1,67 @@
+"""
+Management command to run queued grading jobs (AI writing grading).
+
+Run once to drain the due jobs or as a long-running worker with ``--loop``.
+Start several workers for more throughput; each claims its own jobs.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from grading.jobs import DEFAULT_BATCH_SIZE, process_jobs, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Run queued grading jobs, retrying failures with exponential backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep polling every --interval seconds until interrupted'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds between polls when the queue is empty in --loop mode (default: 2)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Jobs claimed per batch (default: {DEFAULT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+        worker = worker_name()
+
+        if not options['loop']:
+            while True:
+                stats = process_jobs(options['batch_size'], worker)
+                self._report(stats, always=not stats['claimed'])
+                if not stats['claimed']:
+                    return
+
+        self.stdout.write(f'Grading worker {worker} polling every {options["interval"]:g}s (Ctrl+C to stop)')
+        try:
+            while True:
+                # Long-running process: drop connections the server may have closed.
+                close_old_connections()
+                stats = process_jobs(options['batch_size'], worker)
+                self._report(stats, always=verbosity >= 2)
+                if not stats['claimed']:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Grading worker stopped')
+
+    def _report(self, stats, always=False):
+        if not always and not stats['claimed']:
+            return
+        self.stdout.write(
+            f"[{stats['run_at']}] claimed: {stats['claimed']}, succeeded: {stats['succeeded']}, "
+            f"retried: {stats['retried']}, failed: {stats['failed']}, took {stats['duration_ms']} ms"
+        )
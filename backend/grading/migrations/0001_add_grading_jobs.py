@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('student_portal', '0007_add_writing_drafts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('writing', 'Writing')], default='writing', max_length=20)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Runs started so far')),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('run_after', models.DateTimeField(help_text='Not picked up before this time (retry backoff)')),
+                ('locked_by', models.CharField(blank=True, default='', help_text='Worker currently running the job', max_length=64)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('student_test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grading_jobs', to='student_portal.studenttest')),
+            ],
+            options={
+                'db_table': 'grading_job',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='grading_job_status_run_after')],
+            },
+        ),
+    ]
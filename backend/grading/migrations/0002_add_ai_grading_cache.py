@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grading', '0001_add_grading_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIGradingCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='SHA-256 of kind, normalized response, prompt version, provider and model', max_length=64, unique=True)),
+                ('kind', models.CharField(choices=[('writing', 'Writing'), ('speaking', 'Speaking')], max_length=20)),
+                ('provider', models.CharField(max_length=32)),
+                ('model', models.CharField(max_length=100)),
+                ('result', models.JSONField()),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, help_text='Least recently used entries are evicted first')),
+            ],
+            options={
+                'db_table': 'ai_grading_cache',
+            },
+        ),
+    ]
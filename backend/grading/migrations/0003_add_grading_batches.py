@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grading', '0002_add_ai_grading_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradingBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('backend', models.CharField(choices=[('local', 'Local files (testing)'), ('openai', 'OpenAI Batch API')], default='local', max_length=20)),
+                ('status', models.CharField(choices=[('building', 'Building'), ('built', 'Built'), ('submitted', 'Submitted'), ('completed', 'Completed'), ('applied', 'Applied'), ('failed', 'Failed')], default='building', max_length=20)),
+                ('sections', models.JSONField(default=list, help_text='Sections regraded: writing and/or speaking')),
+                ('student_test_ids', models.JSONField(default=list)),
+                ('external_id', models.CharField(blank=True, default='', help_text='Batch id at the provider', max_length=100)),
+                ('request_count', models.PositiveIntegerField(default=0)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('results_applied', models.PositiveIntegerField(default=0, help_text='TestResults updated')),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'grading_batch',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grading', '0003_add_grading_batches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AICallRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('writing', 'Writing'), ('speaking', 'Speaking')], max_length=20)),
+                ('provider', models.CharField(max_length=32)),
+                ('model', models.CharField(max_length=100)),
+                ('prompt_version', models.PositiveIntegerField()),
+                ('input_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('cached_input_tokens', models.PositiveIntegerField(blank=True, help_text='Input tokens served from the provider prompt cache', null=True)),
+                ('output_tokens', models.PositiveIntegerField(blank=True, null=True)),
+                ('latency_ms', models.PositiveIntegerField(blank=True, help_text='Not recorded for batch requests', null=True)),
+                ('ok', models.BooleanField(default=True)),
+                ('error', models.CharField(blank=True, default='', max_length=255)),
+                ('batch', models.BooleanField(default=False, help_text='Sent through a batch API (see grading.batch_grading)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'ai_call_log',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -2,3 +2,203 @@
 # This app handles answer checking and AI-powered writing evaluation
 # Models are primarily in other apps, but grading logic will be here
 
+from django.db import models
+
+
+class GradingJob(models.Model):
+    """
+    A queued grading task, run by ``manage.py run_grading_worker``.
+
+    Writing is graded here instead of inside the submit request, because the
+    AI calls take seconds to tens of seconds.
+    """
+
+    KIND_CHOICES = [
+        ('writing', 'Writing'),
+    ]
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    student_test = models.ForeignKey(
+        'student_portal.StudentTest',
+        on_delete=models.CASCADE,
+        related_name='grading_jobs'
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES,
+        default='writing'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='queued'
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text='Runs started so far'
+    )
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(
+        help_text='Not picked up before this time (retry backoff)'
+    )
+    locked_by = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text='Worker currently running the job'
+    )
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'grading_job'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='grading_job_status_run_after'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job for {self.student_test} ({self.status})"
+
+
+class AIGradingCacheEntry(models.Model):
+    """
+    A stored AI grading result, looked up by a hash of what produced it.
+
+    See grading.grading_cache.
+    """
+
+    KIND_CHOICES = [
+        ('writing', 'Writing'),
+        ('speaking', 'Speaking'),
+    ]
+
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text='SHA-256 of kind, normalized response, prompt version, provider and model'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    provider = models.CharField(max_length=32)
+    model = models.CharField(max_length=100)
+    result = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(
+        db_index=True,
+        help_text='Least recently used entries are evicted first'
+    )
+
+    class Meta:
+        db_table = 'ai_grading_cache'
+
+    def __str__(self):
+        return f"{self.kind} grading via {self.provider}/{self.model} ({self.hits} hits)"
+
+
+class GradingBatch(models.Model):
+    """
+    An AI regrade of many attempts sent through a provider batch API.
+
+    See grading.batch_grading; ``manage.py batch_regrade`` creates and
+    resumes batches.
+    """
+
+    BACKEND_CHOICES = [
+        ('local', 'Local files (testing)'),
+        ('openai', 'OpenAI Batch API'),
+    ]
+
+    STATUS_CHOICES = [
+        ('building', 'Building'),
+        ('built', 'Built'),
+        ('submitted', 'Submitted'),
+        ('completed', 'Completed'),
+        ('applied', 'Applied'),
+        ('failed', 'Failed'),
+    ]
+
+    backend = models.CharField(max_length=20, choices=BACKEND_CHOICES, default='local')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='building')
+    sections = models.JSONField(
+        default=list,
+        help_text='Sections regraded: writing and/or speaking'
+    )
+    student_test_ids = models.JSONField(default=list)
+    external_id = models.CharField(
+        max_length=100,
+        blank=True,
+        default='',
+        help_text='Batch id at the provider'
+    )
+    request_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    results_applied = models.PositiveIntegerField(
+        default=0,
+        help_text='TestResults updated'
+    )
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'grading_batch'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.backend} grading batch {self.id} ({self.status}, {self.request_count} requests)"
+
+
+class AICallRecord(models.Model):
+    """
+    One AI grading call: provider, model, tokens and latency.
+
+    See grading.usage.
+    """
+
+    KIND_CHOICES = [
+        ('writing', 'Writing'),
+        ('speaking', 'Speaking'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    provider = models.CharField(max_length=32)
+    model = models.CharField(max_length=100)
+    prompt_version = models.PositiveIntegerField()
+    input_tokens = models.PositiveIntegerField(null=True, blank=True)
+    cached_input_tokens = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text='Input tokens served from the provider prompt cache'
+    )
+    output_tokens = models.PositiveIntegerField(null=True, blank=True)
+    latency_ms = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text='Not recorded for batch requests'
+    )
+    ok = models.BooleanField(default=True)
+    error = models.CharField(max_length=255, blank=True, default='')
+    batch = models.BooleanField(
+        default=False,
+        help_text='Sent through a batch API (see grading.batch_grading)'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'ai_call_log'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.kind} call to {self.provider}/{self.model} ({self.latency_ms} ms)"
@@ -0,0 +1,148 @@
+"""
+Long-lived AI provider clients.
+
+The graders used to import an SDK and build a new client for every essay,
+paying for client setup and a fresh TLS handshake each time. The registry
+creates one client per provider per process on first use (the SDK is only
+imported then) and hands the same client to every later call and thread.
+The OpenAI, Groq and Anthropic clients each get their own httpx pool of
+AI_PROVIDER_POOL_SIZE keep-alive connections.
+
+A client is rebuilt when its API key changes or the process was forked
+(gunicorn workers must not share sockets). ``OPENAI_BASE_URL``,
+``GROQ_BASE_URL`` and ``ANTHROPIC_BASE_URL`` point a provider at another
+endpoint, e.g. a local stub server for benchmarks.
+"""
+
+import os
+import threading
+import time
+
+from django.conf import settings
+
+# provider -> (API key variable, base URL variable)
+PROVIDERS = {
+    'openai': ('OPENAI_API_KEY', 'OPENAI_BASE_URL'),
+    'groq': ('GROQ_API_KEY', 'GROQ_BASE_URL'),
+    'anthropic': ('ANTHROPIC_API_KEY', 'ANTHROPIC_BASE_URL'),
+    'gemini': ('GOOGLE_API_KEY', None),
+}
+
+
+class ProviderClient:
+    """A provider's client with the settings it was built with and usage counters."""
+
+    __slots__ = ('provider', 'client', 'http_client', 'api_key', 'base_url', 'pid', 'created_at', 'requests')
+
+    def __init__(self, provider, client, http_client, api_key, base_url):
+        self.provider = provider
+        self.client = client
+        self.http_client = http_client
+        self.api_key = api_key
+        self.base_url = base_url
+        self.pid = os.getpid()
+        self.created_at = time.monotonic()
+        self.requests = 0
+
+    def close(self):
+        if self.http_client is not None:
+            self.http_client.close()
+
+
+_clients = {}
+_created = {}
+_lock = threading.Lock()
+
+
+def _http_client():
+    """An httpx client whose connections are kept alive between calls."""
+    import httpx
+
+    pool_size = settings.AI_PROVIDER_POOL_SIZE
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=settings.AI_PROVIDER_KEEPALIVE_SECONDS
+        ),
+        timeout=httpx.Timeout(settings.AI_PROVIDER_TIMEOUT_SECONDS, connect=10.0)
+    )
+
+
+def _build(provider, api_key, base_url):
+    """Import the provider's SDK and create its client. Returns (client, http_client)."""
+    if provider == 'openai':
+        import openai
+        http_client = _http_client()
+        return openai.OpenAI(api_key=api_key, base_url=base_url, http_client=http_client), http_client
+    if provider == 'groq':
+        import groq
+        http_client = _http_client()
+        return groq.Groq(api_key=api_key, base_url=base_url, http_client=http_client), http_client
+    if provider == 'anthropic':
+        import anthropic
+        http_client = _http_client()
+        return anthropic.Anthropic(api_key=api_key, base_url=base_url, http_client=http_client), http_client
+    if provider == 'gemini':
+        from google import genai
+        return genai.Client(api_key=api_key), None
+    raise ValueError(f'Unknown AI provider: {provider}')
+
+
+def get_client(provider):
+    """
+    Return the process-wide client of a provider, creating it on first use.
+
+    Raises ImportError if the provider's SDK is not installed.
+    """
+    key_var, base_url_var = PROVIDERS[provider]
+    api_key = os.getenv(key_var)
+    base_url = (os.getenv(base_url_var) or None) if base_url_var else None
+
+    entry = _clients.get(provider)
+    if entry is None or entry.api_key != api_key or entry.base_url != base_url or entry.pid != os.getpid():
+        with _lock:
+            entry = _clients.get(provider)
+            if entry is None or entry.api_key != api_key or entry.base_url != base_url or entry.pid != os.getpid():
+                if entry is not None and entry.pid == os.getpid():
+                    entry.close()
+                client, http_client = _build(provider, api_key, base_url)
+                entry = _clients[provider] = ProviderClient(provider, client, http_client, api_key, base_url)
+                _created[provider] = _created.get(provider, 0) + 1
+    entry.requests += 1
+    return entry.client
+
+
+def _pool_stats(http_client):
+    """Connection counts of an httpx client's pool (best effort: httpcore internals)."""
+    pool = getattr(getattr(http_client, '_transport', None), '_pool', None)
+    connections = getattr(pool, 'connections', None)
+    if connections is None:
+        return None
+    return {
+        'connections': len(connections),
+        'idle': sum(1 for connection in connections if connection.is_idle()),
+        'max_connections': settings.AI_PROVIDER_POOL_SIZE,
+    }
+
+
+def client_stats():
+    """Return per-provider client counters and pool usage for this process."""
+    stats = {}
+    for provider, entry in list(_clients.items()):
+        stats[provider] = {
+            'clients_created': _created.get(provider, 0),
+            'requests': entry.requests,
+            'age_seconds': round(time.monotonic() - entry.created_at, 1),
+            'pool': _pool_stats(entry.http_client) if entry.http_client is not None else None,
+        }
+    return stats
+
+
+def close_clients():
+    """Close and forget every client (they are recreated on next use)."""
+    with _lock:
+        for entry in _clients.values():
+            if entry.pid == os.getpid():
+                entry.close()
+        _clients.clear()
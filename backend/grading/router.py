@@ -0,0 +1,315 @@
+"""
+Latency-aware routing of AI grading calls across providers.
+
+Writing and speaking grading used to pick the first provider with an API key
+set, so a slow or rate-limited provider was tried for every student and its
+failures were hidden behind fallback grades. The router keeps, per provider
+and per process, a rolling window of call latencies and outcomes and:
+
+- tries providers fastest first (rolling median of successful calls;
+  providers without samples count as fastest so they get measured), keeping
+  the configured preference order between equals
+- moves on to the next provider when a call fails
+- opens a provider's circuit after AI_ROUTER_FAILURE_THRESHOLD consecutive
+  failures, or when its error rate over a window (AI_ROUTER_WINDOW calls, at
+  least half full) reaches AI_ROUTER_ERROR_RATE; an open provider is skipped
+  for AI_ROUTER_COOLDOWN_SECONDS, then a single probe call decides whether it
+  closes again
+- optionally hedges: if the first provider has not answered after
+  AI_ROUTER_HEDGE_AFTER_SECONDS, the same request goes to the next provider
+  and the first successful answer wins
+
+Streaming calls (``stream``) fail over the same way until their first chunk
+arrives; after that they are committed to their provider.
+
+Providers are plain callables, so the router runs against fakes as easily as
+against the real SDKs (see ``benchmark_provider_router``).
+"""
+
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Name prefix of the threads running hedged calls.
+THREAD_NAME_PREFIX = 'ai-router'
+
+
+class AllProvidersFailed(Exception):
+    """No provider produced a result (all failed or have open circuits)."""
+
+    def __init__(self, errors):
+        self.errors = errors
+        detail = '; '.join(f'{provider}: {error}' for provider, error in errors.items()) or 'no provider available'
+        super().__init__(f'All AI providers failed ({detail})')
+
+
+class CircuitOpen(Exception):
+    """The provider's circuit is open, or its single probe is already running."""
+
+
+class ProviderHealth:
+    """Rolling latency/outcome window and circuit state of one provider."""
+
+    def __init__(self, window):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = None
+        self.probing = False
+        self.calls = 0
+        self.failures = 0
+        self.hedged = 0
+
+    def median_latency(self):
+        return statistics.median(self.latencies) if self.latencies else None
+
+    def error_rate(self):
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class ProviderRouter:
+    """Routes calls over providers; thread-safe, one instance per process."""
+
+    def __init__(self, failure_threshold=3, error_rate=0.5, window=20, cooldown_seconds=60.0,
+                 hedge_after_seconds=0.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.window = window
+        self.cooldown_seconds = cooldown_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        self.clock = clock
+        self._health = {}
+        self._lock = threading.Lock()
+
+    def _get_health(self, provider):
+        health = self._health.get(provider)
+        if health is None:
+            health = self._health[provider] = ProviderHealth(self.window)
+        return health
+
+    def candidates(self, providers):
+        """
+        Return the providers to try, in order, among ``providers`` (preference order).
+
+        Open circuits are left out. One whose cooldown has passed goes first,
+        as a probe (on failure the call moves on to the next provider); only
+        one call at a time may probe it.
+        """
+        with self._lock:
+            now = self.clock()
+            available = []
+            for index, provider in enumerate(providers):
+                health = self._get_health(provider)
+                if health.state == OPEN and now - health.opened_at >= self.cooldown_seconds:
+                    health.state = HALF_OPEN
+                    health.probing = False
+                if health.state == OPEN or (health.state == HALF_OPEN and health.probing):
+                    continue
+                available.append((health.state != HALF_OPEN, health.median_latency() or 0.0, index, provider))
+        return [provider for *_, provider in sorted(available)]
+
+    def _start(self, provider):
+        """Claim the probe of a half-open provider; raise CircuitOpen if it is not callable."""
+        with self._lock:
+            health = self._get_health(provider)
+            if health.state == OPEN or (health.state == HALF_OPEN and health.probing):
+                raise CircuitOpen(f'circuit {health.state}')
+            if health.state == HALF_OPEN:
+                health.probing = True
+
+    def record(self, provider, ok, latency=None):
+        """Record the outcome of one call and update the provider's circuit."""
+        with self._lock:
+            health = self._get_health(provider)
+            health.calls += 1
+            health.outcomes.append(ok)
+            health.probing = False
+            if ok:
+                if latency is not None:
+                    health.latencies.append(latency)
+                health.consecutive_failures = 0
+                health.state = CLOSED
+                return
+            health.failures += 1
+            health.consecutive_failures += 1
+            window_failed = (
+                len(health.outcomes) >= max(2, self.window // 2)
+                and health.error_rate() >= self.error_rate
+            )
+            if health.state == HALF_OPEN or health.consecutive_failures >= self.failure_threshold or window_failed:
+                if health.state != OPEN:
+                    logger.warning('AI provider %s circuit opened after %s consecutive failures',
+                                   provider, health.consecutive_failures)
+                health.state = OPEN
+                health.opened_at = self.clock()
+
+    def _run(self, provider, call):
+        self._start(provider)
+        started = time.perf_counter()
+        try:
+            result = call()
+        except Exception:
+            self.record(provider, False)
+            raise
+        self.record(provider, True, time.perf_counter() - started)
+        return result
+
+    def call(self, calls, hedge_after_seconds=None):
+        """
+        Run a request on the best available provider, failing over in order.
+
+        Args:
+            calls: {provider: zero-argument callable} in preference order;
+                a callable raises on failure
+            hedge_after_seconds: Overrides the router's hedging delay (0 = off)
+
+        Returns:
+            tuple: (provider, result)
+
+        Raises:
+            AllProvidersFailed: every candidate failed or none was available
+        """
+        hedge_after = self.hedge_after_seconds if hedge_after_seconds is None else hedge_after_seconds
+        queue = deque(self.candidates(list(calls)))
+        errors = {}
+
+        if not hedge_after:
+            while queue:
+                provider = queue.popleft()
+                try:
+                    return provider, self._run(provider, calls[provider])
+                except Exception as e:
+                    logger.warning('AI provider %s failed: %s', provider, e)
+                    errors[provider] = e
+            raise AllProvidersFailed(errors)
+
+        executor = ThreadPoolExecutor(max_workers=len(calls), thread_name_prefix=THREAD_NAME_PREFIX)
+        try:
+            pending = {}
+            while queue or pending:
+                if queue and not pending:
+                    provider = queue.popleft()
+                    pending[executor.submit(self._run, provider, calls[provider])] = provider
+                # Wait for an answer; hedge with the next provider if it is slow.
+                done, _ = wait(pending, timeout=hedge_after if queue else None, return_when=FIRST_COMPLETED)
+                if not done:
+                    if len(pending) == 1 and queue:
+                        provider = queue.popleft()
+                        with self._lock:
+                            self._get_health(provider).hedged += 1
+                        pending[executor.submit(self._run, provider, calls[provider])] = provider
+                    continue
+                for future in done:
+                    provider = pending.pop(future)
+                    try:
+                        return provider, future.result()
+                    except Exception as e:
+                        logger.warning('AI provider %s failed: %s', provider, e)
+                        errors[provider] = e
+            raise AllProvidersFailed(errors)
+        finally:
+            # The losing hedged call finishes in the background; its outcome is still recorded.
+            executor.shutdown(wait=False)
+
+    def stream(self, calls):
+        """
+        Run a streaming request on the best available provider.
+
+        Fails over like ``call`` until the first chunk has arrived; after
+        that the provider is committed and a failure is raised to the caller
+        (the chunks already yielded cannot be taken back). No hedging.
+
+        Args:
+            calls: {provider: zero-argument callable returning an iterator
+                of chunks} in preference order
+
+        Yields:
+            tuple: (provider, chunk)
+
+        Raises:
+            AllProvidersFailed: every candidate failed before its first chunk
+        """
+        errors = {}
+        for provider in self.candidates(list(calls)):
+            try:
+                self._start(provider)
+            except CircuitOpen as e:
+                errors[provider] = e
+                continue
+            started = time.perf_counter()
+            committed = False
+            try:
+                for chunk in calls[provider]():
+                    committed = True
+                    yield provider, chunk
+            except GeneratorExit:
+                # Closed by the consumer: not the provider's fault.
+                self.record(provider, True)
+                raise
+            except Exception as e:
+                self.record(provider, False)
+                if committed:
+                    raise
+                logger.warning('AI provider %s failed: %s', provider, e)
+                errors[provider] = e
+                continue
+            self.record(provider, True, time.perf_counter() - started)
+            return
+        raise AllProvidersFailed(errors)
+
+    def stats(self):
+        """Return circuit state, rolling latency and error rate per provider."""
+        with self._lock:
+            return {
+                provider: {
+                    'state': health.state,
+                    'median_latency_ms': (
+                        round(health.median_latency() * 1000, 1) if health.latencies else None
+                    ),
+                    'error_rate': round(health.error_rate(), 3),
+                    'consecutive_failures': health.consecutive_failures,
+                    'calls': health.calls,
+                    'failures': health.failures,
+                    'hedged': health.hedged,
+                }
+                for provider, health in self._health.items()
+            }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Return the process-wide router configured from settings."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ProviderRouter(
+                    failure_threshold=settings.AI_ROUTER_FAILURE_THRESHOLD,
+                    error_rate=settings.AI_ROUTER_ERROR_RATE,
+                    window=settings.AI_ROUTER_WINDOW,
+                    cooldown_seconds=settings.AI_ROUTER_COOLDOWN_SECONDS,
+                    hedge_after_seconds=settings.AI_ROUTER_HEDGE_AFTER_SECONDS,
+                )
+    return _router
+
+
+def reset_router():
+    """Forget all provider health (the router is rebuilt from settings on next use)."""
+    global _router
+    with _router_lock:
+        _router = None
@@ -0,0 +1,115 @@
+"""
+Incremental extraction of band scores from a streaming AI answer.
+
+The grading prompts ask for the score JSON block first and the markdown
+assessment after it. ``ScoreStreamParser`` is fed the answer chunk by chunk
+as the provider streams it; it tracks brace depth (ignoring braces inside
+JSON strings) from the first ``{`` and parses the object as soon as it is
+closed, so the scores are known after the first hundred or so tokens
+instead of at the end of the answer. Everything after the block (and its
+closing code fence) is handed back as feedback text to pass on to the
+client.
+
+An object that is not valid JSON or lacks the required key is skipped and
+scanning goes on, so an answer with the scores at the end (the old layout)
+still yields them, only later.
+"""
+
+import json
+
+FENCE = '```'
+
+
+class ScoreStreamParser:
+    """Feed answer chunks; get the scores once and the feedback after them."""
+
+    def __init__(self, required_key='overall_score'):
+        self.required_key = required_key
+        self.text = ''
+        self.scores = None
+        self._scan = 0
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._feedback_from = None
+        self._fence_checked = False
+        self._feedback_started = False
+
+    def feed(self, chunk):
+        """
+        Add a chunk of the answer.
+
+        Returns:
+            tuple: (scores dict if they were completed by this chunk else
+            None, feedback text that became available with this chunk)
+        """
+        self.text += chunk
+        found = None
+        if self.scores is None:
+            found = self._find_scores()
+        return found, self._feedback()
+
+    def _find_scores(self):
+        text = self.text
+        index = self._scan
+        while index < len(text):
+            char = text[index]
+            index += 1
+            if self._start is None:
+                if char == '{':
+                    self._start, self._depth = index - 1, 1
+                    self._in_string = self._escaped = False
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = self._parse(text[self._start:index])
+                    if candidate is not None:
+                        self.scores = candidate
+                        self._scan = self._feedback_from = index
+                        return candidate
+                    # Not the score block: rescan from just after its opening brace.
+                    index = self._start + 1
+                    self._start = None
+        self._scan = index
+        return None
+
+    def _parse(self, candidate):
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError:
+            return None
+        if isinstance(value, dict) and self.required_key in value:
+            return value
+        return None
+
+    def _feedback(self):
+        if self._feedback_from is None:
+            return ''
+        if not self._fence_checked:
+            rest = self.text[self._feedback_from:]
+            stripped = rest.lstrip()
+            if len(stripped) < len(FENCE) and FENCE.startswith(stripped):
+                # Could still become the closing fence of the JSON block.
+                return ''
+            if stripped.startswith(FENCE):
+                self._feedback_from += len(rest) - len(stripped) + len(FENCE)
+            self._fence_checked = True
+        feedback = self.text[self._feedback_from:]
+        if not self._feedback_started:
+            # Blank lines between the block and the feedback are dropped.
+            feedback = feedback.lstrip()
+            self._feedback_started = bool(feedback)
+        self._feedback_from = len(self.text)
+        return feedback
@@ -2,11 +2,19 @@
 Grading services for answer checking and AI-powered writing evaluation.
 """
 
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from decimal import Decimal
+from django.conf import settings
+from django.db import connections, transaction
 from student_portal.models import StudentTest, TestResult, TestResponse
-from exams.models import Answer, Variant
-from .ielts_conversion import listening_band_score, reading_band_score
-from .ai_grading import grade_writing_task_ai
+from exams.models import Variant
+from .answer_keys import get_answer_key
+from .ielts_conversion import band_score as convert_band_score, listening_band_score, reading_table_for
+from .ai_grading import fallback_grading, grade_writing_task_ai
+
+logger = logging.getLogger(__name__)
 
 
 def grade_reading_listening(student_test: StudentTest) -> dict:
@@ -14,16 +22,21 @@ def grade_reading_listening(student_test: StudentTest) -> dict:
     Grade Reading and Listening sections by comparing student answers with correct answers.
     Uses official IELTS band score conversion tables.
     
+    Answers are checked against the variant's compiled answer key (see
+    answer_keys), so grading takes one query for the responses plus one to
+    compile the key on a cache miss.
+    
     Returns:
         dict: Dictionary with scores and breakdown for reading and listening
     """
-    variant = student_test.variant
-    responses = TestResponse.objects.filter(
-        student_test=student_test,
-        section__in=['reading', 'listening']
-    )
-    
-    correct_answers = Answer.objects.filter(variant=variant)
+    answer_key = get_answer_key(student_test.variant_id)
+    responses = {
+        (section, question_number): answer
+        for section, question_number, answer in TestResponse.objects.filter(
+            student_test=student_test,
+            section__in=['reading', 'listening']
+        ).values_list('section', 'question_number', 'answer')
+    }
     
     results = {
         'reading': {
@@ -43,47 +56,25 @@ def grade_reading_listening(student_test: StudentTest) -> dict:
     }
     
     # Count correct answers for each section
-    for answer in correct_answers:
-        section = answer.section
-        student_response = responses.filter(
-            section=section,
-            question_number=answer.question_number
-        ).first()
-        
-        # Always increment total for the section if a correct answer exists (part of the test)
-        results[section]['total'] += 1
-        
-        if student_response:
-            
-            # Prepare student answer
-            student_answer = str(student_response.answer).strip()
+    for section, items in answer_key.sections.items():
+        for item in items:
+            # Always increment total for the section if a correct answer exists (part of the test)
+            results[section]['total'] += 1
             
-            # Prepare correct answers (main + alternatives)
-            correct_options = [str(answer.correct_answer).strip()]
-            if answer.alternative_answers:
-                if isinstance(answer.alternative_answers, list):
-                    correct_options.extend([str(a).strip() for a in answer.alternative_answers])
-            
-            # Check if answer is correct (supports case-insensitive matching)
-            is_correct = False
-            if answer.case_sensitive:
-                # Case-sensitive matching
-                is_correct = student_answer in correct_options
-            else:
-                # Case-insensitive matching
-                student_answer_normalized = student_answer.upper()
-                correct_options_normalized = [opt.upper() for opt in correct_options]
-                is_correct = student_answer_normalized in correct_options_normalized
+            key = (section, item.question_number)
+            if key not in responses:
+                continue
             
+            is_correct = item.matches(responses[key])
             if is_correct:
                 results[section]['correct'] += 1
             
             # Track individual question results
-            results[section]['question_results'][answer.question_number] = {
+            results[section]['question_results'][item.question_number] = {
                 'correct': is_correct,
-                'student_answer': student_response.answer,  # Original answer
-                'correct_answer': answer.correct_answer,
-                'alternative_answers': answer.alternative_answers
+                'student_answer': responses[key],  # Original answer
+                'correct_answer': item.correct_answer,
+                'alternative_answers': item.alternative_answers
             }
     
     # Calculate IELTS band scores using official conversion tables
@@ -101,7 +92,7 @@ def grade_reading_listening(student_test: StudentTest) -> dict:
     
     if results['reading']['total'] > 0:
         raw_score = results['reading']['correct']
-        band_score = reading_band_score(raw_score, academic=True)
+        band_score = convert_band_score(raw_score, reading_table_for(student_test.variant))
         results['reading']['score'] = float(band_score)
         results['reading']['breakdown'] = {
             'correct': results['reading']['correct'],
@@ -114,10 +105,80 @@ def grade_reading_listening(student_test: StudentTest) -> dict:
     return results
 
 
-def grade_writing(student_test: StudentTest) -> dict:
+def _grade_task_in_thread(task_number, text, task_prompt, bypass_cache):
+    """Run one AI grading call on a pool thread and release its DB connection."""
+    try:
+        return grade_writing_task_ai(task_number, text, task_prompt, bypass_cache=bypass_cache)
+    finally:
+        # The grading cache uses the database; threads get their own connections.
+        connections.close_all()
+
+
+def grade_writing_tasks(responses: dict, prompts: dict = None, deadline_seconds: float = None,
+                        bypass_cache: bool = False, fallback_on_error: bool = False) -> dict:
+    """
+    Grade writing tasks with AI concurrently, one thread per task.
+    
+    Each call gets ``deadline_seconds`` (WRITING_GRADING_DEADLINE_SECONDS by
+    default), so the wall time is about that of the slowest call instead of
+    their sum. A task whose call misses the deadline gets
+    ``fallback_grading``; the other task keeps its AI grade. A call past its
+    deadline cannot be interrupted: it finishes in the background and its
+    result is discarded. An exception from a call (e.g. every AI provider
+    failed) is raised, so a grading job is retried; with
+    ``fallback_on_error`` that task gets ``fallback_grading`` instead, marked
+    with ``ai_error``.
+    
+    Args:
+        responses: {task_number: response text}
+        prompts: {task_number: task prompt} (optional)
+        deadline_seconds: Seconds each call may take
+        bypass_cache: Skip cached AI results (forced regrade)
+        fallback_on_error: Fall back to word-count grading when a call fails
+        
+    Returns:
+        dict: {task_number: grading result}
+    """
+    if not responses:
+        return {}
+    prompts = prompts or {}
+    if deadline_seconds is None:
+        deadline_seconds = settings.WRITING_GRADING_DEADLINE_SECONDS
+    
+    executor = ThreadPoolExecutor(max_workers=len(responses), thread_name_prefix='writing-grading')
+    try:
+        futures = {
+            task_number: executor.submit(
+                _grade_task_in_thread, task_number, text, prompts.get(task_number), bypass_cache
+            )
+            for task_number, text in responses.items()
+        }
+        deadline = time.monotonic() + deadline_seconds
+        results = {}
+        for task_number, future in futures.items():
+            try:
+                results[task_number] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                logger.warning('Writing Task %s grading missed its %gs deadline; using fallback', task_number, deadline_seconds)
+                results[task_number] = fallback_grading(task_number, responses[task_number])
+                results[task_number]['deadline_exceeded'] = True
+            except Exception as e:
+                if not fallback_on_error:
+                    raise
+                logger.warning('Writing Task %s AI grading failed (%s); using fallback', task_number, e)
+                results[task_number] = fallback_grading(task_number, responses[task_number])
+                results[task_number]['ai_error'] = f'{type(e).__name__}: {e}'
+        return results
+    finally:
+        # Do not wait for calls that missed the deadline.
+        executor.shutdown(wait=False)
+
+
+def grade_writing(student_test: StudentTest, bypass_cache: bool = False,
+                  fallback_on_error: bool = False) -> dict:
     """
     Grade Writing section using AI-powered evaluation.
-    Grades Task 1 and Task 2 separately, then calculates overall writing score.
+    Grades Task 1 and Task 2 concurrently, then calculates overall writing score.
     
     Returns:
         dict: Dictionary with writing scores and breakdown
@@ -147,25 +208,26 @@ def grade_writing(student_test: StudentTest) -> dict:
         'task2_breakdown': None,
     }
     
-    # Grade Task 1
+    # Grade Task 1 and Task 2 concurrently
+    responses = {}
     if task1_response:
         print(f"DEBUG: Found Task 1 response: {task1_response.answer[:50]}...")
-        task1_result = grade_writing_task_ai(1, task1_response.answer, task1_prompt)
-        result['task1_score'] = task1_result['task_score']
-        result['task1_breakdown'] = task1_result['breakdown']
-        result['task1_feedback'] = task1_result.get('feedback', '')
-        result['task1_detailed_feedback'] = task1_result.get('detailed_feedback', '')
+        responses[1] = task1_response.answer
     else:
         print("DEBUG: No Task 1 response found in DB")
-    
-    # Grade Task 2
     if task2_response:
         print(f"DEBUG: Found Task 2 response: {task2_response.answer[:50]}...")
-        task2_result = grade_writing_task_ai(2, task2_response.answer, task2_prompt)
-        result['task2_score'] = task2_result['task_score']
-        result['task2_breakdown'] = task2_result['breakdown']
-        result['task2_feedback'] = task2_result.get('feedback', '')
-        result['task2_detailed_feedback'] = task2_result.get('detailed_feedback', '')
+        responses[2] = task2_response.answer
+    
+    prompts = {1: task1_prompt, 2: task2_prompt}
+    task_results = grade_writing_tasks(
+        responses, prompts, bypass_cache=bypass_cache, fallback_on_error=fallback_on_error
+    )
+    for task_number, task_result in task_results.items():
+        result[f'task{task_number}_score'] = task_result['task_score']
+        result[f'task{task_number}_breakdown'] = task_result['breakdown']
+        result[f'task{task_number}_feedback'] = task_result.get('feedback', '')
+        result[f'task{task_number}_detailed_feedback'] = task_result.get('detailed_feedback', '')
     
     # Calculate overall writing score
     scores = []
@@ -184,57 +246,52 @@ def grade_writing(student_test: StudentTest) -> dict:
     return result
 
 
-def grade_test(student_test: StudentTest) -> TestResult:
+def store_reading_listening(student_test: StudentTest) -> TestResult:
     """
-    Grade a complete test (all sections).
+    Grade Reading and Listening and store the scores on the attempt's TestResult.
+    
+    Fast (no AI calls), so it runs inline when a test is submitted.
     
-    Args:
-        student_test: StudentTest instance to grade
-        
     Returns:
         TestResult: Created or updated TestResult instance
     """
-    if student_test.status != 'submitted':
-        raise ValueError("Test must be submitted before grading")
-    
-    # Grade Reading and Listening
     reading_listening_results = grade_reading_listening(student_test)
     
-    # Grade Writing
-    writing_results = grade_writing(student_test)
-    
-    # Create or update TestResult
-    result, created = TestResult.objects.get_or_create(
+    result, created = TestResult.objects.update_or_create(
         student_test=student_test,
         defaults={
             'listening_score': reading_listening_results['listening']['score'],
             'reading_score': reading_listening_results['reading']['score'],
-            'writing_score': writing_results['overall_score'],
-            'writing_task1_score': writing_results['task1_score'],
-            'writing_task2_score': writing_results['task2_score'],
             'listening_breakdown': reading_listening_results['listening'].get('breakdown'),
             'reading_breakdown': reading_listening_results['reading'].get('breakdown'),
-            'writing_breakdown': {
-                'task1': writing_results.get('task1_breakdown'),
-                'task2': writing_results.get('task2_breakdown'),
-                'task1_feedback': writing_results.get('task1_feedback'),
-                'task2_feedback': writing_results.get('task2_feedback'),
-                'task1_detailed_feedback': writing_results.get('task1_detailed_feedback'),
-                'task2_detailed_feedback': writing_results.get('task2_detailed_feedback'),
-            },
-            'graded_by': None,  # Automated grading
         }
     )
+    result.calculate_overall_score()
+    return result
+
+
+def store_writing(student_test: StudentTest, bypass_cache: bool = False,
+                  fallback_on_error: bool = False) -> TestResult:
+    """
+    Grade Writing with AI, store it on the TestResult and mark the attempt graded.
+    
+    Only the writing and overall fields are written, so a speaking grade
+    stored meanwhile is kept. ``fallback_on_error`` grades a task whose AI
+    call failed by word count instead of raising (see grade_writing_tasks).
+    
+    Returns:
+        TestResult: Updated TestResult instance
+    """
+    writing_results = grade_writing(student_test, bypass_cache=bypass_cache, fallback_on_error=fallback_on_error)
     
-    if not created:
-        # Update existing result
-        result.listening_score = reading_listening_results['listening']['score']
-        result.reading_score = reading_listening_results['reading']['score']
+    with transaction.atomic():
+        result, created = TestResult.objects.select_for_update().get_or_create(
+            student_test=student_test,
+            defaults={'graded_by': None}  # Automated grading
+        )
         result.writing_score = writing_results['overall_score']
         result.writing_task1_score = writing_results['task1_score']
         result.writing_task2_score = writing_results['task2_score']
-        result.listening_breakdown = reading_listening_results['listening'].get('breakdown')
-        result.reading_breakdown = reading_listening_results['reading'].get('breakdown')
         result.writing_breakdown = {
             'task1': writing_results.get('task1_breakdown'),
             'task2': writing_results.get('task2_breakdown'),
@@ -243,14 +300,36 @@ def grade_test(student_test: StudentTest) -> TestResult:
             'task1_detailed_feedback': writing_results.get('task1_detailed_feedback'),
             'task2_detailed_feedback': writing_results.get('task2_detailed_feedback'),
         }
-        result.save()
-    
-    # Calculate overall score
-    result.calculate_overall_score()
-    
-    # Update test status
-    student_test.status = 'graded'
-    student_test.save()
+        result.save(update_fields=[
+            'writing_score', 'writing_task1_score', 'writing_task2_score', 'writing_breakdown'
+        ])
+        
+        # Calculate overall score
+        result.calculate_overall_score()
+        
+        # Update test status
+        student_test.status = 'graded'
+        student_test.save(update_fields=['status'])
     
     return result
 
+
+def grade_test(student_test: StudentTest, bypass_cache: bool = False) -> TestResult:
+    """
+    Grade a complete test (all sections) synchronously.
+    
+    A writing task whose AI grading fails gets the word-count fallback, as
+    there is no retry here.
+    
+    Args:
+        student_test: StudentTest instance to grade
+        bypass_cache: Grade writing afresh instead of reusing cached AI results
+        
+    Returns:
+        TestResult: Created or updated TestResult instance
+    """
+    if student_test.status != 'submitted':
+        raise ValueError("Test must be submitted before grading")
+    
+    store_reading_listening(student_test)
+    return store_writing(student_test, bypass_cache=bypass_cache, fallback_on_error=True)
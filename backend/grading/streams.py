@@ -0,0 +1,198 @@
+"""
+Server-Sent Events stream of a writing task's AI grade.
+
+``writing_feedback_events`` grades one writing task with
+``ai_grading.stream_writing_grade`` and forwards its events as they come: a
+``scores`` event as soon as the model has written the band scores (they come
+first in its answer), ``feedback`` events with the detailed feedback as it is
+generated, then ``result``. A task that is already graded is replayed from
+its TestResult.
+
+The stream never grades on its own: it claims the attempt's queued
+GradingJob, streams this task's grade on a worker thread and then runs the
+job there, which finds the streamed grade in the AI grading cache and only
+calls the model for the other task. So each task is graded once and the
+stored TestResult matches what the student saw. If a grading worker (or the
+stream of the other task) already holds the job, the stream waits for it and
+replays the stored grade. The job runs to the end even if the client
+disconnects.
+
+Like the waiting-room stream, the view is async and needs the ASGI server.
+"""
+
+import asyncio
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.http import JsonResponse, StreamingHttpResponse
+
+from student_portal.models import StudentTest, TestResponse, TestResult
+from student_portal.streams import HEARTBEAT_SECONDS, authenticate_stream_request, format_event
+from .ai_grading import stream_writing_grade
+from .jobs import LEASE_SECONDS, claim_job, run_job, worker_name
+from .models import GradingJob
+from .views import check_is_admin
+
+# Attempts whose writing can be graded.
+GRADABLE_STATUSES = ('submitted', 'graded')
+
+# How often a stream waiting on a job held elsewhere checks whether it finished.
+JOB_POLL_SECONDS = 1.0
+
+_DONE = object()
+
+
+def stored_writing_events(result, task_number):
+    """Events replaying a task grade stored on a TestResult, or None if not graded."""
+    score = getattr(result, f'writing_task{task_number}_score', None) if result else None
+    breakdown = (result.writing_breakdown or {}) if result else {}
+    if score is None or not breakdown.get(f'task{task_number}'):
+        return None
+    stored = {
+        'task_score': float(score),
+        'breakdown': breakdown[f'task{task_number}'],
+        'feedback': breakdown.get(f'task{task_number}_feedback') or '',
+        'stored': True,
+    }
+    events = [('scores', dict(stored))]
+    detailed_feedback = breakdown.get(f'task{task_number}_detailed_feedback') or ''
+    if detailed_feedback:
+        events.append(('feedback', {'text': detailed_feedback}))
+    events.append(('result', {**stored, 'detailed_feedback': detailed_feedback}))
+    return events
+
+
+def _load_task(user, test_id, task_number):
+    """
+    Return (error response or None, stored events or None, student response text, job id).
+    """
+    student_test = StudentTest.objects.filter(id=test_id).first()
+    if student_test is None or (student_test.student_id != user.id and not check_is_admin(user)):
+        return JsonResponse({'error': 'Test not found.'}, status=404), None, None, None
+    if student_test.status not in GRADABLE_STATUSES:
+        return JsonResponse({'error': 'Test has not been submitted yet.'}, status=400), None, None, None
+
+    events = stored_writing_events(TestResult.objects.filter(student_test=student_test).first(), task_number)
+    if events is not None:
+        return None, events, None, None
+
+    answer = (
+        TestResponse.objects.filter(student_test=student_test, section='writing', question_number=task_number)
+        .values_list('answer', flat=True).first()
+    )
+    if not answer:
+        return JsonResponse({'error': f'No answer for Writing Task {task_number}.'}, status=404), None, None, None
+    job_id = (
+        GradingJob.objects.filter(student_test=student_test, kind='writing', status__in=['queued', 'running'])
+        .values_list('id', flat=True).first()
+    )
+    if job_id is None:
+        return JsonResponse({'error': 'Writing is not being graded.'}, status=404), None, None, None
+    return None, None, answer, job_id
+
+
+def _wait_for_job(job_id, test_id, task_number, stop):
+    """Wait for a job held elsewhere to finish; return the stored grade's events or an error event."""
+    deadline = time.monotonic() + LEASE_SECONDS
+    while not stop.is_set() and time.monotonic() < deadline:
+        status = GradingJob.objects.filter(id=job_id).values_list('status', flat=True).first()
+        if status not in ('queued', 'running'):
+            events = stored_writing_events(TestResult.objects.filter(student_test_id=test_id).first(), task_number)
+            return events or [('error', {'error': 'Writing grading failed.'})]
+        time.sleep(JOB_POLL_SECONDS)
+    return [('error', {'error': 'Writing is still being graded; try again later.'})]
+
+
+def _grade_in_thread(loop, queue, stop, job_id, test_id, task_number, answer):
+    """Push the grading events onto ``queue`` from a worker thread."""
+    def push(event):
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    try:
+        worker = f'{worker_name()}:stream'[:64]
+        job = claim_job(job_id, worker)
+        if job is None:
+            for event in _wait_for_job(job_id, test_id, task_number, stop):
+                push(event)
+            return
+        try:
+            # Same arguments as grade_writing (no task prompt), so the job gets a cache hit.
+            for event in stream_writing_grade(task_number, answer, None):
+                push(event)
+        except Exception as e:
+            push(('error', {'error': str(e)}))
+        finally:
+            # Store the grade (and grade the other task) whether or not the stream worked.
+            run_job(job, worker)
+    except Exception as e:
+        push(('error', {'error': str(e)}))
+    finally:
+        connections.close_all()
+        push(_DONE)
+
+
+async def writing_event_stream(job_id, test_id, task_number, answer):
+    """Yield the SSE messages of the grade of one writing task."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+    threading.Thread(
+        target=_grade_in_thread, args=(loop, queue, stop, job_id, test_id, task_number, answer),
+        name='writing-stream', daemon=True
+    ).start()
+
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            if event is _DONE:
+                return
+            yield format_event(*event)
+    finally:
+        # Client gone: stop waiting on a job held elsewhere (a claimed job still runs to the end).
+        stop.set()
+
+
+async def stored_event_stream(events):
+    """Yield the SSE messages of an already stored grade."""
+    for event in events:
+        yield format_event(*event)
+
+
+async def writing_feedback_events(request, test_id, task_number):
+    """Stream the AI grade of a writing task as Server-Sent Events."""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed.'}, status=405)
+
+    if not hasattr(request, 'scope'):
+        return JsonResponse(
+            {'error': 'Writing feedback events require the ASGI server. Use /api/grading/jobs/<id> instead.'},
+            status=501
+        )
+
+    user = await sync_to_async(authenticate_stream_request)(request)
+    if user is None:
+        return JsonResponse(
+            {'error': 'Authentication credentials were not provided or are invalid.'},
+            status=401
+        )
+    if task_number not in (1, 2):
+        return JsonResponse({'error': 'task_number must be 1 or 2.'}, status=400)
+
+    error, events, answer, job_id = await sync_to_async(_load_task)(user, test_id, task_number)
+    if error is not None:
+        return error
+
+    response = StreamingHttpResponse(
+        stored_event_stream(events) if events is not None
+        else writing_event_stream(job_id, test_id, task_number, answer),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,7 +1,15 @@
 from django.urls import path
-from . import views
+from . import streams, views
 
 urlpatterns = [
     path('admin/tests/<int:test_id>/grade', views.grade_student_test, name='grade_student_test'),
+    path('admin/variants/<int:variant_id>/grade-cohort', views.grade_variant_cohort, name='grade_variant_cohort'),
+    path('admin/ai-usage', views.get_ai_usage, name='ai_usage'),
+    path('grading/jobs/<int:job_id>', views.get_grading_job, name='get_grading_job'),
+    path(
+        'grading/tests/<int:test_id>/writing/<int:task_number>/events',
+        streams.writing_feedback_events,
+        name='writing_feedback_events'
+    ),
 ]
 
@@ -0,0 +1,244 @@
+"""
+Per-call accounting of AI grading.
+
+Every writing and speaking call to a provider is stored as an AICallRecord
+with its provider, model, prompt version, input/output tokens (including the
+input tokens served from the provider's prompt cache), latency and outcome.
+Batch regrades record their requests from the usage in the result file.
+``GET /api/admin/ai-usage`` summarizes the table.
+
+The completion functions return a Completion with the provider-reported
+token counts; ``record_call`` times the call and stores the record.
+Streaming calls go through ``record_stream``, which stores the record once
+the stream has ended. A failure to store a record is logged and never fails
+the grading.
+"""
+
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.db import DatabaseError, connections
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from .models import AICallRecord
+from .router import THREAD_NAME_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+class Completion(NamedTuple):
+    """Text of a completion and the token usage the provider reported."""
+
+    text: str
+    input_tokens: int = None
+    output_tokens: int = None
+    cached_input_tokens: int = None
+
+
+def _openai(text, usage) -> Completion:
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return Completion(
+        text,
+        getattr(usage, 'prompt_tokens', None),
+        getattr(usage, 'completion_tokens', None),
+        getattr(details, 'cached_tokens', None),
+    )
+
+
+def _anthropic(text, input_usage, output_usage) -> Completion:
+    cached = getattr(input_usage, 'cache_read_input_tokens', None)
+    input_tokens = getattr(input_usage, 'input_tokens', None)
+    if input_tokens is not None:
+        input_tokens += (cached or 0) + (getattr(input_usage, 'cache_creation_input_tokens', None) or 0)
+    return Completion(text, input_tokens, getattr(output_usage, 'output_tokens', None), cached)
+
+
+def _gemini(text, usage) -> Completion:
+    return Completion(
+        text,
+        getattr(usage, 'prompt_token_count', None),
+        getattr(usage, 'candidates_token_count', None),
+        getattr(usage, 'cached_content_token_count', None),
+    )
+
+
+def openai_completion(response) -> Completion:
+    """Completion of an OpenAI-compatible chat response (OpenAI, Groq)."""
+    return _openai(response.choices[0].message.content, getattr(response, 'usage', None))
+
+
+def anthropic_completion(message) -> Completion:
+    """Completion of an Anthropic message; cache reads and writes count as input."""
+    usage = getattr(message, 'usage', None)
+    return _anthropic(message.content[0].text, usage, usage)
+
+
+def gemini_completion(response) -> Completion:
+    """Completion of a Gemini generate_content response."""
+    return _gemini(response.text, getattr(response, 'usage_metadata', None))
+
+
+def openai_stream(chunks):
+    """
+    Yield the text of an OpenAI-compatible chat stream (OpenAI, Groq).
+
+    Returns the Completion (full text and usage) when the stream ends.
+    """
+    parts, usage = [], None
+    for chunk in chunks:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+        # OpenAI sends usage in a last chunk (include_usage), Groq in x_groq.
+        usage = getattr(chunk, 'usage', None) or getattr(getattr(chunk, 'x_groq', None), 'usage', None) or usage
+    return _openai(''.join(parts), usage)
+
+
+def anthropic_stream(events):
+    """Yield the text of an Anthropic message stream; returns its Completion."""
+    parts, input_usage, output_usage = [], None, None
+    for event in events:
+        if event.type == 'message_start':
+            input_usage = event.message.usage
+        elif event.type == 'content_block_delta' and getattr(event.delta, 'text', None):
+            parts.append(event.delta.text)
+            yield event.delta.text
+        elif event.type == 'message_delta':
+            output_usage = event.usage
+    return _anthropic(''.join(parts), input_usage, output_usage)
+
+
+def gemini_stream(chunks):
+    """Yield the text of a Gemini generate_content_stream; returns its Completion."""
+    parts, usage = [], None
+    for chunk in chunks:
+        if chunk.text:
+            parts.append(chunk.text)
+            yield chunk.text
+        usage = getattr(chunk, 'usage_metadata', None) or usage
+    return _gemini(''.join(parts), usage)
+
+
+def _save(record):
+    try:
+        record.save()
+    except DatabaseError as e:
+        logger.warning('Could not record AI call: %s', e)
+    if threading.current_thread().name.startswith(THREAD_NAME_PREFIX):
+        # Hedged calls run on short-lived router threads; do not leave their connection open.
+        connections.close_all()
+
+
+def record_call(kind, provider, model, prompt_version, call) -> str:
+    """
+    Run ``call()`` (returning a Completion), record it and return its text.
+
+    Failed calls are recorded with their error and the exception re-raised.
+    """
+    record = AICallRecord(kind=kind, provider=provider, model=model, prompt_version=prompt_version)
+    started = time.perf_counter()
+    try:
+        completion = call()
+    except Exception as e:
+        record.ok = False
+        record.error = f'{type(e).__name__}: {e}'[:255]
+        raise
+    else:
+        record.input_tokens = completion.input_tokens
+        record.cached_input_tokens = completion.cached_input_tokens
+        record.output_tokens = completion.output_tokens
+        return completion.text
+    finally:
+        record.latency_ms = round((time.perf_counter() - started) * 1000)
+        _save(record)
+
+
+def record_stream(kind, provider, model, prompt_version, stream):
+    """
+    Like ``record_call`` for a streaming call: yield the text chunks of ``stream()``.
+
+    ``stream()`` returns a generator that returns its Completion when done;
+    the record is stored when the stream ends, fails or is closed.
+    """
+    record = AICallRecord(kind=kind, provider=provider, model=model, prompt_version=prompt_version)
+    started = time.perf_counter()
+    try:
+        completion = yield from stream()
+    except GeneratorExit:
+        record.error = 'Stream closed before the end'
+        raise
+    except Exception as e:
+        record.ok = False
+        record.error = f'{type(e).__name__}: {e}'[:255]
+        raise
+    else:
+        record.input_tokens = completion.input_tokens
+        record.cached_input_tokens = completion.cached_input_tokens
+        record.output_tokens = completion.output_tokens
+    finally:
+        record.latency_ms = round((time.perf_counter() - started) * 1000)
+        _save(record)
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+def get_usage_summary(days=7, kind=None):
+    """
+    Summarize AI calls of the last ``days`` days per kind, provider and model.
+
+    Returns:
+        dict: totals and a row per (kind, provider, model) with calls,
+        failures, token sums, average tokens per call and latency
+        (average and p95, synchronous calls only)
+    """
+    since = timezone.now() - timedelta(days=days)
+    records = AICallRecord.objects.filter(created_at__gte=since)
+    if kind:
+        records = records.filter(kind=kind)
+
+    aggregates = {
+        'calls': Count('id'),
+        'failures': Count('id', filter=Q(ok=False)),
+        'batch_calls': Count('id', filter=Q(batch=True)),
+        'total_input_tokens': Sum('input_tokens'),
+        'total_cached_input_tokens': Sum('cached_input_tokens'),
+        'total_output_tokens': Sum('output_tokens'),
+        'avg_input_tokens': Avg('input_tokens'),
+        'avg_output_tokens': Avg('output_tokens'),
+        'avg_latency_ms': Avg('latency_ms', filter=Q(ok=True)),
+    }
+    latencies = {}
+    for group in records.filter(ok=True, latency_ms__isnull=False).values_list('kind', 'provider', 'model', 'latency_ms'):
+        latencies.setdefault(group[:3], []).append(group[3])
+
+    def row(values):
+        for name in ('avg_input_tokens', 'avg_output_tokens', 'avg_latency_ms'):
+            if values[name] is not None:
+                values[name] = round(values[name], 1)
+        for name in ('total_input_tokens', 'total_cached_input_tokens', 'total_output_tokens'):
+            values[name] = values[name] or 0
+        values['cached_input_share'] = (
+            round(values['total_cached_input_tokens'] / values['total_input_tokens'], 3)
+            if values['total_input_tokens'] else None
+        )
+        return values
+
+    groups = []
+    for values in records.values('kind', 'provider', 'model').annotate(**aggregates).order_by('kind', 'provider', 'model'):
+        values = row(values)
+        values['p95_latency_ms'] = _percentile(latencies.get((values['kind'], values['provider'], values['model'])), 95)
+        groups.append(values)
+
+    totals = row(records.aggregate(**aggregates))
+    totals['p95_latency_ms'] = _percentile([value for values in latencies.values() for value in values], 95)
+    return {'days': days, 'since': since.isoformat(), 'totals': totals, 'groups': groups}
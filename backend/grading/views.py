@@ -6,6 +6,9 @@ from django.shortcuts import get_object_or_404
 from accounts.models import CustomUser
 from student_portal.models import StudentTest, TestResult
 from .services import grade_test
+from .cohort import grade_cohort
+from .models import GradingJob
+from .usage import get_usage_summary
 
 
 def check_is_admin(user):
@@ -64,7 +67,8 @@ def grade_student_test(request, test_id):
         )
     
     try:
-        result = grade_test(student_test)
+        # {"force": true} regrades writing without reusing cached AI results
+        result = grade_test(student_test, bypass_cache=bool(request.data.get('force', False)))
         result.graded_by = request.user
         result.save()
         
@@ -77,3 +81,102 @@ def grade_student_test(request, test_id):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def grade_variant_cohort(request, variant_id):
+    """
+    Grade reading/listening of every submitted attempt of a variant at once.
+    
+    Returns counts, duration and per-question facility/discrimination
+    indices. Pass ``{"submitted_only": true}`` to skip graded attempts.
+    """
+    if not check_is_admin(request.user):
+        return Response(
+            {'error': 'Admin access required.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    from exams.models import Variant
+    variant = get_object_or_404(Variant, id=variant_id)
+    
+    report = grade_cohort(variant, include_graded=not request.data.get('submitted_only', False))
+    return Response(report, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_grading_job(request, job_id):
+    """
+    Status of a grading job, for the student who owns the attempt or an admin.
+    
+    Once the job has succeeded the writing scores are included.
+    """
+    job = get_object_or_404(GradingJob.objects.select_related('student_test'), id=job_id)
+    is_admin = check_is_admin(request.user)
+    if not is_admin and job.student_test.student_id != request.user.id:
+        return Response(
+            {'error': 'Grading job not found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    data = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'run_after': job.run_after,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'student_test_id': job.student_test_id,
+    }
+    if is_admin:
+        data['last_error'] = job.last_error
+    
+    if job.status == 'succeeded':
+        result = TestResult.objects.filter(student_test_id=job.student_test_id).first()
+        if result:
+            data['result'] = {
+                'writing_score': float(result.writing_score) if result.writing_score else None,
+                'writing_task1_score': float(result.writing_task1_score) if result.writing_task1_score else None,
+                'writing_task2_score': float(result.writing_task2_score) if result.writing_task2_score else None,
+                'overall_score': float(result.overall_score) if result.overall_score else None,
+                'writing_breakdown': result.writing_breakdown,
+            }
+    return Response(data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_ai_usage(request):
+    """
+    Summary of AI grading calls: tokens, prompt cache share and latency.
+    
+    Grouped by kind, provider and model over the last ``?days=`` days
+    (default 7); ``?kind=writing`` or ``?kind=speaking`` narrows it down.
+    """
+    if not check_is_admin(request.user):
+        return Response(
+            {'error': 'Admin access required.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    try:
+        days = int(request.query_params.get('days', 7))
+    except ValueError:
+        return Response(
+            {'error': 'days must be a whole number.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if days < 1:
+        return Response(
+            {'error': 'days must be at least 1.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response(
+        get_usage_summary(days=days, kind=request.query_params.get('kind') or None),
+        status=status.HTTP_200_OK
+    )
@@ -121,6 +121,63 @@ else:
         }
 
 
+# Cache
+# Queue status notifications and other cross-request state live in the cache.
+# Use Redis when REDIS_URL is set so every gunicorn/uvicorn worker shares it,
+# otherwise fall back to per-process local memory (fine for a single worker).
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'ielts-moc',
+        }
+    }
+
+# Autosave write-behind: '' writes answers straight to the database, 'cache'
+# buffers them in the cache (needs REDIS_URL so the flusher process sees them),
+# 'journal' appends them to a local file. Buffered saves are written by
+# `manage.py flush_autosave_buffer` and flushed synchronously on submit.
+AUTOSAVE_WRITE_BEHIND = os.getenv('AUTOSAVE_WRITE_BEHIND', '').strip().lower()
+AUTOSAVE_JOURNAL_PATH = os.getenv('AUTOSAVE_JOURNAL_PATH') or str(BASE_DIR / 'autosave.journal')
+
+# Writing Task 1 and Task 2 are graded concurrently; a task whose AI call has
+# not returned within this many seconds gets the word-count fallback grade.
+WRITING_GRADING_DEADLINE_SECONDS = float(os.getenv('WRITING_GRADING_DEADLINE_SECONDS', '60'))
+
+# AI grading results are cached in the database by a hash of the response,
+# prompt version, provider and model; least recently used entries beyond this
+# many are evicted (0 disables the cache).
+AI_GRADING_CACHE_MAX_ENTRIES = int(os.getenv('AI_GRADING_CACHE_MAX_ENTRIES', '20000'))
+
+# AI provider clients are created once per process and keep this many
+# connections alive per provider (see grading.providers).
+AI_PROVIDER_POOL_SIZE = int(os.getenv('AI_PROVIDER_POOL_SIZE', '10'))
+AI_PROVIDER_KEEPALIVE_SECONDS = float(os.getenv('AI_PROVIDER_KEEPALIVE_SECONDS', '120'))
+AI_PROVIDER_TIMEOUT_SECONDS = float(os.getenv('AI_PROVIDER_TIMEOUT_SECONDS', '120'))
+
+# Provider router (grading.router): circuit breaker after this many
+# consecutive failures or this error rate over the rolling window, retried
+# after the cooldown; hedged requests go to the next provider after
+# AI_ROUTER_HEDGE_AFTER_SECONDS (0 disables hedging).
+AI_ROUTER_FAILURE_THRESHOLD = int(os.getenv('AI_ROUTER_FAILURE_THRESHOLD', '3'))
+AI_ROUTER_ERROR_RATE = float(os.getenv('AI_ROUTER_ERROR_RATE', '0.5'))
+AI_ROUTER_WINDOW = int(os.getenv('AI_ROUTER_WINDOW', '20'))
+AI_ROUTER_COOLDOWN_SECONDS = float(os.getenv('AI_ROUTER_COOLDOWN_SECONDS', '60'))
+AI_ROUTER_HEDGE_AFTER_SECONDS = float(os.getenv('AI_ROUTER_HEDGE_AFTER_SECONDS', '0'))
+
+
+# Request/result files of cohort regrades sent through provider batch APIs
+# (see grading.batch_grading).
+GRADING_BATCH_DIR = os.getenv('GRADING_BATCH_DIR') or str(BASE_DIR / 'grading_batches')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -264,6 +321,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -156,13 +156,41 @@ else
     find /app -name "listening.m4a" 2>/dev/null || echo "  (not found)"
 fi
 
+# Queue sweeper: persists waiting-room timeouts and preparation -> started
+# transitions (the status endpoints themselves are read-only)
+echo ""
+echo "Starting queue sweeper..."
+python manage.py sweep_queue --loop --interval 5 &
+
+# Auto-submit: submits and grades attempts whose time ran out (e.g. the
+# student's browser died before they could submit)
+echo "Starting auto-submit worker..."
+python manage.py auto_submit_expired --loop --interval 60 &
+
+# Grading workers: grade writing (AI calls) queued by submissions, outside
+# the request. GRADING_WORKERS sets how many run (default: 2)
+echo "Starting grading workers..."
+for _ in $(seq 1 "${GRADING_WORKERS:-2}"); do
+    python manage.py run_grading_worker --loop --interval 2 &
+done
+
+# Autosave flusher: writes buffered autosaves to the database (only needed
+# when AUTOSAVE_WRITE_BEHIND is enabled)
+if [ -n "$AUTOSAVE_WRITE_BEHIND" ]; then
+    echo "Starting autosave flusher..."
+    python manage.py flush_autosave_buffer --loop --interval 1 &
+fi
+
 echo ""
 echo "=========================================="
 echo "Starting Gunicorn server..."
 echo "=========================================="
 
-# Start Gunicorn with WSGI wrapper that ensures DB is ready
-exec gunicorn ielts_moc.wsgi_init:application \
+# Start Gunicorn with Uvicorn workers: the event streams (queue status, writing
+# feedback) are async views and need the ASGI entry point. The database was
+# made ready above, so the wsgi_init wrapper is not needed.
+exec gunicorn ielts_moc.asgi:application \
+    -k uvicorn.workers.UvicornWorker \
     --bind 0.0.0.0:${PORT:-8000} \
     --workers 2 \
     --timeout 120 \
@@ -0,0 +1,135 @@
+"""
+Active attempt resolution for student endpoints.
+
+Autosave endpoints fire every few seconds per student and each used to look
+up the in-progress StudentTest before writing. The resolver keeps the active
+attempt's id, variant id and deadline in the Django cache, so those endpoints
+skip the lookup on a hit. Writes that start or finish an attempt (start_test,
+StudentTest.submit, the auto-submitter) invalidate the entry once their
+transaction commits.
+
+Invalidation only works when every process shares the cache. With the
+per-process LocMem default (no REDIS_URL) an invalidation by another worker or
+the auto-submitter would go unseen, so nothing is cached and every call reads
+the database.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import StudentTest
+
+ACTIVE_ATTEMPT_KEY = 'active_attempt:{student_id}'
+
+# Bounds how long an entry can outlive a change made outside the invalidating
+# code paths (e.g. an admin deleting the attempt).
+ACTIVE_ATTEMPT_TTL = 15 * 60
+
+# Attribute caching the resolved attempt on the request for its lifetime.
+REQUEST_ATTR = '_active_attempt'
+
+
+class ActiveAttempt:
+    """Id, variant id and deadline of a student's in-progress attempt."""
+
+    __slots__ = ('id', 'variant_id', 'deadline')
+
+    def __init__(self, id, variant_id, deadline):
+        self.id = id
+        self.variant_id = variant_id
+        self.deadline = deadline
+
+    def seconds_remaining(self, now):
+        """Seconds left before the deadline (never negative)."""
+        return max(0, int((self.deadline - now).total_seconds()))
+
+
+def active_attempt_key(student_id) -> str:
+    """Return the cache key holding a student's active attempt."""
+    return ACTIVE_ATTEMPT_KEY.format(student_id=student_id)
+
+
+def cache_is_shared() -> bool:
+    """Whether the default cache is shared by all processes (not per-process LocMem)."""
+    return not settings.CACHES['default']['BACKEND'].endswith('LocMemCache')
+
+
+def _load_active_attempt(student_id):
+    row = StudentTest.objects.filter(
+        student_id=student_id,
+        status='in_progress'
+    ).values('id', 'variant_id', 'start_time', 'variant__duration_minutes').first()
+    if not row:
+        return None
+    return ActiveAttempt(
+        id=row['id'],
+        variant_id=row['variant_id'],
+        deadline=row['start_time'] + timedelta(minutes=row['variant__duration_minutes'])
+    )
+
+
+def get_active_attempt(student_id):
+    """
+    Return the student's in-progress attempt as an ActiveAttempt, or None.
+
+    Only hits are cached: a student without an active attempt is looked up
+    again on the next call, so attempts created by bulk writes (start_mock,
+    the queue sweeper) are picked up without extra invalidation. Without a
+    shared cache the attempt is always read from the database.
+    """
+    if not cache_is_shared():
+        return _load_active_attempt(student_id)
+
+    key = active_attempt_key(student_id)
+    cached = cache.get(key)
+    if cached is not None:
+        return ActiveAttempt(*cached)
+
+    attempt = _load_active_attempt(student_id)
+    if attempt:
+        cache.set(key, (attempt.id, attempt.variant_id, attempt.deadline), timeout=ACTIVE_ATTEMPT_TTL)
+    return attempt
+
+
+def resolve_active_attempt(request):
+    """Return the active attempt of the requesting student, resolved once per request."""
+    if not hasattr(request, REQUEST_ATTR):
+        setattr(request, REQUEST_ATTR, get_active_attempt(request.user.id))
+    return getattr(request, REQUEST_ATTR)
+
+
+def get_active_student_test(request):
+    """Return the requesting student's in-progress StudentTest (with variant), or None."""
+    attempt = resolve_active_attempt(request)
+    if not attempt:
+        return None
+    student_test = StudentTest.objects.select_related('variant').filter(
+        id=attempt.id,
+        status='in_progress'
+    ).first()
+    if not student_test:
+        # Changed behind the cache's back; drop the stale entry.
+        cache.delete(active_attempt_key(request.user.id))
+    return student_test
+
+
+def invalidate_active_attempt(student_ids) -> None:
+    """
+    Drop the cached active attempt of the given students.
+
+    The entry is dropped right away and again once the surrounding
+    transaction commits, so a concurrent request that re-cached the
+    pre-commit state in between does not keep it.
+
+    Args:
+        student_ids: Iterable of student ids (or a single id)
+    """
+    if isinstance(student_ids, int):
+        student_ids = [student_ids]
+    keys = [active_attempt_key(student_id) for student_id in student_ids]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,168 @@
+"""
+Batch submission of expired attempts.
+
+A StudentTest whose browser died stays ``in_progress`` forever and is never
+graded. The auto-submitter finds attempts past ``start_time +
+variant.duration_minutes`` plus a grace period, submits them with set-based
+UPDATEs (``time_remaining_seconds`` is 0: the whole duration was used) and
+grades them batch by batch.
+
+Several workers can run at once. Each claims a batch with a conditional UPDATE
+stamped with its own ``submission_time`` and grades only the rows carrying
+that stamp, so every attempt is submitted and graded by exactly one worker.
+On PostgreSQL the candidate rows are also locked with SKIP LOCKED, so
+concurrent workers pick disjoint batches instead of racing for the same one.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import autosave_buffer, writing_drafts
+from .active_attempts import invalidate_active_attempt
+from .models import StudentTest
+from .process_stats import get_stats, record_stats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+
+# Extra time after the deadline for a final autosave/submit still in flight.
+DEFAULT_GRACE_SECONDS = 120
+
+# ProcessStat holding the stats of the most recent run (for monitoring).
+LAST_AUTO_SUBMIT_KEY = 'auto_submit:last_run'
+
+
+def expired_attempts(now, grace_seconds=DEFAULT_GRACE_SECONDS):
+    """
+    Return a queryset of in-progress attempts past their deadline plus grace.
+
+    Deadlines depend on the variant duration, so the cutoff is built per
+    distinct duration instead of with database-specific interval arithmetic.
+    """
+    durations = (
+        StudentTest.objects.filter(status='in_progress')
+        .values_list('variant__duration_minutes', flat=True)
+        .distinct()
+    )
+    grace = timedelta(seconds=grace_seconds)
+    expired = StudentTest.objects.none()
+    for duration in durations:
+        expired = expired | StudentTest.objects.filter(
+            status='in_progress',
+            variant__duration_minutes=duration,
+            start_time__lte=now - timedelta(minutes=duration) - grace
+        )
+    return expired
+
+
+def _submit_batch(now, batch_size, grace_seconds):
+    """
+    Claim and submit one batch.
+
+    Returns:
+        tuple: (whether any expired attempt was found, ids this worker submitted)
+    """
+    with transaction.atomic():
+        candidate_ids = list(
+            expired_attempts(now, grace_seconds)
+            .order_by('start_time')
+            .select_for_update(skip_locked=True, of=('self',))
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not candidate_ids:
+            return False, []
+
+        # A timestamp unique to this claim tells our rows apart from rows a
+        # concurrent worker submitted between the SELECT and the UPDATE.
+        claimed_at = timezone.now()
+        StudentTest.objects.filter(id__in=candidate_ids, status='in_progress').update(
+            status='submitted',
+            submission_time=claimed_at,
+            time_remaining_seconds=0
+        )
+        claimed = list(
+            StudentTest.objects.filter(
+                id__in=candidate_ids,
+                status='submitted',
+                submission_time=claimed_at
+            ).values_list('id', 'student_id')
+        )
+        invalidate_active_attempt([student_id for _, student_id in claimed])
+    return True, [attempt_id for attempt_id, _ in claimed]
+
+
+def _grade_batch(attempt_ids):
+    """
+    Grade reading/listening of submitted attempts and queue their writing.
+
+    Returns (graded, failed).
+    """
+    from grading.jobs import grade_submitted_test
+
+    graded = failed = 0
+    for student_test in StudentTest.objects.filter(id__in=attempt_ids).select_related('variant'):
+        try:
+            grade_submitted_test(student_test)
+            graded += 1
+        except Exception:
+            # Left as submitted; an admin can grade it from the dashboard.
+            failed += 1
+            logger.exception('Auto-submit: grading attempt %s failed', student_test.id)
+    return graded, failed
+
+
+def auto_submit_expired(batch_size=DEFAULT_BATCH_SIZE, grace_seconds=DEFAULT_GRACE_SECONDS,
+                        grade=True, now=None):
+    """
+    Submit (and grade) every attempt past its deadline plus grace, in batches.
+
+    Returns:
+        dict: attempts submitted/graded/failed, batches and duration in ms
+    """
+    now = now or timezone.now()
+    started = time.perf_counter()
+    stats = {'submitted': 0, 'graded': 0, 'failed': 0, 'batches': 0}
+
+    if autosave_buffer.is_enabled():
+        # Saves acknowledged before the deadline must be graded too.
+        try:
+            autosave_buffer.flush_buffer(wait_seconds=autosave_buffer.SUBMIT_FLUSH_WAIT_SECONDS, force=True)
+        except autosave_buffer.FlushLockTimeout:
+            logger.warning('Auto-submit: autosave buffer busy, skipping this run')
+            return stats
+
+    while True:
+        found, attempt_ids = _submit_batch(now, batch_size, grace_seconds)
+        if not found:
+            break
+        if not attempt_ids:
+            # A concurrent worker took the whole batch; look for more.
+            continue
+        writing_drafts.materialize_drafts(attempt_ids)
+        stats['submitted'] += len(attempt_ids)
+        stats['batches'] += 1
+        if grade:
+            graded, failed = _grade_batch(attempt_ids)
+            stats['graded'] += graded
+            stats['failed'] += failed
+
+    stats['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    stats['run_at'] = now.isoformat()
+    record_stats(LAST_AUTO_SUBMIT_KEY, stats)
+
+    if stats['submitted']:
+        logger.info(
+            'Auto-submit: %s expired attempts submitted, %s graded, %s failed in %s ms',
+            stats['submitted'], stats['graded'], stats['failed'], stats['duration_ms']
+        )
+    return stats
+
+
+def get_last_auto_submit():
+    """Return the stats of the most recent auto-submit run, or None if none ran yet."""
+    return get_stats(LAST_AUTO_SUBMIT_KEY)
@@ -0,0 +1,424 @@
+"""
+Write-behind buffer for student autosaves.
+
+With ``AUTOSAVE_WRITE_BEHIND`` set, full reading/listening answer maps are
+acknowledged as soon as they land in a buffer - the shared cache or an
+append-only local journal file - and written to
+TestResponse in batches by ``manage.py flush_autosave_buffer``. ``submit_test``
+and the auto-submitter flush synchronously before grading, so grading sees
+every acknowledged save; they force the flush past records still being
+written instead of waiting for them.
+
+Flushes hold a lock, so the background flusher and a submit never interleave:
+records are applied in the order they were buffered and only the latest answer
+per (attempt, section, question) is written, with one bulk upsert per batch.
+Answers for attempts that are no longer in progress are dropped.
+
+Delta-sync batches are written through and advance the section's
+AnswerRevision. Each record carries the section revisions current when it was
+buffered; if a section has advanced since, the database holds newer answers
+than the record, so its answers only fill questions that have no row yet
+(an answer such a batch cleared can come back; one it wrote is never lost).
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import AnswerRevision, StudentTest, TestResponse
+from .process_stats import get_stats, record_stats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+# How long submit waits for a running flush before giving up.
+SUBMIT_FLUSH_WAIT_SECONDS = 10
+
+# Stats of the most recent flush (for monitoring).
+LAST_FLUSH_KEY = 'autosave_buffer:last_flush'
+
+
+class FlushLockTimeout(Exception):
+    """Another process kept the flush lock for longer than we could wait."""
+
+
+class CacheBuffer:
+    """
+    Records in the shared cache, numbered by an atomic ``incr`` counter.
+
+    The flusher reads records between the committed tail and the head. A
+    number whose record is missing was claimed by a writer that has not
+    stored it yet, so reading stops there; after GAP_TIMEOUT it is assumed
+    lost (writer crashed or key evicted) and skipped. A forced read goes on
+    past such a gap but does not commit beyond it, so the record is still
+    flushed when it lands.
+    """
+
+    HEAD_KEY = 'autosave_buffer:head'
+    TAIL_KEY = 'autosave_buffer:tail'
+    RECORD_KEY = 'autosave_buffer:record:{seq}'
+    GAP_KEY = 'autosave_buffer:gap:{seq}'
+    LOCK_KEY = 'autosave_buffer:lock'
+
+    RECORD_TTL = 24 * 60 * 60
+    GAP_TIMEOUT = 30
+    LOCK_TTL = 60
+
+    def _record_key(self, seq):
+        return self.RECORD_KEY.format(seq=seq)
+
+    def append(self, record):
+        cache.add(self.HEAD_KEY, 0, timeout=None)
+        seq = cache.incr(self.HEAD_KEY)
+        cache.set(self._record_key(seq), record, timeout=self.RECORD_TTL)
+
+    def read(self, limit, after=None, force=False):
+        """
+        Return (records, position, last) for up to ``limit`` numbers after ``after``.
+
+        ``after`` defaults to the committed tail. ``last`` is the last number
+        read and ``position`` the last one that may be committed; they differ
+        when ``force`` read past a gap.
+        """
+        start = cache.get(self.TAIL_KEY, 0) if after is None else after
+        head = cache.get(self.HEAD_KEY, 0)
+        seqs = range(start + 1, min(head, start + limit) + 1)
+        found = cache.get_many([self._record_key(seq) for seq in seqs])
+
+        records = []
+        position = last = start
+        for seq in seqs:
+            record = found.get(self._record_key(seq))
+            if record is None:
+                gap_key = self.GAP_KEY.format(seq=seq)
+                cache.add(gap_key, time.time(), timeout=self.RECORD_TTL)
+                if time.time() - cache.get(gap_key, time.time()) < self.GAP_TIMEOUT:
+                    if not force:
+                        break
+                    # Still being written: read on, commit up to here only.
+                    last = seq
+                    continue
+                logger.warning('Autosave buffer: record %s missing, skipping it', seq)
+            else:
+                records.append(record)
+            if position == last:
+                position = seq
+            last = seq
+        return records, position, last
+
+    def commit(self, position):
+        tail = cache.get(self.TAIL_KEY, 0)
+        cache.set(self.TAIL_KEY, position, timeout=None)
+        cache.delete_many([self._record_key(seq) for seq in range(tail + 1, position + 1)])
+
+    def depth(self):
+        return max(0, cache.get(self.HEAD_KEY, 0) - cache.get(self.TAIL_KEY, 0))
+
+    @contextmanager
+    def lock(self, wait_seconds):
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait_seconds
+        while not cache.add(self.LOCK_KEY, token, timeout=self.LOCK_TTL):
+            if time.monotonic() >= deadline:
+                raise FlushLockTimeout()
+            time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if cache.get(self.LOCK_KEY) == token:
+                cache.delete(self.LOCK_KEY)
+
+
+class JournalBuffer:
+    """
+    Records appended as JSON lines to a local file.
+
+    The committed read position lives in ``<path>.offset``; once everything
+    is flushed the journal is truncated. Appends and flushes use ``flock``, so
+    every worker process on the host can share one journal. The flusher must
+    run on the same host as the web workers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset_path = f'{path}.offset'
+        self.lock_path = f'{path}.lock'
+
+    def append(self, record):
+        import fcntl
+
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with open(self.path, 'a', encoding='utf-8') as journal:
+            fcntl.flock(journal, fcntl.LOCK_EX)
+            journal.write(line)
+
+    def _offset(self):
+        try:
+            with open(self.offset_path, encoding='utf-8') as offset_file:
+                offset = int(offset_file.read() or 0)
+        except (FileNotFoundError, ValueError):
+            offset = 0
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        # Larger than the file: it was truncated after the offset was written.
+        return offset if offset <= size else 0
+
+    def _write_offset(self, offset):
+        tmp_path = f'{self.offset_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as offset_file:
+            offset_file.write(str(offset))
+        os.replace(tmp_path, self.offset_path)
+
+    def read(self, limit, after=None, force=False):
+        """
+        Return (records, position, position) for up to ``limit`` complete lines after ``after``.
+
+        ``after`` defaults to the committed offset. A journal has no gaps, so
+        ``force`` changes nothing.
+        """
+        position = self._offset() if after is None else after
+        if not os.path.exists(self.path):
+            return [], position, position
+
+        records = []
+        with open(self.path, 'rb') as journal:
+            journal.seek(position)
+            while len(records) < limit:
+                line = journal.readline()
+                if not line.endswith(b'\n'):
+                    # Nothing more, or a line still being written.
+                    break
+                records.append(json.loads(line))
+                position = journal.tell()
+        return records, position, position
+
+    def commit(self, position):
+        import fcntl
+
+        self._write_offset(position)
+        with open(self.path, 'a', encoding='utf-8') as journal:
+            fcntl.flock(journal, fcntl.LOCK_EX)
+            if journal.tell() == position:
+                journal.truncate(0)
+                self._write_offset(0)
+
+    def depth(self):
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, 'rb') as journal:
+            journal.seek(self._offset())
+            return journal.read().count(b'\n')
+
+    @contextmanager
+    def lock(self, wait_seconds):
+        import fcntl
+
+        deadline = time.monotonic() + wait_seconds
+        with open(self.lock_path, 'w') as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise FlushLockTimeout()
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_buffers = {}
+
+
+def get_buffer():
+    """Return the configured buffer, or None when saves are written through."""
+    mode = settings.AUTOSAVE_WRITE_BEHIND
+    if not mode:
+        return None
+
+    if mode not in _buffers:
+        if mode == 'cache':
+            backend = settings.CACHES['default']['BACKEND']
+            if backend.endswith('LocMemCache'):
+                # The flusher runs in another process and could never see the records.
+                logger.warning('AUTOSAVE_WRITE_BEHIND=cache needs a shared cache (REDIS_URL); writing through')
+                _buffers[mode] = None
+            else:
+                _buffers[mode] = CacheBuffer()
+        elif mode == 'journal':
+            _buffers[mode] = JournalBuffer(settings.AUTOSAVE_JOURNAL_PATH)
+        else:
+            logger.warning('Unknown AUTOSAVE_WRITE_BEHIND=%r; writing through', mode)
+            _buffers[mode] = None
+    return _buffers[mode]
+
+
+def is_enabled():
+    return get_buffer() is not None
+
+
+def buffer_answers(student_test_id, answers):
+    """
+    Buffer one save.
+
+    Args:
+        student_test_id: Attempt the answers belong to
+        answers: List of (section, question_number, answer) tuples
+    """
+    if not answers:
+        return
+    revisions = dict(
+        AnswerRevision.objects.filter(
+            student_test_id=student_test_id,
+            section__in={section for section, _, _ in answers}
+        ).values_list('section', 'revision')
+    )
+    get_buffer().append({
+        'at': time.time(),
+        'student_test_id': student_test_id,
+        'answers': [list(answer) for answer in answers],
+        'revisions': revisions,
+    })
+
+
+def _apply(records):
+    """
+    Write the latest answer per key of in-progress attempts.
+
+    Answers of a section whose revision advanced after the record was
+    buffered only fill missing rows (see the module docstring).
+
+    Returns:
+        tuple: (rows, dropped, superseded) - superseded answers were only
+        used to fill missing rows
+    """
+    attempt_ids = {record['student_test_id'] for record in records}
+    current = {
+        (student_test_id, section): revision
+        for student_test_id, section, revision in AnswerRevision.objects.filter(
+            student_test_id__in=attempt_ids
+        ).values_list('student_test_id', 'section', 'revision')
+    }
+
+    latest, superseded = {}, {}
+    for record in records:
+        revisions = record.get('revisions', {})
+        for section, question_number, answer in record['answers']:
+            key = (record['student_test_id'], section, question_number)
+            if current.get(key[:2], 0) > revisions.get(section, 0):
+                superseded[key] = answer
+            else:
+                latest[key] = answer
+    # Revisions only grow, so a key with a current answer has no later superseded one.
+    fill = {key: answer for key, answer in superseded.items() if key not in latest}
+    if not latest and not fill:
+        return 0, 0, 0
+
+    live = set(
+        StudentTest.objects.filter(
+            id__in={student_test_id for student_test_id, _, _ in [*latest, *fill]},
+            status='in_progress'
+        ).values_list('id', flat=True)
+    )
+
+    def rows(answers):
+        return [
+            TestResponse(
+                student_test_id=student_test_id,
+                section=section,
+                question_number=question_number,
+                answer=answer
+            )
+            for (student_test_id, section, question_number), answer in answers.items()
+            if student_test_id in live
+        ]
+
+    upserts, fills = rows(latest), rows(fill)
+    if upserts:
+        TestResponse.objects.bulk_create(
+            upserts,
+            update_conflicts=True,
+            unique_fields=['student_test', 'section', 'question_number'],
+            update_fields=['answer', 'updated_at'],
+            batch_size=DEFAULT_BATCH_SIZE
+        )
+    if fills:
+        TestResponse.objects.bulk_create(fills, ignore_conflicts=True, batch_size=DEFAULT_BATCH_SIZE)
+    written = len(upserts) + len(fills)
+    return written, len(latest) + len(fill) - written, len(superseded)
+
+
+def flush_buffer(batch_size=DEFAULT_BATCH_SIZE, wait_seconds=0, force=False):
+    """
+    Write every buffered save to the database, batch by batch.
+
+    With ``force`` (submit) records behind a save still being written are
+    flushed too instead of waiting for it; the buffer is only committed up to
+    that save, so it is flushed later.
+
+    Raises FlushLockTimeout if another flush holds the lock for longer than
+    ``wait_seconds``.
+
+    Returns:
+        dict: records/rows written, rows dropped, superseded answers, batches,
+        duration, the oldest flushed record's age (flush latency) and
+        remaining depth
+    """
+    buffer = get_buffer()
+    started = time.perf_counter()
+    stats = {'records': 0, 'rows': 0, 'dropped': 0, 'superseded': 0, 'batches': 0, 'max_latency_ms': None}
+    if buffer is None:
+        return stats
+
+    with buffer.lock(wait_seconds):
+        after = previous = None
+        committing = True
+        while True:
+            records, position, last = buffer.read(batch_size, after, force)
+            if records:
+                with transaction.atomic():
+                    rows, dropped, superseded = _apply(records)
+                oldest = min(record['at'] for record in records)
+                latency_ms = round((time.time() - oldest) * 1000, 2)
+                stats['max_latency_ms'] = max(stats['max_latency_ms'] or 0, latency_ms)
+                stats['records'] += len(records)
+                stats['rows'] += rows
+                stats['dropped'] += dropped
+                stats['superseded'] += superseded
+                stats['batches'] += 1
+            if committing:
+                buffer.commit(position)
+                committing = position == last
+            if last == previous or (not force and len(records) < batch_size):
+                break
+            previous = last
+            # Past a held gap, read on from where this batch ended.
+            after = None if committing else last
+
+    stats['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    stats['depth'] = buffer.depth()
+    stats['flushed_at'] = time.time()
+    if stats['records']:
+        record_stats(LAST_FLUSH_KEY, stats)
+    return stats
+
+
+def get_buffer_stats():
+    """Return the buffer mode, current depth and last non-empty flush, or None when disabled."""
+    buffer = get_buffer()
+    if buffer is None:
+        return None
+    return {
+        'mode': settings.AUTOSAVE_WRITE_BEHIND,
+        'depth': buffer.depth(),
+        'last_flush': get_stats(LAST_FLUSH_KEY),
+    }
@@ -0,0 +1,140 @@
+"""
+Idempotency keys for retried student writes.
+
+Clients on flaky networks retry ``submit`` and the autosave endpoints. With an
+``Idempotency-Key`` header the first response is stored for IDEMPOTENCY_TTL
+and a retry with the same key gets it back (marked with
+``Idempotent-Replayed: true``) without running the view again, so a retried
+submit never grades twice. A retry arriving while the first request is still
+running gets 409. Keys are scoped to the user and the view; reusing one with a
+different body is rejected with 422. Server errors are not stored, so the
+client can retry them.
+
+Responses are stored as IdempotencyRecord rows, not in the cache: with the
+default per-process cache a retry reaching another worker would run again.
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyRecord
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+# How long a completed response is replayed.
+IDEMPOTENCY_TTL = 24 * 60 * 60
+
+# How long a request counts as in flight; covers a submit waiting on AI grading.
+IN_FLIGHT_TTL = 5 * 60
+
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return Response(
+            {'error': 'Idempotency-Key was already used for a different request.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(record.data, status=record.status_code, headers={REPLAYED_HEADER: 'true'})
+
+
+def _in_flight():
+    return Response(
+        {'error': 'A request with this Idempotency-Key is still being processed.'},
+        status=status.HTTP_409_CONFLICT,
+        headers={'Retry-After': '1'}
+    )
+
+
+def _expired(record, now):
+    ttl = IDEMPOTENCY_TTL if record.state == 'done' else IN_FLIGHT_TTL
+    return record.updated_at < now - timedelta(seconds=ttl)
+
+
+def _claim(user, view, key, fingerprint):
+    """
+    Store ``key`` as in flight.
+
+    Returns (record, None) when this request should run the view, or
+    (None, response) to answer a retry without running it.
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            record = IdempotencyRecord.objects.create(user=user, view=view, key=key, fingerprint=fingerprint)
+    except IntegrityError:
+        record = IdempotencyRecord.objects.filter(user=user, view=view, key=key).first()
+    else:
+        IdempotencyRecord.objects.filter(
+            user=user, updated_at__lt=now - timedelta(seconds=IDEMPOTENCY_TTL)
+        ).delete()
+        return record, None
+
+    if record is not None and not _expired(record, now):
+        if record.state == 'done':
+            return None, _replay(record, fingerprint)
+        return None, _in_flight()
+
+    if record is None:
+        # Deleted (server error) since our insert failed; claim the key again.
+        return _claim(user, view, key, fingerprint)
+
+    # Expired: take the record over, unless another retry just did.
+    taken = IdempotencyRecord.objects.filter(id=record.id, updated_at=record.updated_at).update(
+        state='in_flight', fingerprint=fingerprint, status_code=None, data=None, updated_at=now
+    )
+    if not taken:
+        return None, _in_flight()
+    return record, None
+
+
+def idempotent(view_func):
+    """
+    Replay the stored response for a repeated ``Idempotency-Key``.
+
+    Apply below ``@permission_classes`` so the request is authenticated.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_func(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        record, response = _claim(request.user, view_func.__name__, key, _fingerprint(request))
+        if response is not None:
+            return response
+
+        try:
+            response = view_func(request, *args, **kwargs)
+        except Exception:
+            IdempotencyRecord.objects.filter(id=record.id).delete()
+            raise
+
+        if response.status_code >= 500:
+            IdempotencyRecord.objects.filter(id=record.id).delete()
+        else:
+            IdempotencyRecord.objects.filter(id=record.id).update(
+                state='done', status_code=response.status_code, data=response.data, updated_at=timezone.now()
+            )
+        return response
+
+    return wrapper
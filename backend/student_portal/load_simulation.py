@@ -0,0 +1,544 @@
+"""
+Exam-day load simulation.
+
+Drives N concurrent simulated students through the whole student flow - login,
+enter_test_code, queue polling, activation via start_mock, autosaves on the
+frontend cadence and submit_test (optionally speaking) - either in-process
+through Django's test client or over HTTP against a running local server.
+Every request is recorded per endpoint with its latency, status and (in-process
+only) its DB query count. Used by the ``simulate_exam_day`` management command.
+
+In-process no grading worker runs, so each student runs its own queued
+writing GradingJob right after submitting, as the worker would. Against a
+server, its worker grades them.
+
+Simulated students, their variant and everything they create are committed
+while the simulation runs and deleted afterwards.
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from unittest import mock
+from urllib import error as urlerror
+from urllib import request as urlrequest
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.test import Client
+from django.utils import timezone
+
+from .benchmarking import measure, percentile
+
+logger = logging.getLogger(__name__)
+
+PASSWORD = 'exam-day-simulation'
+
+QUESTIONS_PER_SECTION = 40
+ANSWER_CHOICES = ['A', 'B', 'C', 'D', 'TRUE', 'FALSE', 'NOT GIVEN']
+ESSAY_WORDS = (
+    'the chart shows that more people preferred public transport while the '
+    'number of cars decreased significantly over the period in contrast '
+    'some argue that governments should invest in education rather than '
+    'infrastructure because it benefits society in the long term'
+).split()
+WRITING_WORDS = {1: 170, 2: 280}
+
+SPEAKING_QUESTIONS = {
+    'part1': {'topic': 'Home', 'questions': ['Where do you live?', 'Do you like it?']},
+    'part2': {'topic': 'A journey', 'prompt': 'Describe a journey you remember.', 'points': ['where', 'when'], 'final': 'and explain why.'},
+    'part3': {'topics': [{'questions': ['Why do people travel?']}]},
+}
+
+# Every name the AI services are reachable under; patched in-process only.
+STUB_TARGETS = {
+    'writing': ['grading.ai_grading.grade_writing_task_ai', 'grading.services.grade_writing_task_ai'],
+    'whisper': ['grading.speech_to_text.transcribe_audio_whisper'],
+    'speaking': ['grading.ai_speaking_grading.grade_speaking_part_ai'],
+}
+
+
+def _sleep_ms(latency_ms):
+    # +/-25% jitter so stubbed calls do not complete in lockstep.
+    if latency_ms > 0:
+        time.sleep(latency_ms * random.uniform(0.75, 1.25) / 1000)
+
+
+@contextmanager
+def stub_ai_services(llm_latency_ms, whisper_latency_ms):
+    """Replace the writing/speaking LLM graders and Whisper with offline stubs."""
+
+    def grade_writing_task(task_number, student_response, task_prompt=None, bypass_cache=False):
+        _sleep_ms(llm_latency_ms)
+        score = 6.5 if task_number == 1 else 7.0
+        return {
+            'task_score': score,
+            'breakdown': {
+                'task_achievement': score,
+                'coherence_cohesion': score,
+                'lexical_resource': score,
+                'grammatical_range': score,
+            },
+            'feedback': 'Simulated grading.',
+            'ai_used': False,
+        }
+
+    def transcribe(audio_file_path):
+        _sleep_ms(whisper_latency_ms)
+        return {
+            'success': True,
+            'text': 'Simulated transcription of the answer.',
+            'language': 'en',
+            'duration': 30.0,
+            'error': None,
+        }
+
+    def grade_speaking_part(part_number, topic, questions, student_response, bypass_cache=False):
+        _sleep_ms(llm_latency_ms)
+        return {
+            'overall_score': 6.5,
+            'breakdown': {
+                'fluency_coherence': 6.5,
+                'lexical_resource': 6.5,
+                'grammatical_range': 6.5,
+                'pronunciation': 6.5,
+            },
+            'feedback': 'Simulated grading.',
+            'detailed_feedback': '',
+            'ai_used': False,
+        }
+
+    stubs = {'writing': grade_writing_task, 'whisper': transcribe, 'speaking': grade_speaking_part}
+    with ExitStack() as stack:
+        for service, targets in STUB_TARGETS.items():
+            for target in targets:
+                stack.enter_context(mock.patch(target, stubs[service]))
+        yield
+
+
+def _decode(content):
+    try:
+        return json.loads(content or b'{}')
+    except ValueError:
+        return {}
+
+
+def _client_host():
+    """A host name the test client can use that passes ALLOWED_HOSTS."""
+    for host in settings.ALLOWED_HOSTS:
+        if host and host != '*':
+            return host.lstrip('.')
+    return 'testserver'
+
+
+class InProcessTransport:
+    """Sends requests through Django's test client and counts their DB queries."""
+
+    def __init__(self):
+        # Server errors come back as 500 responses, as they would over HTTP.
+        self.client = Client(SERVER_NAME=_client_host(), raise_request_exception=False)
+
+    def send(self, method, path, data=None, files=None, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        if method == 'GET':
+            result = measure(self.client.get, path, data or {}, **headers)
+        elif files:
+            payload = dict(data or {})
+            for field, (filename, content, content_type) in files.items():
+                payload[field] = SimpleUploadedFile(filename, content, content_type=content_type)
+            result = measure(self.client.post, path, payload, **headers)
+        else:
+            result = measure(
+                self.client.post, path, json.dumps(data or {}), content_type='application/json', **headers
+            )
+        return result.result.status_code, _decode(result.result.content), result.queries
+
+    def close(self):
+        # Each simulated student runs in its own thread with its own connection.
+        connections.close_all()
+
+
+class HttpTransport:
+    """Sends requests to a running server; DB queries cannot be counted."""
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def send(self, method, path, data=None, files=None, token=None):
+        url = self.base_url + path
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        body = None
+        if method == 'GET':
+            if data:
+                url = f'{url}?{urlencode(data)}'
+        elif files:
+            body, headers['Content-Type'] = self._multipart(data or {}, files)
+        else:
+            body = json.dumps(data or {}).encode()
+            headers['Content-Type'] = 'application/json'
+
+        req = urlrequest.Request(url, data=body, headers=headers, method=method)
+        try:
+            with urlrequest.urlopen(req, timeout=self.timeout) as response:
+                return response.status, _decode(response.read()), None
+        except urlerror.HTTPError as exc:
+            return exc.code, _decode(exc.read()), None
+
+    def _multipart(self, data, files):
+        boundary = uuid.uuid4().hex
+        parts = []
+        for name, value in data.items():
+            parts.append(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+            )
+        for name, (filename, content, content_type) in files.items():
+            parts.append(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                f'Content-Type: {content_type}\r\n\r\n'.encode() + content + b'\r\n'
+            )
+        parts.append(f'--{boundary}--\r\n'.encode())
+        return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+    def close(self):
+        pass
+
+
+class Recorder:
+    """Thread-safe per-endpoint collection of (latency, status, queries) samples."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+
+    def record(self, endpoint, elapsed_ms, status, queries):
+        with self._lock:
+            self.samples[endpoint].append((elapsed_ms, status, queries))
+
+    def summary(self):
+        """Return one row per endpoint with count, error rate, latency percentiles and queries."""
+        rows = []
+        for endpoint, samples in self.samples.items():
+            latencies = [elapsed for elapsed, _, _ in samples]
+            errors = sum(1 for _, status, _ in samples if status is None or status >= 400)
+            queries = [count for _, _, count in samples if count is not None]
+            rows.append({
+                'endpoint': endpoint,
+                'requests': len(samples),
+                'errors': errors,
+                'error_rate': errors / len(samples),
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'queries': sum(queries) / len(queries) if queries else None,
+                'max_queries': max(queries) if queries else None,
+            })
+        return rows
+
+
+class SessionAborted(Exception):
+    """A simulated student hit an error it cannot continue after."""
+
+
+class SimulatedStudent:
+    """One student walking through the exam flow in its own thread."""
+
+    def __init__(self, simulation, username, seed):
+        self.sim = simulation
+        self.username = username
+        self.rng = random.Random(seed)
+        self.transport = simulation.make_transport()
+        self.token = None
+        self.completed = False
+
+    def call(self, endpoint, method, path, data=None, files=None, expect_ok=True):
+        started = time.perf_counter()
+        try:
+            status_code, body, queries = self.transport.send(method, '/api' + path, data, files, self.token)
+        except Exception as exc:
+            self.sim.recorder.record(endpoint, (time.perf_counter() - started) * 1000, None, None)
+            raise SessionAborted(f'{endpoint}: {exc}') from exc
+        self.sim.recorder.record(endpoint, (time.perf_counter() - started) * 1000, status_code, queries)
+        if expect_ok and status_code >= 400:
+            raise SessionAborted(f'{endpoint}: HTTP {status_code} {body.get("error", body)}')
+        return status_code, body
+
+    def pause(self, exam_seconds):
+        """Sleep for an exam-time interval, compressed by the time scale and jittered."""
+        time.sleep(exam_seconds / self.sim.time_scale * self.rng.uniform(0.5, 1.5))
+
+    def run(self):
+        try:
+            self._run()
+            self.completed = True
+        except SessionAborted as exc:
+            logger.info('Simulated student %s stopped: %s', self.username, exc)
+        finally:
+            self.sim.mark_joined(self)
+            self.transport.close()
+
+    def _run(self):
+        # Spread arrivals so logins do not all land in the same instant.
+        time.sleep(self.rng.uniform(0, self.sim.poll_interval))
+        _, body = self.call('login', 'POST', '/student/login', {
+            'login': self.username,
+            'password': PASSWORD,
+        })
+        self.token = body['accessToken']
+
+        self.call('enter_test_code', 'POST', '/student/enter-test-code', {'testCode': self.sim.variant.code})
+        self.sim.mark_joined(self)
+
+        self._wait_for_start()
+        self.call('start_test', 'POST', '/student/start-test')
+        self.call('get_current_test', 'GET', '/student/test')
+
+        for section in ('listening', 'reading'):
+            self._answer_section(section)
+        self._write_essays()
+
+        _, body = self.call('submit_test', 'POST', '/student/submit')
+        if self.sim.counts_queries and body.get('grading_job'):
+            self.sim.run_grading_job(body['grading_job']['id'])
+
+        if self.sim.speaking:
+            self._speak()
+
+    def _wait_for_start(self):
+        deadline = time.monotonic() + self.sim.max_wait
+        while time.monotonic() < deadline:
+            _, body = self.call('check_queue_status', 'GET', '/student/queue-status')
+            if body.get('status') == 'started' or body.get('can_start'):
+                return
+            if body.get('status') in ('timeout', 'left', 'none'):
+                raise SessionAborted(f'queue entry ended as {body.get("status")}')
+            # Polling keeps the real waiting-room cadence.
+            time.sleep(self.sim.poll_interval)
+        self.sim.recorder.record('check_queue_status (gave up)', 0.0, None, None)
+        raise SessionAborted('test did not start in time')
+
+    def _answer_section(self, section):
+        answers = {}
+        autosaves = self.sim.autosaves
+        for round_number in range(1, autosaves + 1):
+            answered = round(QUESTIONS_PER_SECTION * round_number / autosaves)
+            for question in range(len(answers) + 1, answered + 1):
+                answers[str(question)] = self.rng.choice(ANSWER_CHOICES)
+            self.pause(self.sim.autosave_interval)
+            # The frontend ignores failed autosaves and retries on the next tick.
+            self.call(
+                f'save_{section}_answers', 'POST', f'/student/answers/{section}', {'answers': answers},
+                expect_ok=False
+            )
+
+    def _write_essays(self):
+        autosaves = self.sim.autosaves
+        for round_number in range(1, autosaves + 1):
+            self.pause(self.sim.autosave_interval)
+            for task_number, words in WRITING_WORDS.items():
+                length = round(words * round_number / autosaves)
+                content = ' '.join(self.rng.choice(ESSAY_WORDS) for _ in range(length))
+                self.call('save_writing_task', 'POST', '/student/answers/writing-task', {
+                    'task_number': task_number,
+                    'content': content,
+                }, expect_ok=False)
+
+    def _speak(self):
+        self.call('get_speaking_questions', 'GET', '/student/speaking/questions')
+        for part_number in (1, 2, 3):
+            self.pause(self.sim.autosave_interval)
+            self.call('upload_speaking_audio', 'POST', '/student/speaking/upload-audio', {
+                'part_number': part_number,
+                'question_number': 1,
+            }, files={'audio_file': (f'part{part_number}.webm', b'\x1aE\xdf\xa3simulated', 'audio/webm')})
+        self.call('transcribe_and_grade_speaking', 'POST', '/student/speaking/transcribe-grade')
+
+
+class ExamDaySimulation:
+    """
+    Seeds a hall of students, runs them concurrently and collects the results.
+
+    Args:
+        students: Number of simulated students (one thread each)
+        base_url: Send requests to this server instead of in-process; it must
+            use the same database as this process
+        poll_interval: Waiting-room polling interval in seconds (not scaled)
+        autosave_interval: Autosave cadence in exam seconds
+        autosaves: Autosaves per section
+        time_scale: Exam seconds per real second for autosave pauses
+        fast_forward: Skip the real preparation minute after activation
+        speaking: Also upload speaking audio and run transcription/grading
+        max_wait: Real seconds a student waits for activation before giving up
+    """
+
+    def __init__(self, students, *, base_url=None, poll_interval=2.0, autosave_interval=30.0,
+                 autosaves=6, time_scale=60.0, fast_forward=True, speaking=False, max_wait=300.0):
+        self.students = students
+        self.base_url = base_url
+        self.poll_interval = poll_interval
+        self.autosave_interval = autosave_interval
+        self.autosaves = autosaves
+        self.time_scale = time_scale
+        self.fast_forward = fast_forward
+        self.speaking = speaking
+        self.max_wait = max_wait
+
+        self.recorder = Recorder()
+        self.run_id = uuid.uuid4().hex[:8]
+        self.variant = None
+        self.admin_username = None
+        self.usernames = []
+        self._joined = set()
+        self._joined_lock = threading.Lock()
+        self._all_joined = threading.Event()
+        self.activation_error = None
+
+    @property
+    def counts_queries(self):
+        return self.base_url is None
+
+    def make_transport(self):
+        if self.base_url:
+            return HttpTransport(self.base_url)
+        return InProcessTransport()
+
+    def mark_joined(self, student):
+        with self._joined_lock:
+            self._joined.add(student.username)
+            if len(self._joined) >= len(self.usernames):
+                self._all_joined.set()
+
+    def run_grading_job(self, job_id):
+        """Run one queued writing GradingJob in this thread and record it like a request."""
+        from grading.jobs import process_jobs
+
+        started = time.perf_counter()
+        stats = process_jobs(job_ids=[job_id], worker=f'examday-{self.run_id}')
+        # A job that will be retried or failed counts as an error.
+        self.recorder.record(
+            'grading_job (in-process)', (time.perf_counter() - started) * 1000,
+            200 if stats['succeeded'] else 500, None
+        )
+
+    def grading_summary(self):
+        """Count the simulated attempts' grading jobs per status."""
+        from django.db.models import Count
+        from grading.models import GradingJob
+
+        return dict(
+            GradingJob.objects.filter(student_test__student__username__startswith=f'examday_{self.run_id}_')
+            .values_list('status').annotate(count=Count('id')).values_list('status', 'count')
+        )
+
+    def seed(self):
+        """Create (and commit) the variant, its answer keys, an admin and the students."""
+        from accounts.models import CustomUser
+        from exams.models import Answer, TestFile, Variant
+
+        password = make_password(PASSWORD)
+        rng = random.Random(self.run_id)
+
+        self.variant = Variant.objects.create(
+            name=f'Exam day simulation {self.run_id}',
+            duration_minutes=180,
+            is_active=False
+        )
+        Answer.objects.bulk_create([
+            Answer(
+                variant=self.variant,
+                section=section,
+                question_number=question,
+                correct_answer=rng.choice(ANSWER_CHOICES)
+            )
+            for section in ('listening', 'reading')
+            for question in range(1, QUESTIONS_PER_SECTION + 1)
+        ])
+        if self.speaking:
+            TestFile.objects.create(
+                variant=self.variant,
+                file_type='speaking',
+                file='',
+                questions_data=SPEAKING_QUESTIONS
+            )
+
+        self.admin_username = f'examday_{self.run_id}_admin'
+        self.usernames = [f'examday_{self.run_id}_{i}' for i in range(self.students)]
+        CustomUser.objects.bulk_create(
+            [CustomUser(username=self.admin_username, role='admin', password=password)]
+            + [CustomUser(username=username, role='student', password=password) for username in self.usernames],
+            batch_size=1000
+        )
+
+    def cleanup(self):
+        """Delete everything the simulation created, including uploaded audio."""
+        from accounts.models import CustomUser
+        from .models import SpeakingResponse
+
+        prefix = f'examday_{self.run_id}_'
+        for response in SpeakingResponse.objects.filter(student_test__student__username__startswith=prefix):
+            if response.audio_file:
+                response.audio_file.delete(save=False)
+        CustomUser.objects.filter(username__startswith=prefix).delete()
+        if self.variant:
+            self.variant.delete()
+
+    def _activate(self):
+        """Admin side: once the hall has joined, start the mock and skip preparation."""
+        from .models import TestQueue
+
+        admin = SimulatedStudent(self, self.admin_username, seed=0)
+        try:
+            if not self._all_joined.wait(timeout=self.max_wait):
+                logger.warning('Not every simulated student joined; starting the mock anyway')
+            _, body = admin.call('admin_login', 'POST', '/admin/login', {
+                'login': self.admin_username,
+                'password': PASSWORD,
+            })
+            admin.token = body['accessToken']
+            admin.call('start_mock', 'POST', f'/admin/tests/{self.variant.id}/start-mock')
+            if self.fast_forward:
+                TestQueue.objects.filter(test_code=self.variant.code, status='preparation').update(
+                    preparation_started_at=timezone.now() - timedelta(seconds=TestQueue.PREPARATION_SECONDS)
+                )
+        except SessionAborted as exc:
+            self.activation_error = str(exc)
+        finally:
+            admin.transport.close()
+
+    def run(self, llm_latency_ms=1500, whisper_latency_ms=800):
+        """
+        Run the simulation and return (summary rows, completed students, wall
+        seconds, grading jobs per status).
+
+        AI services are stubbed in-process; a live server grades with whatever
+        providers it is configured with.
+        """
+        students = [
+            SimulatedStudent(self, username, seed=index)
+            for index, username in enumerate(self.usernames)
+        ]
+        threads = [threading.Thread(target=self._activate, name='examday-admin')]
+        threads += [
+            threading.Thread(target=student.run, name=f'examday-{index}')
+            for index, student in enumerate(students)
+        ]
+
+        started = time.perf_counter()
+        with stub_ai_services(llm_latency_ms, whisper_latency_ms):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - started
+
+        completed = sum(1 for student in students if student.completed)
+        return self.recorder.summary(), completed, elapsed, self.grading_summary()
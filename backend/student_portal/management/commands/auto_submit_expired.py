@@ -0,0 +1,80 @@
+"""
+Management command to submit and grade attempts whose time ran out.
+
+Run once (e.g. from cron) or as a long-running worker with ``--loop``. Safe to
+run from several workers at once.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from student_portal.auto_submit import (
+    DEFAULT_BATCH_SIZE, DEFAULT_GRACE_SECONDS, auto_submit_expired
+)
+
+
+class Command(BaseCommand):
+    help = 'Submit in-progress attempts past their deadline plus grace and grade them in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running every --interval seconds until interrupted'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60.0,
+            help='Seconds between runs in --loop mode (default: 60)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Attempts submitted and graded per batch (default: {DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--grace-seconds',
+            type=int,
+            default=DEFAULT_GRACE_SECONDS,
+            help=f'Seconds past the deadline before an attempt is submitted (default: {DEFAULT_GRACE_SECONDS})'
+        )
+        parser.add_argument(
+            '--no-grade',
+            action='store_true',
+            help='Only submit; leave grading to an admin'
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+        run_options = {
+            'batch_size': options['batch_size'],
+            'grace_seconds': options['grace_seconds'],
+            'grade': not options['no_grade'],
+        }
+
+        if not options['loop']:
+            self._report(auto_submit_expired(**run_options), always=True)
+            return
+
+        self.stdout.write(f'Auto-submit running every {options["interval"]:g}s (Ctrl+C to stop)')
+        try:
+            while True:
+                # Long-running process: drop connections the server may have closed.
+                close_old_connections()
+                stats = auto_submit_expired(**run_options)
+                self._report(stats, always=verbosity >= 2)
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Auto-submit stopped')
+
+    def _report(self, stats, always=False):
+        if not always and not stats['submitted']:
+            return
+        self.stdout.write(
+            f"[{stats['run_at']}] submitted: {stats['submitted']}, graded: {stats['graded']}, "
+            f"failed: {stats['failed']}, batches: {stats['batches']}, took {stats['duration_ms']} ms"
+        )
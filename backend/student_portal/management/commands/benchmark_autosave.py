@@ -0,0 +1,104 @@
+"""
+Management command to benchmark reading/listening autosave.
+
+Seeds one student with an in-progress attempt, then times full-section saves
+through the real ``save_reading_answers`` view (one bulk upsert) next to the
+previous per-answer ``update_or_create`` loop. The first save of a section
+inserts every row, later saves update them. All rows are rolled back.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from student_portal.benchmarking import auth_header, measure, percentile, rolled_back, seed_cohort
+from student_portal.models import StudentTest, TestResponse
+from student_portal.views import save_reading_answers
+
+
+def per_answer_save(student_test, section, answers):
+    """The save loop the section endpoints used before the bulk upsert."""
+    with transaction.atomic():
+        for question_num, answer in answers.items():
+            TestResponse.objects.update_or_create(
+                student_test=student_test,
+                section=section,
+                question_number=int(question_num),
+                defaults={'answer': str(answer)}
+            )
+
+
+class Command(BaseCommand):
+    help = 'Benchmark reading/listening autosave: bulk upsert against per-answer update_or_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--questions',
+            type=int,
+            default=40,
+            help='Answers per save (default: 40, a full section)'
+        )
+        parser.add_argument(
+            '--saves',
+            type=int,
+            default=50,
+            help='Saves timed per variant (default: 50)'
+        )
+
+    def handle(self, *args, **options):
+        questions = options['questions']
+        saves = options['saves']
+        factory = APIRequestFactory()
+
+        def answers_for(round_number):
+            return {str(q): f'answer {round_number}-{q}' for q in range(1, questions + 1)}
+
+        with rolled_back():
+            variant, students, _ = seed_cohort(2, with_admin=False)
+            bulk_test = StudentTest.objects.create(student=students[0], variant=variant, status='in_progress')
+            legacy_test = StudentTest.objects.create(student=students[1], variant=variant, status='in_progress')
+            headers = auth_header(students[0])
+
+            def bulk_save(round_number):
+                request = factory.post(
+                    '/api/student/answers/reading',
+                    {'answers': answers_for(round_number)},
+                    format='json',
+                    **headers
+                )
+                return measure(save_reading_answers, request)
+
+            # Auth and active-attempt resolution are identical for both paths,
+            # so the legacy loop is timed on its own and the view's request
+            # overhead is reported separately.
+            empty_request = factory.post('/api/student/answers/reading', {'answers': {}}, format='json', **headers)
+            overhead = measure(save_reading_answers, empty_request)
+
+            bulk = [bulk_save(round_number) for round_number in range(saves)]
+            legacy = [
+                measure(per_answer_save, legacy_test, 'reading', answers_for(round_number))
+                for round_number in range(saves)
+            ]
+
+            stored = TestResponse.objects.filter(student_test=bulk_test, section='reading').count()
+            if stored != questions:
+                self.stdout.write(self.style.ERROR(f'Expected {questions} stored answers, found {stored}'))
+
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(self.style.SUCCESS(f'Autosave: {questions} answers per save, {saves} saves'))
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(
+            f'request overhead (auth + attempt lookup): {overhead.queries} queries, {overhead.elapsed_ms:.2f} ms'
+        )
+        self.stdout.write(
+            f'{"":<30} {"insert q":>9} {"update q":>9} {"p50 ms":>9} {"p95 ms":>9}'
+        )
+        for label, samples in (
+            ('bulk upsert (view, total)', bulk),
+            ('update_or_create loop', legacy),
+        ):
+            latencies = [sample.elapsed_ms for sample in samples[1:]]
+            self.stdout.write(
+                f'{label:<30} {samples[0].queries:>9} {samples[-1].queries:>9} '
+                f'{percentile(latencies, 50):>9.2f} {percentile(latencies, 95):>9.2f}'
+            )
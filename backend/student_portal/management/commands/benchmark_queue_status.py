@@ -0,0 +1,153 @@
+"""
+Management command comparing waiting-room polling against the queue event stream.
+
+Seeds a throwaway cohort, measures the real per-request cost of
+``check_queue_status`` and of the snapshot the event stream loads on each
+change, then projects both over a waiting-room window. All rows are rolled back.
+"""
+
+from datetime import timedelta
+from statistics import mean
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from exams.views import start_mock
+from student_portal.benchmarking import (
+    auth_header, measure, percentile, rolled_back, seed_cohort
+)
+from student_portal.models import TestQueue
+from student_portal.queue_sweeper import sweep_queue
+from student_portal.streams import POLL_INTERVAL_SECONDS, authenticate_stream_request
+from student_portal.views import check_queue_status, get_queue_status_payload
+
+
+class Command(BaseCommand):
+    help = 'Benchmark queue status polling against the push-based queue event stream'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=300,
+            help='Number of waiting students (default: 300)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Client polling interval in seconds (default: 2, as in WaitingRoom.jsx)'
+        )
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=300,
+            help='Seconds students spend in the waiting room (default: 300)'
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=2,
+            help='Polling rounds actually executed per phase to sample costs (default: 2)'
+        )
+
+    def handle(self, *args, **options):
+        students_count = options['students']
+        poll_interval = options['poll_interval']
+        window = options['window']
+        rounds = options['rounds']
+
+        factory = APIRequestFactory()
+
+        with rolled_back():
+            variant, students, admin = seed_cohort(students_count)
+            headers = {student.id: auth_header(student) for student in students}
+
+            def poll_all():
+                samples = []
+                for _ in range(rounds):
+                    for student in students:
+                        request = factory.get('/api/student/queue-status', **headers[student.id])
+                        samples.append(measure(check_queue_status, request))
+                return samples
+
+            def snapshot_all():
+                return [measure(get_queue_status_payload, student) for student in students]
+
+            # Phase 1: everyone waiting for activation.
+            poll_waiting = poll_all()
+            stream_auth = []
+            for student in students:
+                request = factory.get('/api/student/queue-events', **headers[student.id])
+                stream_auth.append(measure(authenticate_stream_request, request))
+            stream_open = snapshot_all()
+
+            # Activation is paid identically by both modes.
+            request = factory.post(f'/api/admin/tests/{variant.id}/start-mock', **auth_header(admin))
+            activation = measure(start_mock, request, variant_id=variant.id)
+
+            # Phase 2: preparation minute.
+            poll_preparation = poll_all()
+            stream_activated = snapshot_all()
+
+            # Phase 3: preparation elapsed, the sweeper moves every row to started.
+            TestQueue.objects.filter(test_code=variant.code, status='preparation').update(
+                preparation_started_at=timezone.now() - timedelta(seconds=TestQueue.PREPARATION_SECONDS + 1)
+            )
+            measure(sweep_queue)
+            stream_started = snapshot_all()
+
+        poll_samples = poll_waiting + poll_preparation
+        poll_queries = mean(s.queries for s in poll_samples)
+        poll_latencies = [s.elapsed_ms for s in poll_samples]
+        polls_per_student = window / poll_interval
+        poll_requests = students_count * polls_per_student
+        poll_total_queries = poll_requests * poll_queries
+
+        # Each stream authenticates once, then loads one snapshot on open and one
+        # per transition (waiting -> preparation -> started). Idle ticks only read
+        # the cache version token.
+        per_stream_queries = (
+            mean(s.queries for s in stream_auth)
+            + mean(s.queries for s in stream_open)
+            + mean(s.queries for s in stream_activated)
+            + mean(s.queries for s in stream_started)
+        )
+        stream_latencies = [s.elapsed_ms for s in stream_open + stream_activated + stream_started]
+        push_requests = students_count
+        push_total_queries = students_count * per_stream_queries
+        cache_reads = students_count * window / POLL_INTERVAL_SECONDS
+        minutes = window / 60
+
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(self.style.SUCCESS(
+            f'Queue status: {students_count} students, {window}s waiting room'
+        ))
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(
+            f'start_mock activation: {activation.queries} queries, {activation.elapsed_ms:.1f} ms (both modes)'
+        )
+        self.stdout.write('')
+        self.stdout.write(f'Polling every {poll_interval:g}s (check_queue_status):')
+        self.stdout.write(f'  HTTP requests:      {poll_requests:,.0f} ({poll_requests / minutes:,.0f}/min)')
+        self.stdout.write(f'  DB queries:         {poll_total_queries:,.0f} ({poll_total_queries / minutes:,.0f}/min)')
+        self.stdout.write(f'  queries/request:    {poll_queries:.2f}')
+        self.stdout.write(
+            f'  latency p50/p95:    {percentile(poll_latencies, 50):.2f} / {percentile(poll_latencies, 95):.2f} ms'
+        )
+        self.stdout.write('')
+        self.stdout.write('Event stream (queue-events):')
+        self.stdout.write(f'  HTTP requests:      {push_requests:,.0f} ({push_requests / minutes:,.0f}/min)')
+        self.stdout.write(f'  DB queries:         {push_total_queries:,.0f} ({push_total_queries / minutes:,.0f}/min)')
+        self.stdout.write(f'  queries/stream:     {per_stream_queries:.2f}')
+        self.stdout.write(f'  cache reads:        {cache_reads:,.0f} (version token checks)')
+        self.stdout.write(
+            f'  snapshot p50/p95:   {percentile(stream_latencies, 50):.2f} / {percentile(stream_latencies, 95):.2f} ms'
+        )
+        if push_total_queries:
+            self.stdout.write('')
+            self.stdout.write(self.style.SUCCESS(
+                f'DB load reduction: {poll_total_queries / push_total_queries:,.1f}x, '
+                f'request reduction: {poll_requests / push_requests:,.1f}x'
+            ))
@@ -0,0 +1,226 @@
+"""
+Management command printing EXPLAIN plans for the student hot-path lookups.
+
+Seeds a large dataset (100k attempts by default), then explains each lookup
+used by the student/queue endpoints and the queue sweeper twice: with the
+hot-path indexes from migration 0005 dropped, and with them in place. Works on
+whichever database is configured (SQLite or PostgreSQL). Everything, including
+the index changes, runs in one transaction that is rolled back - still, run it
+against a development database, as PostgreSQL locks the tables meanwhile.
+"""
+
+import random
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from exams.models import Variant
+from student_portal.benchmarking import rolled_back
+from student_portal.models import StudentTest, TestQueue
+from student_portal.queue_sweeper import PENDING_STATUSES
+
+HOT_PATH_INDEXES = {
+    StudentTest: ['student_test_student_status'],
+    TestQueue: [
+        'test_queue_student_status',
+        'test_queue_code_status',
+        'test_queue_status_joined',
+        'test_queue_preparing',
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = 'Print EXPLAIN plans for student hot-path lookups with and without the hot-path indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--attempts',
+            type=int,
+            default=100000,
+            help='Number of StudentTest rows to seed (default: 100000)'
+        )
+        parser.add_argument(
+            '--variants',
+            type=int,
+            default=10,
+            help='Variants (attempts per student) to spread the attempts over (default: 10)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(self.style.SUCCESS(
+            f'Hot-path EXPLAIN on {connection.vendor} with {options["attempts"]:,} attempts'
+        ))
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+
+        with rolled_back():
+            student, code = self._seed(options['attempts'], options['variants'])
+            lookups = self._lookups(student, code)
+
+            self._drop_indexes()
+            self._analyze()
+            before = {name: queryset.explain() for name, queryset in lookups}
+
+            self._create_indexes()
+            self._analyze()
+            after = {name: queryset.explain() for name, queryset in lookups}
+
+        for name, _ in lookups:
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write('  before:')
+            for line in before[name].splitlines():
+                self.stdout.write(f'    {line}')
+            self.stdout.write('  after:')
+            for line in after[name].splitlines():
+                self.stdout.write(f'    {line}')
+
+    def _seed(self, attempts, variant_count):
+        """Seed students, variants, attempts and queue entries; return a probe student and code."""
+        run_id = uuid.uuid4().hex[:8]
+        password = make_password(None)
+        student_count = max(1, attempts // variant_count)
+        now = timezone.now()
+        rng = random.Random(42)
+
+        self.stdout.write(f'Seeding {student_count:,} students x {variant_count} variants...')
+
+        variants = [
+            Variant.objects.create(name=f'Explain {run_id} #{i}', duration_minutes=180)
+            for i in range(variant_count)
+        ]
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'explain_{run_id}_{i}', role='student', password=password)
+            for i in range(student_count)
+        ], batch_size=2000)
+        student_ids = list(
+            CustomUser.objects.filter(username__startswith=f'explain_{run_id}_')
+            .order_by('id').values_list('id', flat=True)
+        )
+
+        attempt_rows = []
+        queue_rows = []
+        for student_id in student_ids:
+            for position, variant in enumerate(variants):
+                is_latest = position == variant_count - 1
+                attempt_status = 'in_progress' if is_latest and rng.random() < 0.1 else rng.choice(
+                    ['graded', 'graded', 'graded', 'submitted']
+                )
+                attempt_rows.append(StudentTest(
+                    student_id=student_id,
+                    variant=variant,
+                    status=attempt_status,
+                    submission_time=None if attempt_status == 'in_progress' else now,
+                ))
+                queue_rows.append(TestQueue(
+                    student_id=student_id,
+                    test_code=variant.code,
+                    status='waiting' if is_latest and rng.random() < 0.05 else rng.choice(
+                        ['started', 'started', 'started', 'timeout', 'left']
+                    ),
+                    assigned_variant=variant,
+                ))
+
+        StudentTest.objects.bulk_create(attempt_rows, batch_size=2000)
+        TestQueue.objects.bulk_create(queue_rows, batch_size=2000)
+
+        # Spread timestamps so ordering and range predicates are realistic.
+        for position, variant in enumerate(variants):
+            StudentTest.objects.filter(variant=variant).update(
+                start_time=now - timedelta(days=variant_count - position)
+            )
+            TestQueue.objects.filter(test_code=variant.code).update(
+                joined_at=now - timedelta(days=variant_count - position)
+            )
+
+        return CustomUser(id=student_ids[len(student_ids) // 2]), variants[-1].code
+
+    def _lookups(self, student, code):
+        """Return (label, queryset) pairs mirroring the endpoint and sweeper lookups."""
+        now = timezone.now()
+        return [
+            (
+                'Active attempt (save/submit/attempt endpoints)',
+                StudentTest.objects.filter(student=student, status='in_progress')[:1],
+            ),
+            (
+                'Last submitted attempt (submit_test retry)',
+                StudentTest.objects.filter(
+                    student=student, status__in=['submitted', 'graded']
+                ).order_by('-submission_time')[:1],
+            ),
+            (
+                'Speaking attempt (in_progress or graded, newest first)',
+                StudentTest.objects.filter(
+                    student=student, status__in=['in_progress', 'graded']
+                ).order_by('-start_time')[:1],
+            ),
+            (
+                'Current queue entry (queue-status, start-test, leave-queue)',
+                TestQueue.objects.filter(
+                    student=student, status__in=['waiting', 'assigned', 'preparation', 'started']
+                ).order_by('-joined_at')[:1],
+            ),
+            (
+                'Waiting cohort (start_mock)',
+                TestQueue.objects.filter(test_code=code, status__in=['waiting', 'assigned']),
+            ),
+            (
+                'Sweeper: overdue entries',
+                TestQueue.objects.filter(
+                    status__in=PENDING_STATUSES,
+                    joined_at__lte=now - timedelta(minutes=TestQueue.TIMEOUT_MINUTES)
+                ).order_by('joined_at')[:500],
+            ),
+            (
+                'Sweeper: elapsed preparations',
+                TestQueue.objects.filter(
+                    status='preparation',
+                    preparation_started_at__lte=now - timedelta(seconds=TestQueue.PREPARATION_SECONDS),
+                    joined_at__gt=now - timedelta(minutes=TestQueue.TIMEOUT_MINUTES)
+                ).order_by('preparation_started_at')[:500],
+            ),
+        ]
+
+    def _existing_indexes(self, model):
+        with connection.cursor() as cursor:
+            return set(connection.introspection.get_constraints(cursor, model._meta.db_table))
+
+    def _run_sql(self, statements):
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(str(statement))
+
+    def _drop_indexes(self):
+        # Statements are built without entering the schema editor: the SQLite
+        # editor refuses to open inside a transaction, and plain CREATE/DROP
+        # INDEX needs none of its table-rebuild machinery.
+        editor = connection.schema_editor()
+        statements = []
+        for model, names in HOT_PATH_INDEXES.items():
+            existing = self._existing_indexes(model)
+            for index in model._meta.indexes:
+                if index.name in names and index.name in existing:
+                    statements.append(index.remove_sql(model, editor))
+        self._run_sql(statements)
+
+    def _create_indexes(self):
+        editor = connection.schema_editor()
+        statements = []
+        for model, names in HOT_PATH_INDEXES.items():
+            for index in model._meta.indexes:
+                if index.name in names:
+                    statements.append(index.create_sql(model, editor))
+        self._run_sql(statements)
+
+    def _analyze(self):
+        self._run_sql(
+            f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}'
+            for model in HOT_PATH_INDEXES
+        )
@@ -0,0 +1,76 @@
+"""
+Management command to write buffered autosaves to the database.
+
+Only needed with ``AUTOSAVE_WRITE_BEHIND`` enabled. Run once or as a
+long-running worker with ``--loop``.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from student_portal.autosave_buffer import (
+    DEFAULT_BATCH_SIZE, FlushLockTimeout, flush_buffer, is_enabled
+)
+
+
+class Command(BaseCommand):
+    help = 'Write buffered reading/listening autosaves to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep flushing every --interval seconds until interrupted'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds between flushes in --loop mode (default: 1)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Buffered saves applied per bulk upsert (default: {DEFAULT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+
+        if not is_enabled():
+            self.stdout.write(self.style.WARNING(
+                'Autosave write-behind is disabled (AUTOSAVE_WRITE_BEHIND); nothing to flush'
+            ))
+            return
+
+        if not options['loop']:
+            self._flush(options['batch_size'], always=True)
+            return
+
+        self.stdout.write(f'Autosave flusher running every {options["interval"]:g}s (Ctrl+C to stop)')
+        try:
+            while True:
+                # Long-running process: drop connections the server may have closed.
+                close_old_connections()
+                self._flush(options['batch_size'], always=verbosity >= 2)
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Autosave flusher stopped')
+
+    def _flush(self, batch_size, always=False):
+        try:
+            stats = flush_buffer(batch_size=batch_size)
+        except FlushLockTimeout:
+            # A submit is flushing right now; it drains the buffer for us.
+            return
+        if not always and not stats['records']:
+            return
+        self.stdout.write(
+            f"flushed {stats['records']} saves as {stats['rows']} rows "
+            f"({stats['dropped']} dropped, {stats['superseded']} superseded), batches: {stats['batches']}, "
+            f"max latency {stats['max_latency_ms']} ms, depth {stats['depth']}, "
+            f"took {stats['duration_ms']} ms"
+        )
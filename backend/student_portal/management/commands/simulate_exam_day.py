@@ -0,0 +1,170 @@
+"""
+Management command simulating a full exam hall against the student flow.
+
+N students log in, join the queue, poll it until the admin activates the mock
+via start_mock, autosave their answers on the frontend cadence and submit.
+Reports p50/p95/p99 latency, error rate and DB queries per endpoint, and how
+many of the writing grading jobs completed. Writing
+and speaking graders and Whisper are stubbed with configurable latency so the
+run is offline. Seeded rows are committed during the run and deleted after it.
+"""
+
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from student_portal.load_simulation import ExamDaySimulation
+
+
+class Command(BaseCommand):
+    help = 'Simulate N concurrent students taking a mock exam and report per-endpoint latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=50,
+            help='Number of concurrent simulated students (default: 50)'
+        )
+        parser.add_argument(
+            '--base-url',
+            type=str,
+            default=None,
+            help='Run against a live server (e.g. http://127.0.0.1:8000) sharing this database '
+                 'instead of the in-process test client; DB queries are not counted then'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Waiting-room polling interval in seconds (default: 2, as in WaitingRoom.jsx)'
+        )
+        parser.add_argument(
+            '--autosave-interval',
+            type=float,
+            default=30.0,
+            help='Autosave cadence in exam seconds (default: 30, as in the section pages)'
+        )
+        parser.add_argument(
+            '--autosaves',
+            type=int,
+            default=6,
+            help='Autosaves per section (default: 6)'
+        )
+        parser.add_argument(
+            '--time-scale',
+            type=float,
+            default=60.0,
+            help='Exam seconds per real second for autosave pauses (default: 60)'
+        )
+        parser.add_argument(
+            '--real-preparation',
+            action='store_true',
+            help='Wait the real preparation minute instead of fast-forwarding it'
+        )
+        parser.add_argument(
+            '--speaking',
+            action='store_true',
+            help='Also upload speaking audio and run transcription and grading'
+        )
+        parser.add_argument(
+            '--llm-latency-ms',
+            type=float,
+            default=1500,
+            help='Latency of each stubbed writing/speaking grading call (default: 1500)'
+        )
+        parser.add_argument(
+            '--whisper-latency-ms',
+            type=float,
+            default=800,
+            help='Latency of each stubbed Whisper transcription (default: 800)'
+        )
+        parser.add_argument(
+            '--max-wait',
+            type=float,
+            default=300.0,
+            help='Seconds a student waits for activation before giving up (default: 300)'
+        )
+        parser.add_argument(
+            '--keep-data',
+            action='store_true',
+            help='Do not delete the simulated students and their attempts afterwards'
+        )
+
+    def handle(self, *args, **options):
+        simulation = ExamDaySimulation(
+            options['students'],
+            base_url=options['base_url'],
+            poll_interval=options['poll_interval'],
+            autosave_interval=options['autosave_interval'],
+            autosaves=options['autosaves'],
+            time_scale=options['time_scale'],
+            fast_forward=not options['real_preparation'],
+            speaking=options['speaking'],
+            max_wait=options['max_wait'],
+        )
+
+        target = options['base_url'] or f'in-process test client ({connection.vendor})'
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+        self.stdout.write(self.style.SUCCESS(
+            f'Exam day simulation: {options["students"]} students against {target}'
+        ))
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+
+        if options['verbosity'] < 2:
+            # Every 4xx/5xx is counted below; do not also log each one.
+            logging.getLogger('django.request').setLevel(logging.CRITICAL)
+
+        simulation.seed()
+        try:
+            rows, completed, elapsed, jobs = simulation.run(
+                llm_latency_ms=options['llm_latency_ms'],
+                whisper_latency_ms=options['whisper_latency_ms'],
+            )
+        finally:
+            if options['keep_data']:
+                self.stdout.write(f'Kept simulated rows (usernames examday_{simulation.run_id}_*)')
+            else:
+                simulation.cleanup()
+
+        if simulation.activation_error:
+            self.stdout.write(self.style.ERROR(f'Activation failed: {simulation.activation_error}'))
+
+        self.stdout.write(
+            f'{"endpoint":<32} {"requests":>8} {"errors":>7} {"p50 ms":>9} '
+            f'{"p95 ms":>9} {"p99 ms":>9} {"queries":>8} {"max q":>6}'
+        )
+        total_requests = 0
+        total_errors = 0
+        for row in rows:
+            total_requests += row['requests']
+            total_errors += row['errors']
+            queries = f'{row["queries"]:.1f}' if row['queries'] is not None else '-'
+            max_queries = row['max_queries'] if row['max_queries'] is not None else '-'
+            line = (
+                f'{row["endpoint"]:<32} {row["requests"]:>8} {row["error_rate"]:>7.1%} '
+                f'{row["p50"]:>9.1f} {row["p95"]:>9.1f} {row["p99"]:>9.1f} '
+                f'{queries:>8} {max_queries:>6}'
+            )
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
+
+        self.stdout.write('')
+        error_rate = total_errors / total_requests if total_requests else 0
+        summary = (
+            f'{completed}/{options["students"]} students submitted, {total_requests} requests, '
+            f'error rate {error_rate:.2%}, {elapsed:.1f}s wall time'
+        )
+        succeeded = jobs.get('succeeded', 0)
+        pending = jobs.get('queued', 0) + jobs.get('running', 0)
+        grading = (
+            f'Writing grading jobs: {succeeded}/{sum(jobs.values())} succeeded, '
+            f'{pending} pending, {jobs.get("failed", 0)} failed'
+        )
+        if options['base_url'] and pending:
+            grading += ' (graded by the server\'s worker)'
+        self.stdout.write(grading if succeeded == sum(jobs.values()) else self.style.WARNING(grading))
+        if completed == options['students'] and not total_errors:
+            self.stdout.write(self.style.SUCCESS(summary))
+        else:
+            self.stdout.write(self.style.WARNING(summary))
@@ -0,0 +1,62 @@
+"""
+Management command to persist due TestQueue transitions (timeouts, auto-start).
+
+Run once (e.g. from cron) or as a long-running worker with ``--loop``.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from student_portal.queue_sweeper import DEFAULT_BATCH_SIZE, sweep_queue
+
+
+class Command(BaseCommand):
+    help = 'Move overdue queue entries to timeout and elapsed preparations to started'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep sweeping every --interval seconds until interrupted'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds between sweeps in --loop mode (default: 5)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Rows moved per UPDATE (default: {DEFAULT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        verbosity = options['verbosity']
+
+        if not options['loop']:
+            self._report(sweep_queue(batch_size=options['batch_size']), always=True)
+            return
+
+        self.stdout.write(f'Queue sweeper running every {options["interval"]:g}s (Ctrl+C to stop)')
+        try:
+            while True:
+                # Long-running process: drop connections the server may have closed.
+                close_old_connections()
+                stats = sweep_queue(batch_size=options['batch_size'])
+                self._report(stats, always=verbosity >= 2)
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Queue sweeper stopped')
+
+    def _report(self, stats, always=False):
+        if not always and not (stats['timed_out'] or stats['started']):
+            return
+        self.stdout.write(
+            f"[{stats['swept_at']}] timed out: {stats['timed_out']}, "
+            f"started: {stats['started']}, batches: {stats['batches']}, "
+            f"took {stats['duration_ms']} ms"
+        )
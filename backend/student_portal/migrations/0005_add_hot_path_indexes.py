@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0004_mocktest_studenttestsession'),
+        ('student_portal', '0004_testresult_speaking_breakdown_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studenttest',
+            index=models.Index(fields=['student', 'status', '-start_time'], name='student_test_student_status'),
+        ),
+        migrations.AddIndex(
+            model_name='testqueue',
+            index=models.Index(fields=['student', 'status', '-joined_at'], name='test_queue_student_status'),
+        ),
+        migrations.AddIndex(
+            model_name='testqueue',
+            index=models.Index(fields=['test_code', 'status'], name='test_queue_code_status'),
+        ),
+        migrations.AddIndex(
+            model_name='testqueue',
+            index=models.Index(fields=['status', 'joined_at'], name='test_queue_status_joined'),
+        ),
+        migrations.AddIndex(
+            model_name='testqueue',
+            index=models.Index(condition=models.Q(('status', 'preparation')), fields=['preparation_started_at'], name='test_queue_preparing'),
+        ),
+    ]
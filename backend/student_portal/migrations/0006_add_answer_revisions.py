@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_portal', '0005_add_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('section', models.CharField(choices=[('reading', 'Reading'), ('listening', 'Listening')], help_text='Section type', max_length=20)),
+                ('revision', models.PositiveBigIntegerField(default=0, help_text='Highest client revision applied to this section')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student_test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_revisions', to='student_portal.studenttest')),
+            ],
+            options={
+                'db_table': 'answer_revision',
+                'unique_together': {('student_test', 'section')},
+            },
+        ),
+    ]
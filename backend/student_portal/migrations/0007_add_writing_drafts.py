@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_portal', '0006_add_answer_revisions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WritingDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_number', models.PositiveSmallIntegerField(choices=[(1, 'Task 1'), (2, 'Task 2')], help_text='Writing task number')),
+                ('version', models.PositiveIntegerField(help_text='Draft version, starting at 1')),
+                ('kind', models.CharField(choices=[('snapshot', 'Snapshot'), ('patch', 'Patch')], max_length=10)),
+                ('data', models.TextField(help_text='Full text for snapshots, JSON patch operations for patches')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('student_test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='writing_drafts', to='student_portal.studenttest')),
+            ],
+            options={
+                'db_table': 'writing_draft',
+                'ordering': ['student_test', 'task_number', 'version'],
+                'unique_together': {('student_test', 'task_number', 'version')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.1 on 2026-10-17 19:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_portal', '0007_add_writing_drafts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Stat name, e.g. queue_sweeper:last_sweep', max_length=64, unique=True)),
+                ('stats', models.JSONField(blank=True, help_text='Stats of the most recent run', null=True)),
+                ('count', models.BigIntegerField(default=0, help_text='Counter value')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'process_stat',
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 
@@ -39,15 +40,22 @@ class StudentTest(models.Model):
         db_table = 'student_test'
         ordering = ['-start_time']
         unique_together = ['student', 'variant']
+        indexes = [
+            # Active/last attempt lookups: filter(student=..., status=...) ordered by start_time
+            models.Index(fields=['student', 'status', '-start_time'], name='student_test_student_status'),
+        ]
     
     def __str__(self):
         return f"{self.student.username} - {self.variant.name}"
     
     def submit(self):
         """Mark test as submitted."""
+        from .active_attempts import invalidate_active_attempt
+
         self.status = 'submitted'
         self.submission_time = timezone.now()
         self.save()
+        invalidate_active_attempt(self.student_id)
 
 
 class TestQueue(models.Model):
@@ -61,6 +69,11 @@ class TestQueue(models.Model):
         ('left', 'Left'),
         ('timeout', 'Timeout'),
     ]
+
+    # Entries that are not started within this window time out
+    TIMEOUT_MINUTES = 10
+    # Preparation window before the test starts automatically
+    PREPARATION_SECONDS = 60
     
     student = models.ForeignKey(
         'accounts.CustomUser',
@@ -95,6 +108,20 @@ class TestQueue(models.Model):
         db_table = 'test_queue'
         ordering = ['joined_at']
         unique_together = ['student', 'test_code']
+        indexes = [
+            # Student's current entry: filter(student=..., status__in=...) ordered by joined_at
+            models.Index(fields=['student', 'status', '-joined_at'], name='test_queue_student_status'),
+            # Cohort activation: filter(test_code=..., status=...)
+            models.Index(fields=['test_code', 'status'], name='test_queue_code_status'),
+            # Sweeper timeouts: filter(status__in=..., joined_at__lte=...)
+            models.Index(fields=['status', 'joined_at'], name='test_queue_status_joined'),
+            # Sweeper auto-start: only rows still in preparation
+            models.Index(
+                fields=['preparation_started_at'],
+                condition=models.Q(status='preparation'),
+                name='test_queue_preparing'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.student.username} - Code: {self.test_code} - {self.status}"
@@ -142,6 +169,81 @@ class TestResponse(models.Model):
         return f"{self.student_test} - {self.section}"
 
 
+class AnswerRevision(models.Model):
+    """Latest client revision applied to a section's answers (delta-sync)."""
+
+    SECTION_CHOICES = [
+        ('reading', 'Reading'),
+        ('listening', 'Listening'),
+    ]
+
+    student_test = models.ForeignKey(
+        StudentTest,
+        on_delete=models.CASCADE,
+        related_name='answer_revisions'
+    )
+    section = models.CharField(
+        max_length=20,
+        choices=SECTION_CHOICES,
+        help_text='Section type'
+    )
+    revision = models.PositiveBigIntegerField(
+        default=0,
+        help_text='Highest client revision applied to this section'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'answer_revision'
+        unique_together = ['student_test', 'section']
+
+    def __str__(self):
+        return f"{self.student_test} - {self.section} r{self.revision}"
+
+
+class WritingDraft(models.Model):
+    """
+    One saved version of a writing task.
+
+    A version is either a full snapshot of the text or a patch on the
+    previous version (see student_portal.writing_drafts).
+    """
+
+    KIND_CHOICES = [
+        ('snapshot', 'Snapshot'),
+        ('patch', 'Patch'),
+    ]
+
+    student_test = models.ForeignKey(
+        StudentTest,
+        on_delete=models.CASCADE,
+        related_name='writing_drafts'
+    )
+    task_number = models.PositiveSmallIntegerField(
+        choices=[(1, 'Task 1'), (2, 'Task 2')],
+        help_text='Writing task number'
+    )
+    version = models.PositiveIntegerField(
+        help_text='Draft version, starting at 1'
+    )
+    kind = models.CharField(
+        max_length=10,
+        choices=KIND_CHOICES
+    )
+    data = models.TextField(
+        help_text='Full text for snapshots, JSON patch operations for patches'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'writing_draft'
+        unique_together = ['student_test', 'task_number', 'version']
+        ordering = ['student_test', 'task_number', 'version']
+
+    def __str__(self):
+        return f"{self.student_test} - Task {self.task_number} v{self.version} ({self.kind})"
+
+
 class TestResult(models.Model):
     """Model for storing test scores with detailed breakdown."""
     
@@ -260,7 +362,7 @@ class TestResult(models.Model):
             # Calculate average and round to nearest 0.5
             avg = sum(scores) / len(scores)
             self.overall_score = round(avg * 2) / 2
-            self.save()
+            self.save(update_fields=['overall_score'])
             return self.overall_score
         return None
 
@@ -319,3 +421,92 @@ class SpeakingResponse(models.Model):
         if self.question_number:
             return f"{self.student_test} - Part {self.part_number} Q{self.question_number}"
         return f"{self.student_test} - Part {self.part_number}"
+
+
+class ProcessStat(models.Model):
+    """
+    Latest run stats or a counter written by one process and read by others.
+
+    Background workers (queue sweeper, auto-submitter, grading workers) run in
+    their own processes, so their monitoring data is kept in the database
+    rather than the possibly per-process cache (see student_portal.process_stats).
+    """
+
+    name = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text='Stat name, e.g. queue_sweeper:last_sweep'
+    )
+    stats = models.JSONField(
+        null=True,
+        blank=True,
+        help_text='Stats of the most recent run'
+    )
+    count = models.BigIntegerField(
+        default=0,
+        help_text='Counter value'
+    )
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'process_stat'
+
+    def __str__(self):
+        return self.name
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Response stored for a request made with an Idempotency-Key.
+
+    Kept in the database rather than the possibly per-process cache, so a
+    retry landing on another worker process still gets the stored response
+    (see student_portal.idempotency).
+    """
+
+    STATE_CHOICES = [
+        ('in_flight', 'In flight'),
+        ('done', 'Done'),
+    ]
+
+    user = models.ForeignKey(
+        'accounts.CustomUser',
+        on_delete=models.CASCADE,
+        related_name='idempotency_records'
+    )
+    view = models.CharField(
+        max_length=64,
+        help_text='Name of the view the key was used for'
+    )
+    key = models.CharField(
+        max_length=255,
+        help_text='Idempotency-Key header sent by the client'
+    )
+    fingerprint = models.CharField(
+        max_length=64,
+        help_text='SHA-256 of the request body'
+    )
+    state = models.CharField(
+        max_length=20,
+        choices=STATE_CHOICES,
+        default='in_flight'
+    )
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    data = models.JSONField(
+        null=True,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        help_text='Response body replayed on retries'
+    )
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'idempotency_record'
+        unique_together = ['user', 'view', 'key']
+        indexes = [
+            # Pruning of expired records: filter(user=..., updated_at__lt=...)
+            models.Index(fields=['user', 'updated_at'], name='idempotency_user_updated'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.view} {self.key} ({self.state})"
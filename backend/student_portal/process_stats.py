@@ -0,0 +1,47 @@
+"""
+Monitoring data shared across processes.
+
+The queue sweeper, auto-submitter and grading workers run as separate
+processes, and the default cache is per-process LocMem, so stats they put in
+the cache were never seen by the web workers serving ``GET /api/admin/stats``.
+They are stored as ProcessStat rows instead: one row per name, holding either
+the stats of the latest run or a counter.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ProcessStat
+
+
+def record_stats(name, stats):
+    """Store ``stats`` as the latest run of ``name``."""
+    ProcessStat.objects.update_or_create(
+        name=name,
+        defaults={'stats': stats, 'updated_at': timezone.now()}
+    )
+
+
+def get_stats(name):
+    """Return the latest stats stored under ``name``, or None."""
+    return ProcessStat.objects.filter(name=name).values_list('stats', flat=True).first()
+
+
+def increment(name, amount=1):
+    """Add ``amount`` to the counter ``name`` (one UPDATE; the row is created on first use)."""
+    updated = ProcessStat.objects.filter(name=name).update(count=F('count') + amount, updated_at=timezone.now())
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            ProcessStat.objects.create(name=name, count=amount)
+    except IntegrityError:
+        # Created concurrently.
+        ProcessStat.objects.filter(name=name).update(count=F('count') + amount, updated_at=timezone.now())
+
+
+def get_counts(names):
+    """Return {name: counter value} for ``names`` (0 for counters never incremented)."""
+    counts = dict(ProcessStat.objects.filter(name__in=names).values_list('name', 'count'))
+    return {name: counts.get(name, 0) for name in names}
@@ -0,0 +1,55 @@
+"""
+Queue status change notifications.
+
+Every write that moves a TestQueue row (join, activation, start, leave,
+timeout) bumps a per-student version token in the Django cache. Waiting
+clients hold one event stream open and only hit the database when their
+token changes, instead of polling ``check_queue_status`` every two seconds.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+QUEUE_VERSION_KEY = 'queue_status_version:{student_id}'
+
+# Tokens only need to outlive an open stream; a missing token reads as 0.
+QUEUE_VERSION_TTL = 60 * 60
+
+
+def queue_version_key(student_id) -> str:
+    """Return the cache key holding a student's queue version token."""
+    return QUEUE_VERSION_KEY.format(student_id=student_id)
+
+
+def get_queue_version(student_id) -> int:
+    """Return the current queue version token for a student (0 if unknown)."""
+    return cache.get(queue_version_key(student_id), 0)
+
+
+def notify_queue_change(student_ids) -> None:
+    """
+    Signal that the queue rows of the given students changed.
+
+    The cache write is deferred until the surrounding transaction commits so a
+    listener never reloads a row before the change is visible. Tokens for a
+    whole cohort are written with a single ``set_many`` call.
+
+    Args:
+        student_ids: Iterable of student ids (or a single id)
+    """
+    if isinstance(student_ids, int):
+        student_ids = [student_ids]
+    student_ids = list(student_ids)
+    if not student_ids:
+        return
+
+    def _publish():
+        token = time.time_ns()
+        cache.set_many(
+            {queue_version_key(student_id): token for student_id in student_ids},
+            timeout=QUEUE_VERSION_TTL
+        )
+
+    transaction.on_commit(_publish)
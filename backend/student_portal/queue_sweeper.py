@@ -0,0 +1,122 @@
+"""
+Background sweeper for time-based TestQueue transitions.
+
+Moves entries that waited too long to ``timeout`` and entries whose
+preparation window elapsed to ``started`` (creating their StudentTest rows),
+so ``check_queue_status`` and the queue event stream never write. Every
+UPDATE repeats the due condition, which makes concurrent sweepers safe: a row
+is moved by whichever sweeper gets to it first and skipped by the others.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import StudentTest, TestQueue
+from .process_stats import get_stats, record_stats
+from .queue_events import notify_queue_change
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+# ProcessStat holding the stats of the most recent sweep (for monitoring).
+LAST_SWEEP_KEY = 'queue_sweeper:last_sweep'
+
+PENDING_STATUSES = ['waiting', 'assigned', 'preparation']
+
+
+def _timeout_batch(now, batch_size):
+    """Move one batch of overdue entries to timeout. Returns rows moved."""
+    cutoff = now - timedelta(minutes=TestQueue.TIMEOUT_MINUTES)
+    due = TestQueue.objects.filter(status__in=PENDING_STATUSES, joined_at__lte=cutoff)
+
+    rows = list(due.order_by('joined_at').values_list('id', 'student_id')[:batch_size])
+    if not rows:
+        return 0
+
+    with transaction.atomic():
+        moved = due.filter(id__in=[row[0] for row in rows]).update(
+            status='timeout',
+            timeout_at=now
+        )
+        notify_queue_change([row[1] for row in rows])
+    return moved
+
+
+def _auto_start_batch(now, batch_size):
+    """Move one batch of entries whose preparation elapsed to started. Returns rows moved."""
+    prep_cutoff = now - timedelta(seconds=TestQueue.PREPARATION_SECONDS)
+    timeout_cutoff = now - timedelta(minutes=TestQueue.TIMEOUT_MINUTES)
+    due = TestQueue.objects.filter(
+        status='preparation',
+        preparation_started_at__lte=prep_cutoff,
+        joined_at__gt=timeout_cutoff
+    )
+
+    rows = list(
+        due.order_by('preparation_started_at')
+        .values_list('id', 'student_id', 'assigned_variant_id')[:batch_size]
+    )
+    if not rows:
+        return 0
+
+    with transaction.atomic():
+        StudentTest.objects.bulk_create(
+            [
+                StudentTest(student_id=student_id, variant_id=variant_id, status='in_progress')
+                for _, student_id, variant_id in rows
+                if variant_id
+            ],
+            ignore_conflicts=True
+        )
+        moved = due.filter(id__in=[row[0] for row in rows]).update(
+            status='started',
+            started_at=now
+        )
+        notify_queue_change([row[1] for row in rows])
+    return moved
+
+
+def sweep_queue(batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """
+    Persist all due queue transitions in batches.
+
+    Timeouts run first so an entry that is both overdue and past preparation
+    times out, matching the order ``check_queue_status`` used to apply.
+
+    Returns:
+        dict: rows moved per transition, number of batches and duration in ms
+    """
+    now = now or timezone.now()
+    started = time.perf_counter()
+    stats = {'timed_out': 0, 'started': 0, 'batches': 0}
+
+    for key, move_batch in (('timed_out', _timeout_batch), ('started', _auto_start_batch)):
+        while True:
+            moved = move_batch(now, batch_size)
+            if not moved:
+                break
+            stats[key] += moved
+            stats['batches'] += 1
+            if moved < batch_size:
+                break
+
+    stats['duration_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    stats['swept_at'] = now.isoformat()
+    record_stats(LAST_SWEEP_KEY, stats)
+
+    if stats['timed_out'] or stats['started']:
+        logger.info(
+            'Queue sweep: %s timed out, %s started in %s ms',
+            stats['timed_out'], stats['started'], stats['duration_ms']
+        )
+    return stats
+
+
+def get_last_sweep():
+    """Return the stats of the most recent sweep, or None if none ran yet."""
+    return get_stats(LAST_SWEEP_KEY)
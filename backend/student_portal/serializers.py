@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import StudentTest, TestResponse, TestResult
+from .writing_drafts import overlay_drafts
 from exams.serializers import VariantSerializer
 
 
@@ -24,6 +25,13 @@ class StudentTestSerializer(serializers.ModelSerializer):
             'submission_time', 'time_remaining_seconds', 'responses'
         )
         read_only_fields = ('id', 'start_time', 'submission_time')
+    
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Writing saves reach TestResponse at submit; show the drafts until then.
+        if instance.status == 'in_progress':
+            data['responses'] = overlay_drafts(instance.id, data['responses'])
+        return data
 
 
 class TestResultSerializer(serializers.ModelSerializer):
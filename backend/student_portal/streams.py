@@ -0,0 +1,167 @@
+"""
+Server-Sent Events stream for the student waiting room.
+
+``queue_events`` replaces the two-second ``check_queue_status`` polling loop:
+the client opens one long-lived connection and receives a ``queue`` event only
+when its TestQueue row changes (see ``queue_events.notify_queue_change``) or a
+time-based transition (timeout, end of preparation) becomes due. Between
+changes the stream only reads a version token from the cache, so an idle
+waiting room costs no database queries.
+
+The view is async and must be served through ``ielts_moc/asgi.py`` (e.g.
+``gunicorn ielts_moc.asgi:application -k uvicorn.workers.UvicornWorker``).
+It also needs a shared cache: with per-process LocMem a change made by another
+worker or the queue sweeper never reaches the token the stream reads, so
+without one the view answers 501 and the client polls.
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from accounts.authentication import CustomJWTAuthentication
+from .active_attempts import cache_is_shared
+from .queue_events import queue_version_key
+from .views import get_queue_status_payload
+
+logger = logging.getLogger(__name__)
+
+# How often the stream checks the cache for a new version token.
+POLL_INTERVAL_SECONDS = 1.0
+
+# Comment line sent when nothing changed, keeps proxies from closing the socket.
+HEARTBEAT_SECONDS = 15
+
+# Longest a single stream stays open (10 min timeout + preparation + slack);
+# EventSource reconnects on its own afterwards.
+MAX_STREAM_SECONDS = 15 * 60
+
+# Client reconnect delay advertised through the SSE ``retry`` field.
+RECONNECT_MILLISECONDS = 3000
+
+# Statuses after which the waiting room is over and the stream closes.
+TERMINAL_STATUSES = {'started', 'timeout', 'left', 'none'}
+
+
+def authenticate_stream_request(request):
+    """
+    Resolve the student for a stream request.
+
+    EventSource cannot send an Authorization header, so the JWT access token is
+    also accepted as a ``token`` query parameter.
+    """
+    authenticator = CustomJWTAuthentication()
+    raw_token = request.GET.get('token')
+    try:
+        if raw_token:
+            validated_token = authenticator.get_validated_token(raw_token)
+            return authenticator.get_user(validated_token)
+        result = authenticator.authenticate(request)
+        return result[0] if result else None
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def next_transition_at(payload):
+    """Return when the next time-based transition is due for a payload, if any."""
+    if payload.get('status') not in ('waiting', 'assigned', 'preparation'):
+        return None
+
+    deadlines = []
+    for field in ('timeout_deadline', 'auto_start_at'):
+        if payload.get(field):
+            deadlines.append(datetime.fromisoformat(payload[field]))
+    return min(deadlines) if deadlines else None
+
+
+def format_event(event, payload, event_id=None):
+    """Encode a payload as a single SSE message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(payload, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+async def queue_event_stream(user):
+    """Yield queue status events for a student until the waiting room ends."""
+    loop = asyncio.get_running_loop()
+    opened_at = loop.time()
+    last_sent_at = opened_at
+    last_version = None
+    transition_at = None
+    version_key = queue_version_key(user.id)
+
+    yield f'retry: {RECONNECT_MILLISECONDS}\n\n'
+
+    while True:
+        version = await cache.aget(version_key, 0)
+        transition_due = transition_at is not None and timezone.now() >= transition_at
+
+        if version != last_version or transition_due:
+            # Read the token before the snapshot so a change committed in
+            # between is picked up on the next iteration rather than lost.
+            last_version = version
+            payload = await sync_to_async(get_queue_status_payload)(user)
+            yield format_event('queue', payload, event_id=version)
+            last_sent_at = loop.time()
+
+            if payload.get('status') in TERMINAL_STATUSES:
+                return
+            transition_at = next_transition_at(payload)
+            if transition_at is not None and transition_at <= timezone.now():
+                # Nothing moved although it was due; wait for a notification.
+                transition_at = None
+        elif loop.time() - last_sent_at >= HEARTBEAT_SECONDS:
+            yield ': keep-alive\n\n'
+            last_sent_at = loop.time()
+
+        if loop.time() - opened_at >= MAX_STREAM_SECONDS:
+            return
+
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+
+async def queue_events(request):
+    """Stream the student's queue status as Server-Sent Events."""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed.'}, status=405)
+
+    # Under WSGI the async generator would be buffered to completion and pin a
+    # worker for the whole waiting room, so refuse and point at polling.
+    if not hasattr(request, 'scope'):
+        return JsonResponse(
+            {'error': 'Queue events require the ASGI server. Use /api/student/queue-status instead.'},
+            status=501
+        )
+    if not cache_is_shared():
+        return JsonResponse(
+            {'error': 'Queue events require a shared cache (REDIS_URL). Use /api/student/queue-status instead.'},
+            status=501
+        )
+
+    user = await sync_to_async(authenticate_stream_request)(request)
+    if user is None:
+        return JsonResponse(
+            {'error': 'Authentication credentials were not provided or are invalid.'},
+            status=401
+        )
+    if not user.is_student():
+        return JsonResponse({'error': 'Student access required.'}, status=403)
+
+    response = StreamingHttpResponse(
+        queue_event_stream(user),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
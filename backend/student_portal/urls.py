@@ -1,18 +1,22 @@
 from django.urls import path
-from . import views
+from . import views, streams
 
 urlpatterns = [
     path('student/enter-test-code', views.enter_test_code, name='enter_test_code'),
     path('student/queue-status', views.check_queue_status, name='check_queue_status'),
+    path('student/queue-events', streams.queue_events, name='queue_events'),
     path('student/start-test', views.start_test, name='start_test'),
     path('student/leave-queue', views.leave_queue, name='leave_queue'),
     path('student/access', views.enter_test_code, name='access_test'),
     path('student/test', views.get_current_test, name='get_current_test'),
     path('student/attempt', views.get_current_attempt, name='get_current_attempt'),
+    path('student/clock', views.get_exam_clock, name='get_exam_clock'),
+    path('student/answers', views.save_all_answers, name='save_all_answers'),
     path('student/answers/reading', views.save_reading_answers, name='save_reading_answers'),
     path('student/answers/listening', views.save_listening_answers, name='save_listening_answers'),
     path('student/answers/writing', views.save_writing, name='save_writing'),
     path('student/answers/writing-task', views.save_writing_task, name='save_writing_task'),
+    path('student/answers/writing-task/<int:task_number>', views.get_writing_draft, name='get_writing_draft'),
     path('student/highlights', views.save_highlights, name='save_highlights'),
     path('student/speaking/questions', views.get_speaking_questions, name='get_speaking_questions'),
     path('student/speaking/upload-audio', views.upload_speaking_audio, name='upload_speaking_audio'),
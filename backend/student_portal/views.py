@@ -1,12 +1,22 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.http import http_date, parse_etags, quote_etag
 from django.db import transaction
 from datetime import timedelta
-from .models import StudentTest, TestResponse, TestResult, TestQueue, SpeakingResponse
+from .models import (
+    StudentTest, TestResponse, TestResult, TestQueue, SpeakingResponse, AnswerRevision
+)
+from .queue_events import notify_queue_change
+from .idempotency import idempotent
+from . import autosave_buffer, writing_drafts
+from .active_attempts import (
+    get_active_student_test, invalidate_active_attempt, resolve_active_attempt
+)
 from exams.models import Variant, TestFile
 from .serializers import (
     StudentTestSerializer, TestResponseSerializer, TestResultSerializer
@@ -58,14 +68,14 @@ def serialize_queue_entry(queue_entry, *, include_student_test=False, student_te
         wait_seconds = int((now - queue_entry.joined_at).total_seconds())
         wait_seconds = max(0, wait_seconds)
         data['waiting_duration_seconds'] = wait_seconds
-        timeout_deadline = queue_entry.joined_at + timedelta(minutes=10)
+        timeout_deadline = queue_entry.joined_at + timedelta(minutes=TestQueue.TIMEOUT_MINUTES)
         data['timeout_deadline'] = timeout_deadline.isoformat()
 
     if queue_entry.preparation_started_at:
         elapsed = (now - queue_entry.preparation_started_at).total_seconds()
-        remaining = max(0, 60 - int(elapsed))
+        remaining = max(0, TestQueue.PREPARATION_SECONDS - int(elapsed))
         data['preparation_time_remaining'] = remaining
-        auto_start_at = queue_entry.preparation_started_at + timedelta(seconds=60)
+        auto_start_at = queue_entry.preparation_started_at + timedelta(seconds=TestQueue.PREPARATION_SECONDS)
         data['auto_start_at'] = auto_start_at.isoformat()
         data['can_start'] = remaining <= 0
     else:
@@ -165,6 +175,9 @@ def enter_test_code(request):
         )
         created = True
 
+    if created:
+        notify_queue_change(request.user.id)
+
     message = 'Already in queue' if not created else 'Test Starting Soon - Please Wait'
 
     # If variant is already active, assign immediately
@@ -188,6 +201,7 @@ def enter_test_code(request):
                 'preparation_started_at'
             ]
         )
+        notify_queue_change(request.user.id)
         
         payload = serialize_queue_entry(
             queue_entry,
@@ -204,6 +218,41 @@ def enter_test_code(request):
     return Response(payload)
 
 
+def is_queue_entry_timed_out(queue_entry, now=None):
+    """Return True if an entry has waited past the timeout without starting."""
+    now = now or timezone.now()
+    waited = now - queue_entry.joined_at
+    return queue_entry.status != 'started' and waited >= timedelta(minutes=TestQueue.TIMEOUT_MINUTES)
+
+
+def get_queue_status_payload(user):
+    """
+    Return the queue status payload for a student.
+
+    Read-only: timeouts and the preparation -> started transition are persisted
+    by the ``sweep_queue`` worker. An entry that is already due for timeout is
+    reported as timed out so clients do not wait for the next sweep.
+    """
+    queue_entry = TestQueue.objects.filter(
+        student=user,
+        status__in=['waiting', 'assigned', 'preparation', 'started']
+    ).select_related('assigned_variant', 'student').order_by('-joined_at').first()
+
+    if not queue_entry:
+        return {
+            'status': 'none',
+            'message': 'No active queue entry'
+        }
+
+    if is_queue_entry_timed_out(queue_entry):
+        return {
+            'status': 'timeout',
+            'message': 'Test did not start within 10 minutes'
+        }
+
+    return serialize_queue_entry(queue_entry)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def check_queue_status(request):
@@ -213,47 +262,8 @@ def check_queue_status(request):
             {'error': 'Student access required.'},
             status=status.HTTP_403_FORBIDDEN
         )
-    
-    queue_entry = TestQueue.objects.filter(
-        student=request.user,
-        status__in=['waiting', 'assigned', 'preparation', 'started']
-    ).select_related('assigned_variant', 'student').order_by('-joined_at').first()
-    
-    if not queue_entry:
-        return Response({
-            'status': 'none',
-            'message': 'No active queue entry'
-        })
-    
-    # Check for timeout (10 minutes)
-    joined_at = queue_entry.joined_at
-    now = timezone.now()
-    minutes_waiting = (now - joined_at).total_seconds() / 60
-    
-    if minutes_waiting >= 10 and queue_entry.status != 'started':
-        queue_entry.status = 'timeout'
-        queue_entry.timeout_at = now
-        queue_entry.save()
-        return Response({
-            'status': 'timeout',
-            'message': 'Test did not start within 10 minutes'
-        })
-    
-    if queue_entry.status == 'preparation' and queue_entry.preparation_started_at:
-        elapsed = (timezone.now() - queue_entry.preparation_started_at).total_seconds()
-        if elapsed >= 60 and queue_entry.status != 'started':
-            queue_entry.status = 'started'
-            queue_entry.started_at = timezone.now()
-            queue_entry.save(update_fields=['status', 'started_at'])
-            if queue_entry.assigned_variant_id:
-                StudentTest.objects.get_or_create(
-                    student=request.user,
-                    variant=queue_entry.assigned_variant,
-                    defaults={'status': 'in_progress'}
-                )
 
-    payload = serialize_queue_entry(queue_entry)
-    return Response(payload)
+    return Response(get_queue_status_payload(request.user))
 
 
 @api_view(['POST'])
@@ -304,7 +314,7 @@ def start_test(request):
     # Check if preparation time is over
     if queue_entry.preparation_started_at:
         elapsed = (timezone.now() - queue_entry.preparation_started_at).total_seconds()
-        if elapsed < 60:
+        if elapsed < TestQueue.PREPARATION_SECONDS:
             return Response(
                 {'error': 'Preparation time not yet completed.'},
                 status=status.HTTP_400_BAD_REQUEST
@@ -314,6 +324,7 @@ def start_test(request):
     queue_entry.status = 'started'
     queue_entry.started_at = timezone.now()
     queue_entry.save(update_fields=['status', 'started_at'])
+    notify_queue_change(request.user.id)
     
     # Get or create StudentTest
     student_test = StudentTest.objects.filter(
@@ -325,6 +336,8 @@ def start_test(request):
         # User is re-entering after leaving or restarting
         # RESET all progress as per strict requirements
         student_test.responses.all().delete()
+        student_test.answer_revisions.all().delete()
+        student_test.writing_drafts.all().delete()
         student_test.status = 'in_progress'
         student_test.start_time = timezone.now()
         student_test.submission_time = None
@@ -335,6 +348,7 @@ def start_test(request):
             variant=queue_entry.assigned_variant,
             status='in_progress'
         )
+    invalidate_active_attempt(request.user.id)
     
     payload = serialize_queue_entry(
         queue_entry,
@@ -379,6 +393,7 @@ def leave_queue(request):
     queue_entry.status = 'left'
     queue_entry.left_at = timezone.now()
     queue_entry.save()
+    notify_queue_change(request.user.id)
     
     return Response({
         'success': True,
@@ -494,10 +509,7 @@ def get_current_attempt(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    student_test = StudentTest.objects.filter(
-        student=request.user,
-        status='in_progress'
-    ).first()
+    student_test = get_active_student_test(request)
     
     if not student_test:
         return Response(
@@ -505,90 +517,254 @@ def get_current_attempt(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Calculate time remaining
-    elapsed_time = (timezone.now() - student_test.start_time).total_seconds()
-    total_seconds = student_test.variant.duration_minutes * 60
-    time_remaining = max(0, total_seconds - elapsed_time)
-    
     serializer = StudentTestSerializer(student_test)
     data = serializer.data
-    data['time_remaining_seconds'] = int(time_remaining)
+    data['time_remaining_seconds'] = resolve_active_attempt(request).seconds_remaining(timezone.now())
     
     return Response(data)
 
 
+def answer_rows(section, answers):
+    """
+    Turn an answer map into (section, question_number, answer) rows.
+
+    Raises AttributeError/TypeError/ValueError if ``answers`` is not a
+    mapping of question numbers.
+    """
+    return [(section, int(question_num), str(answer)) for question_num, answer in answers.items()]
+
+
+def upsert_answer_rows(student_test_id, rows):
+    """
+    Write (section, question_number, answer) rows with a single INSERT ... ON CONFLICT.
+
+    Rows are keyed by the (student_test, section, question_number) unique
+    constraint; existing rows get the new answer and updated_at. Rows of
+    several sections go into the same statement.
+    """
+    latest = {(section, question_number): answer for section, question_number, answer in rows}
+    if not latest:
+        return 0
+    
+    TestResponse.objects.bulk_create(
+        [
+            TestResponse(
+                student_test_id=student_test_id,
+                section=section,
+                question_number=question_number,
+                answer=answer
+            )
+            for (section, question_number), answer in latest.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['student_test', 'section', 'question_number'],
+        update_fields=['answer', 'updated_at']
+    )
+    return len(latest)
+
+
+def upsert_section_answers(student_test_id, section, answers):
+    """Write a reading/listening answer map with a single INSERT ... ON CONFLICT."""
+    return upsert_answer_rows(student_test_id, answer_rows(section, answers))
+
+
+def sync_section_answers(student_test_id, section, revision, changes):
+    """
+    Apply one delta-sync batch to a section if its revision is new.
+
+    The per-section revision is advanced with a conditional UPDATE, so of
+    concurrent or replayed batches only the first with a given revision is
+    applied. ``changes`` maps question numbers to answers; ``None`` clears an
+    answer.
+
+    Returns:
+        tuple: (outcome, current revision) where outcome is 'applied',
+        'duplicate' (this revision was already applied) or 'stale'
+    """
+    rows = {int(question_num): answer for question_num, answer in changes.items()}
+    
+    with transaction.atomic():
+        advanced = AnswerRevision.objects.filter(
+            student_test_id=student_test_id,
+            section=section,
+            revision__lt=revision
+        ).update(revision=revision)
+        
+        if not advanced:
+            state, created = AnswerRevision.objects.get_or_create(
+                student_test_id=student_test_id,
+                section=section,
+                defaults={'revision': revision}
+            )
+            if not created:
+                outcome = 'duplicate' if state.revision == revision else 'stale'
+                return outcome, state.revision
+        
+        upsert_answer_rows(student_test_id, [
+            (section, question_number, str(answer))
+            for question_number, answer in rows.items() if answer is not None
+        ])
+        cleared = [question_number for question_number, answer in rows.items() if answer is None]
+        if cleared:
+            TestResponse.objects.filter(
+                student_test_id=student_test_id,
+                section=section,
+                question_number__in=cleared
+            ).delete()
+    
+    return 'applied', revision
+
+
+def is_valid_revision(revision):
+    """Delta-sync revisions are positive integers."""
+    return isinstance(revision, int) and not isinstance(revision, bool) and revision >= 1
+
+
+def save_section_answers(request, attempt, section):
+    """
+    Handle a reading/listening save request.
+
+    Legacy clients send the full map as ``answers``. Delta-sync clients send
+    only changed questions as ``changes`` with a per-section ``revision``
+    that grows with every batch, and keep unacknowledged changes for their
+    next batch. A replayed revision is a no-op; an older one gets 409 with
+    the current revision.
+    """
+    label = section.title()
+    
+    if 'revision' not in request.data:
+        buffered = autosave_buffer.is_enabled()
+        try:
+            if buffered:
+                autosave_buffer.buffer_answers(attempt.id, answer_rows(section, request.data.get('answers', {})))
+            else:
+                upsert_section_answers(attempt.id, section, request.data.get('answers', {}))
+        except (AttributeError, TypeError, ValueError):
+            return Response(
+                {'error': 'answers must map question numbers to answers.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({'message': f'{label} answers saved successfully.', 'buffered': buffered})
+    
+    revision = request.data.get('revision')
+    if not is_valid_revision(revision):
+        return Response(
+            {'error': 'revision must be a positive integer.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        outcome, current = sync_section_answers(attempt.id, section, revision, request.data.get('changes', {}))
+    except (AttributeError, TypeError, ValueError):
+        return Response(
+            {'error': 'changes must map question numbers to answers.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    if outcome == 'stale':
+        return Response(
+            {'error': 'Stale revision.', 'revision': current},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    return Response({
+        'message': f'{label} answers saved successfully.',
+        'revision': current,
+        'applied': outcome == 'applied',
+    })
+
+
+# Clients may reuse a clock response this long before syncing again.
+EXAM_CLOCK_MAX_AGE = 5
+
+
+@api_view(['GET'])
+@authentication_classes([JWTStatelessUserAuthentication])
+@permission_classes([IsAuthenticated])
+def get_exam_clock(request):
+    """
+    Return server time, deadline and remaining seconds of the active attempt.
+
+    Built for timer sync: the token is verified without loading the user and
+    the attempt comes from the active attempt cache, so a request costs at
+    most one query. Only students have attempts, which stands in for the role
+    check. The ETag covers the attempt and its deadline; a matching
+    If-None-Match gets a bodyless 304 whose Date header carries server time.
+    """
+    attempt = resolve_active_attempt(request)
+    
+    if not attempt:
+        return Response(
+            {'error': 'No active test found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    now = timezone.now()
+    etag = quote_etag(f'{attempt.id}-{int(attempt.deadline.timestamp())}')
+    headers = {
+        'ETag': etag,
+        'Cache-Control': f'private, max-age={EXAM_CLOCK_MAX_AGE}',
+        'Date': http_date(now.timestamp()),
+    }
+    
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response({
+        'student_test_id': attempt.id,
+        'server_time': now.isoformat(),
+        'deadline': attempt.deadline.isoformat(),
+        'time_remaining_seconds': attempt.seconds_remaining(now),
+    }, headers=headers)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def save_reading_answers(request):
-    """Save reading section answers."""
+    """Save reading section answers (full answer map or delta-sync batch)."""
     if not request.user.is_student():
         return Response(
             {'error': 'Student access required.'},
             status=status.HTTP_403_FORBIDDEN
         )
     
-    student_test = StudentTest.objects.filter(
-        student=request.user,
-        status='in_progress'
-    ).first()
+    attempt = resolve_active_attempt(request)
     
-    if not student_test:
+    if not attempt:
         return Response(
             {'error': 'No active test found.'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    answers = request.data.get('answers', {})
-    
-    with transaction.atomic():
-        for question_num, answer in answers.items():
-            TestResponse.objects.update_or_create(
-                student_test=student_test,
-                section='reading',
-                question_number=int(question_num),
-                defaults={'answer': str(answer)}
-            )
-    
-    return Response({'message': 'Reading answers saved successfully.'})
+    return save_section_answers(request, attempt, 'reading')
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def save_listening_answers(request):
-    """Save listening section answers."""
+    """Save listening section answers (full answer map or delta-sync batch)."""
     if not request.user.is_student():
         return Response(
             {'error': 'Student access required.'},
             status=status.HTTP_403_FORBIDDEN
         )
     
-    student_test = StudentTest.objects.filter(
-        student=request.user,
-        status='in_progress'
-    ).first()
+    attempt = resolve_active_attempt(request)
     
-    if not student_test:
+    if not attempt:
         return Response(
             {'error': 'No active test found.'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    answers = request.data.get('answers', {})
-    
-    with transaction.atomic():
-        for question_num, answer in answers.items():
-            TestResponse.objects.update_or_create(
-                student_test=student_test,
-                section='listening',
-                question_number=int(question_num),
-                defaults={'answer': str(answer)}
-            )
-    
-    return Response({'message': 'Listening answers saved successfully.'})
+    return save_section_answers(request, attempt, 'listening')
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def save_writing(request):
     """Save writing section content (legacy - single content)."""
     if not request.user.is_student():
@@ -597,12 +773,9 @@ def save_writing(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    student_test = StudentTest.objects.filter(
-        student=request.user,
-        status='in_progress'
-    ).first()
+    attempt = resolve_active_attempt(request)
     
-    if not student_test:
+    if not attempt:
         return Response(
             {'error': 'No active test found.'},
             status=status.HTTP_404_NOT_FOUND
@@ -611,7 +784,7 @@ def save_writing(request):
     content = request.data.get('content', '')
     
     TestResponse.objects.update_or_create(
-        student_test=student_test,
+        student_test_id=attempt.id,
         section='writing',
         question_number=None,
         defaults={'answer': content}
@@ -622,6 +795,7 @@ def save_writing(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def save_writing_task(request):
     """Save writing task 1 or 2 content."""
     if not request.user.is_student():
@@ -630,12 +804,9 @@ def save_writing_task(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    student_test = StudentTest.objects.filter(
-        student=request.user,
-        status='in_progress'
-    ).first()
+    attempt = resolve_active_attempt(request)
     
-    if not student_test:
+    if not attempt:
         return Response(
             {'error': 'No active test found.'},
             status=status.HTTP_404_NOT_FOUND
@@ -643,38 +814,197 @@ def save_writing_task(request):
     
     task_number = request.data.get('task_number')  # 1 or 2
     content = request.data.get('content', '')
+    patch = request.data.get('patch')
     
     if task_number not in [1, 2]:
         return Response(
             {'error': 'task_number must be 1 or 2.'},
             status=status.HTTP_400_BAD_REQUEST
         )
-        
-    if not student_test:
-        # Check if it was recently submitted (race condition or retry)
-        student_test = StudentTest.objects.filter(
-            student=request.user,
-            status__in=['submitted', 'graded']
-        ).order_by('-submission_time').first()
-        
-        if student_test:
-            # If already submitted, we can't save new content, but we should return 200 
-            # to avoid client-side errors during "submit & save" chain
-            return Response({'message': f'Test already submitted. Writing Task {task_number} not updated.'})
-            
+    
+    # Drafts are versioned: clients may send a patch against the version they
+    # last saw instead of the full text (see writing_drafts).
+    try:
+        if patch is not None:
+            outcome, version = writing_drafts.save_draft(
+                attempt.id, task_number,
+                patch=patch,
+                base_version=request.data.get('base_version')
+            )
+        else:
+            outcome, version = writing_drafts.save_draft(attempt.id, task_number, content=str(content))
+    except writing_drafts.PatchError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if outcome == 'stale':
+        return Response(
+            {'error': 'Stale draft version. Send the full text.', 'version': version},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    return Response({'message': f'Writing Task {task_number} saved successfully.', 'version': version})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_writing_draft(request, task_number):
+    """
+    Get the latest (or ``?version=``) text of a writing task draft.
+    
+    Clients resuming after a reload use it as the base for further patches.
+    ``?history=1`` also lists every saved version with its stored size.
+    """
+    if not request.user.is_student():
+        return Response(
+            {'error': 'Student access required.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    attempt = resolve_active_attempt(request)
+    
+    if not attempt:
         return Response(
             {'error': 'No active test found.'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    TestResponse.objects.update_or_create(
-        student_test=student_test,
-        section='writing',
-        question_number=task_number,
-        defaults={'answer': content}
-    )
+    if task_number not in [1, 2]:
+        return Response(
+            {'error': 'task_number must be 1 or 2.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    version = request.query_params.get('version')
+    if version is not None:
+        try:
+            version = int(version)
+        except ValueError:
+            return Response(
+                {'error': 'version must be an integer.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+    draft = writing_drafts.draft_text(attempt.id, task_number, version)
+    if draft is None and version is not None:
+        return Response(
+            {'error': 'Draft version not found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
     
-    return Response({'message': f'Writing Task {task_number} saved successfully.'})
+    data = {
+        'task_number': task_number,
+        'version': draft[0] if draft else 0,
+        'content': draft[1] if draft else '',
+    }
+    if request.query_params.get('history'):
+        data['history'] = writing_drafts.draft_history(attempt.id, task_number)
+    return Response(data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@idempotent
+def save_all_answers(request):
+    """
+    Save listening, reading and writing answers in one request.
+    
+    Each section takes the same payload as its own endpoint and all are
+    optional::
+    
+        {"listening": {"answers": {...}}, "reading": {"revision": 7, "changes": {...}},
+         "writing": {"1": {"content": "..."}, "2": {"base_version": 4, "patch": [...]}}}
+    
+    Full answer maps of both sections go into one bulk upsert and everything
+    is written in one transaction. Every section is acknowledged separately
+    with a status of ``saved``, ``duplicate``, ``stale`` or ``invalid``.
+    """
+    if not request.user.is_student():
+        return Response(
+            {'error': 'Student access required.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    attempt = resolve_active_attempt(request)
+    
+    if not attempt:
+        return Response(
+            {'error': 'No active test found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    acks = {}
+    full_rows = []
+    deltas = []
+    for section in ('listening', 'reading'):
+        payload = request.data.get(section)
+        if payload is None:
+            continue
+        if not isinstance(payload, dict):
+            acks[section] = {'status': 'invalid', 'error': f'{section} must be an object.'}
+        elif 'revision' in payload:
+            if not is_valid_revision(payload['revision']):
+                acks[section] = {'status': 'invalid', 'error': 'revision must be a positive integer.'}
+            else:
+                deltas.append((section, payload['revision'], payload.get('changes', {})))
+        else:
+            try:
+                rows = answer_rows(section, payload.get('answers', {}))
+            except (AttributeError, TypeError, ValueError):
+                acks[section] = {'status': 'invalid', 'error': 'answers must map question numbers to answers.'}
+            else:
+                full_rows.extend(rows)
+                acks[section] = {'status': 'saved', 'answers': len(rows)}
+    
+    writing = request.data.get('writing') or {}
+    if not isinstance(writing, dict):
+        acks['writing'] = {'status': 'invalid', 'error': 'writing must map task numbers to drafts.'}
+        writing = {}
+    
+    buffered = bool(full_rows) and autosave_buffer.is_enabled()
+    if buffered:
+        autosave_buffer.buffer_answers(attempt.id, full_rows)
+    
+    with transaction.atomic():
+        if full_rows and not buffered:
+            upsert_answer_rows(attempt.id, full_rows)
+        
+        for section, revision, changes in deltas:
+            try:
+                outcome, current = sync_section_answers(attempt.id, section, revision, changes)
+            except (AttributeError, TypeError, ValueError):
+                acks[section] = {'status': 'invalid', 'error': 'changes must map question numbers to answers.'}
+                continue
+            acks[section] = {
+                'status': 'saved' if outcome == 'applied' else outcome,
+                'revision': current,
+            }
+        
+        for task_key, draft in writing.items():
+            task_ack = acks.setdefault('writing', {})
+            if str(task_key) not in ('1', '2') or not isinstance(draft, dict):
+                task_ack[str(task_key)] = {'status': 'invalid', 'error': 'Expected task 1 or 2 with a draft object.'}
+                continue
+            try:
+                if draft.get('patch') is not None:
+                    outcome, version = writing_drafts.save_draft(
+                        attempt.id, int(task_key),
+                        patch=draft['patch'],
+                        base_version=draft.get('base_version')
+                    )
+                else:
+                    outcome, version = writing_drafts.save_draft(
+                        attempt.id, int(task_key),
+                        content=str(draft.get('content', ''))
+                    )
+            except writing_drafts.PatchError as e:
+                task_ack[str(task_key)] = {'status': 'invalid', 'error': str(e)}
+                continue
+            task_ack[str(task_key)] = {
+                'status': 'stale' if outcome == 'stale' else 'saved',
+                'version': version,
+            }
+    
+    return Response({'message': 'Answers saved.', 'buffered': buffered, 'sections': acks})
 
 
 @api_view(['POST'])
@@ -701,18 +1031,16 @@ def save_highlights(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def submit_test(request):
-    """Submit test and trigger automatic grading."""
+    """Submit test, grade reading/listening and queue writing for grading."""
     if not request.user.is_student():
         return Response(
             {'error': 'Student access required.'},
             status=status.HTTP_403_FORBIDDEN
         )
     
-    student_test = StudentTest.objects.filter(
-        student=request.user,
-        status='in_progress'
-    ).first()
+    student_test = get_active_student_test(request)
     
     if not student_test:
         # Check if already submitted
@@ -750,21 +1078,32 @@ def submit_test(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Calculate time remaining
-    elapsed_time = (timezone.now() - student_test.start_time).total_seconds()
-    total_seconds = student_test.variant.duration_minutes * 60
-    time_remaining = max(0, total_seconds - elapsed_time)
+    # Buffered autosaves must reach the database before the attempt is graded
+    if autosave_buffer.is_enabled():
+        try:
+            autosave_buffer.flush_buffer(wait_seconds=autosave_buffer.SUBMIT_FLUSH_WAIT_SECONDS, force=True)
+        except autosave_buffer.FlushLockTimeout:
+            return Response(
+                {'error': 'Your answers are still being saved. Please submit again.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+    
+    writing_drafts.materialize_drafts([student_test.id])
     
-    student_test.time_remaining_seconds = int(time_remaining)
+    # Calculate time remaining
+    student_test.time_remaining_seconds = resolve_active_attempt(request).seconds_remaining(timezone.now())
     student_test.submit()
     
-    # Trigger automatic grading
+    # Grade reading/listening now; writing is graded by the job queue
     try:
-        from grading.services import grade_test
-        test_result = grade_test(student_test)
+        from grading.jobs import grade_submitted_test
+        test_result, grading_job = grade_submitted_test(student_test)
         
         return Response({
-            'message': 'Test submitted and graded successfully.',
+            'message': (
+                'Test submitted. Writing is being graded.' if grading_job
+                else 'Test submitted and graded successfully.'
+            ),
             'student_test': StudentTestSerializer(student_test).data,
             'result': {
                 'listening_score': float(test_result.listening_score) if test_result.listening_score else None,
@@ -778,7 +1117,11 @@ def submit_test(request):
                 'reading_breakdown': test_result.reading_breakdown,
                 'writing_breakdown': test_result.writing_breakdown,
                 'speaking_breakdown': test_result.speaking_breakdown,
-            }
+            },
+            'grading_job': {
+                'id': grading_job.id,
+                'status': grading_job.status,
+            } if grading_job else None,
         })
     except Exception as e:
         # If grading fails, still submit the test
@@ -799,10 +1142,11 @@ def get_speaking_questions(request):
             status=status.HTTP_403_FORBIDDEN
         )
 
-    # Allow both in_progress and graded status (speaking can be done after other sections are graded)
+    # Speaking follows the written sections: allow submitted (writing still
+    # queued for grading) and graded attempts too
     student_test = StudentTest.objects.filter(
         student=request.user,
-        status__in=['in_progress', 'graded']
+        status__in=['in_progress', 'submitted', 'graded']
     ).order_by('-start_time').first()
 
     if not student_test:
@@ -836,10 +1180,11 @@ def upload_speaking_audio(request):
             status=status.HTTP_403_FORBIDDEN
         )
 
-    # Allow both in_progress and graded status (speaking can be recorded after other sections are graded)
+    # Speaking follows the written sections: allow submitted (writing still
+    # queued for grading) and graded attempts too
     student_test = StudentTest.objects.filter(
         student=request.user,
-        status__in=['in_progress', 'graded']
+        status__in=['in_progress', 'submitted', 'graded']
     ).order_by('-start_time').first()
 
     if not student_test:
@@ -901,10 +1246,11 @@ def transcribe_and_grade_speaking(request):
             status=status.HTTP_403_FORBIDDEN
         )
 
-    # Allow both in_progress and graded status (speaking grading can happen after other sections)
+    # Speaking follows the written sections: allow submitted (writing still
+    # queued for grading) and graded attempts too
     student_test = StudentTest.objects.filter(
         student=request.user,
-        status__in=['in_progress', 'graded']
+        status__in=['in_progress', 'submitted', 'graded']
     ).order_by('-start_time').first()
 
     if not student_test:
@@ -926,7 +1272,9 @@ def transcribe_and_grade_speaking(request):
 
     # Import grading services
     from grading.speech_to_text import transcribe_audio_whisper
-    from grading.ai_speaking_grading import grade_speaking_part_ai, calculate_speaking_overall_score
+    from grading.ai_speaking_grading import (
+        calculate_speaking_overall_score, grade_speaking_part_ai, speaking_parts
+    )
 
     # Get speaking questions data
     variant = student_test.variant
@@ -968,61 +1316,10 @@ def transcribe_and_grade_speaking(request):
             })
 
     # Step 2: Grade each part
-    # Group responses by part
-    responses_by_part = {}
-    for response in speaking_responses:
-        if response.transcription_status == 'completed':
-            if response.part_number not in responses_by_part:
-                responses_by_part[response.part_number] = []
-            responses_by_part[response.part_number].append(response)
-
+    completed = [response for response in speaking_responses if response.transcription_status == 'completed']
     part_scores = []
 
-    for part_num in [1, 2, 3]:
-        if part_num not in responses_by_part:
-            continue
-
-        part_responses = responses_by_part[part_num]
-
-        # Get questions for this part
-        if part_num == 1:
-            part_data = questions_data.get('part1', {})
-            topic = part_data.get('topic', 'Interview')
-            questions = part_data.get('questions', [])
-
-            # Combine all responses for part 1
-            combined_text = '\n\n'.join([
-                f"Q{i+1}: {questions[i] if i < len(questions) else 'Question'}\nA: {resp.transcribed_text}"
-                for i, resp in enumerate(part_responses)
-            ])
-
-        elif part_num == 2:
-            part_data = questions_data.get('part2', {})
-            topic = part_data.get('topic', 'Long Turn')
-            prompt = part_data.get('prompt', '')
-            points = part_data.get('points', [])
-            final = part_data.get('final', '')
-
-            questions = [f"{prompt}\n\nYou should say:\n" + "\n".join(points) + f"\n{final}"]
-            combined_text = part_responses[0].transcribed_text if part_responses else ''
-
-        elif part_num == 3:
-            part_data = questions_data.get('part3', {})
-            topics = part_data.get('topics', [])
-
-            all_questions = []
-            for topic_group in topics:
-                all_questions.extend(topic_group.get('questions', []))
-
-            topic = 'Discussion'
-            questions = all_questions
-
-            # Combine all responses for part 3
-            combined_text = '\n\n'.join([
-                f"Q{i+1}: {all_questions[i] if i < len(all_questions) else 'Question'}\nA: {resp.transcribed_text}"
-                for i, resp in enumerate(part_responses)
-            ])
-
+    for part_num, (topic, questions, combined_text) in speaking_parts(questions_data, completed).items():
         # Grade this part
         grading_result = grade_speaking_part_ai(
             part_number=part_num,
@@ -1047,7 +1344,9 @@ def transcribe_and_grade_speaking(request):
 
     test_result.speaking_score = overall_speaking_score
     test_result.speaking_breakdown = grading_results
-    test_result.save()
+    # Writing may be graded by the job queue meanwhile; only touch speaking.
+    test_result.save(update_fields=['speaking_score', 'speaking_breakdown'])
+    test_result.refresh_from_db()
 
     # Recalculate overall score including speaking
     test_result.calculate_overall_score()
@@ -0,0 +1,291 @@
+"""
+Incremental storage for writing task drafts.
+
+Every writing autosave used to rewrite the whole essay. Drafts are now stored
+as versions: a full snapshot every COMPACT_EVERY versions and compact patches
+in between. A patch is a JSON list of operations applied left to right: a
+positive integer keeps that many characters, a negative one deletes that many
+and a string inserts it; text after the last operation is kept. Clients can
+send patches against the version they last saw (``base_version``); full-text
+saves are diffed on the server.
+
+Saves only add a version. The writing TestResponse rows are written once,
+from the latest versions, when the attempt is submitted (materialize_drafts),
+which is what the graders read; until then the test payload reads the drafts
+(overlay_drafts).
+"""
+
+import json
+import os
+from difflib import SequenceMatcher
+
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Length
+
+from .models import TestResponse, WritingDraft
+
+# Versions between full snapshots; bounds the patches replayed per rebuild.
+COMPACT_EVERY = 20
+
+# Above this many character comparisons the changed middle is stored as one
+# replacement instead of being diffed (e.g. a pasted paragraph).
+MAX_DIFF_WORK = 4_000_000
+
+
+class PatchError(ValueError):
+    """A patch is malformed or does not fit the text it is applied to."""
+
+
+def make_patch(old, new):
+    """Return the patch operations turning ``old`` into ``new``."""
+    prefix = len(os.path.commonprefix([old, new]))
+    suffix = 0
+    max_suffix = min(len(old), len(new)) - prefix
+    while suffix < max_suffix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    old_middle = old[prefix:len(old) - suffix]
+    new_middle = new[prefix:len(new) - suffix]
+
+    ops = [prefix] if prefix else []
+    if len(old_middle) * len(new_middle) > MAX_DIFF_WORK:
+        opcodes = [('replace', 0, len(old_middle), 0, len(new_middle))]
+    else:
+        opcodes = SequenceMatcher(None, old_middle, new_middle, autojunk=False).get_opcodes()
+
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            if ops and isinstance(ops[-1], int) and ops[-1] > 0:
+                ops[-1] += i2 - i1
+            else:
+                ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(i1 - i2)
+        if j2 > j1:
+            ops.append(new_middle[j1:j2])
+
+    # Trailing keeps are implicit.
+    if ops and isinstance(ops[-1], int) and ops[-1] > 0:
+        ops.pop()
+    return ops
+
+
+def apply_patch(text, ops):
+    """Apply patch operations to ``text``. Raises PatchError if they do not fit."""
+    if not isinstance(ops, list):
+        raise PatchError('A patch must be a list of operations.')
+
+    parts = []
+    position = 0
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        elif isinstance(op, int) and not isinstance(op, bool) and op:
+            end = position + abs(op)
+            if end > len(text):
+                raise PatchError('Patch does not fit the draft.')
+            if op > 0:
+                parts.append(text[position:end])
+            position = end
+        else:
+            raise PatchError('Patch operations must be non-zero integers or strings.')
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+def _replay(rows):
+    """
+    Rebuild texts from (student_test_id, task_number, version, kind, data) rows.
+
+    Rows must be ordered by attempt, task and version and each chain must
+    start at a snapshot.
+
+    Returns:
+        dict: (student_test_id, task_number) -> (version, text, snapshot version)
+    """
+    drafts = {}
+    for student_test_id, task_number, version, kind, data in rows:
+        key = (student_test_id, task_number)
+        if kind == 'snapshot':
+            drafts[key] = (version, data, version)
+        else:
+            _, text, snapshot_version = drafts[key]
+            drafts[key] = (version, apply_patch(text, json.loads(data)), snapshot_version)
+    return drafts
+
+
+def latest_drafts(student_test_ids, task_number=None):
+    """
+    Return the latest version and text of the drafts of the given attempts.
+
+    One query: only rows from each task's last snapshot onwards are read.
+
+    Returns:
+        dict: (student_test_id, task_number) -> (version, text, snapshot version)
+    """
+    last_snapshot = WritingDraft.objects.filter(
+        student_test=OuterRef('student_test'),
+        task_number=OuterRef('task_number'),
+        kind='snapshot'
+    ).order_by('-version').values('version')[:1]
+
+    rows = WritingDraft.objects.filter(
+        student_test_id__in=student_test_ids,
+        version__gte=Subquery(last_snapshot)
+    )
+    if task_number is not None:
+        rows = rows.filter(task_number=task_number)
+    return _replay(
+        rows.order_by('student_test_id', 'task_number', 'version')
+        .values_list('student_test_id', 'task_number', 'version', 'kind', 'data')
+    )
+
+
+def _write_responses(texts):
+    """Upsert the writing TestResponse rows from {(student_test_id, task_number): text}."""
+    if not texts:
+        return
+    TestResponse.objects.bulk_create(
+        [
+            TestResponse(
+                student_test_id=student_test_id,
+                section='writing',
+                question_number=task_number,
+                answer=text
+            )
+            for (student_test_id, task_number), text in texts.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['student_test', 'section', 'question_number'],
+        update_fields=['answer', 'updated_at']
+    )
+
+
+def save_draft(student_test_id, task_number, *, content=None, patch=None, base_version=None):
+    """
+    Store a new version of a writing task from full text or a patch.
+
+    A patch must be based on the current version; full text always wins
+    (last write), like the old overwrite. Raises PatchError for a patch that
+    does not apply.
+
+    Returns:
+        tuple: (outcome, version) where outcome is 'saved', 'unchanged' or
+        'stale' (the patch was based on an older version)
+    """
+    # Full-text saves retry when a concurrent save took the next version.
+    for _ in range(3):
+        with transaction.atomic():
+            current = latest_drafts([student_test_id], task_number).get((student_test_id, task_number))
+            version, text, snapshot_version = current or (0, '', 0)
+
+            if patch is not None:
+                if base_version != version:
+                    return 'stale', version
+                ops = patch
+                new_text = apply_patch(text, patch)
+            else:
+                if version and content == text:
+                    return 'unchanged', version
+                new_text = content
+                ops = make_patch(text, content)
+
+            encoded = json.dumps(ops, separators=(',', ':'), ensure_ascii=False)
+            compact = (
+                not version
+                or version + 1 - snapshot_version >= COMPACT_EVERY
+                or len(encoded) >= len(new_text)
+            )
+            try:
+                with transaction.atomic():
+                    WritingDraft.objects.create(
+                        student_test_id=student_test_id,
+                        task_number=task_number,
+                        version=version + 1,
+                        kind='snapshot' if compact else 'patch',
+                        data=new_text if compact else encoded
+                    )
+            except IntegrityError:
+                if patch is not None:
+                    return 'stale', version
+                continue
+        return 'saved', version + 1
+    return 'stale', version
+
+
+def materialize_drafts(student_test_ids):
+    """
+    Write the latest draft text of each task into TestResponse for grading.
+
+    Returns:
+        int: number of writing responses written
+    """
+    drafts = latest_drafts(student_test_ids)
+    _write_responses({key: text for key, (_, text, _) in drafts.items()})
+    return len(drafts)
+
+
+def overlay_drafts(student_test_id, responses):
+    """
+    Replace the writing answers in serialized responses with the latest drafts.
+
+    Used for attempts in progress, whose TestResponse rows are only written at
+    submit. Tasks without a response row are appended.
+
+    Returns:
+        list: the responses with current writing answers
+    """
+    drafts = latest_drafts([student_test_id])
+    if not drafts:
+        return responses
+
+    merged = []
+    for response in responses:
+        key = (student_test_id, response['question_number'])
+        if response['section'] == 'writing' and key in drafts:
+            response = {**response, 'answer': drafts.pop(key)[1]}
+        merged.append(response)
+    for (_, task_number), (_, text, _) in sorted(drafts.items()):
+        merged.append({
+            'id': None,
+            'student_test': student_test_id,
+            'section': 'writing',
+            'question_number': task_number,
+            'answer': text,
+            'created_at': None,
+            'updated_at': None,
+        })
+    return merged
+
+
+def draft_history(student_test_id, task_number):
+    """Return version, kind, stored size and time of every saved version."""
+    return list(
+        WritingDraft.objects.filter(student_test_id=student_test_id, task_number=task_number)
+        .annotate(size=Length('data'))
+        .order_by('version')
+        .values('version', 'kind', 'size', 'created_at')
+    )
+
+
+def draft_text(student_test_id, task_number, version=None):
+    """Return (version, text) of a given or the latest version, or None if there is none."""
+    if version is None:
+        draft = latest_drafts([student_test_id], task_number).get((student_test_id, task_number))
+        return (draft[0], draft[1]) if draft else None
+
+    rows = WritingDraft.objects.filter(student_test_id=student_test_id, task_number=task_number)
+    snapshot_version = (
+        rows.filter(kind='snapshot', version__lte=version)
+        .order_by('-version').values_list('version', flat=True).first()
+    )
+    if snapshot_version is None:
+        return None
+    drafts = _replay(
+        rows.filter(version__gte=snapshot_version, version__lte=version)
+        .order_by('version')
+        .values_list('student_test_id', 'task_number', 'version', 'kind', 'data')
+    )
+    draft = drafts[(student_test_id, task_number)]
+    return (draft[0], draft[1]) if draft[0] == version else None
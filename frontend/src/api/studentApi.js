@@ -1,4 +1,46 @@
 import api from '../utils/api';
+import { API_BASE_URL } from '../utils/constants';
+
+// One Idempotency-Key per logical submit. It is kept (across reloads too) until
+// the server gives a final answer, so every retry of that submit - automatic or
+// the student clicking again - replays the first response instead of running it.
+const SUBMIT_KEY_STORAGE = 'submitIdempotencyKey';
+const SUBMIT_ATTEMPTS = 3;
+
+const newIdempotencyKey = () => (
+  window.crypto?.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+);
+
+// No response (network error, timeout), a server error or 409 (first request still running)
+const isRetryable = (error) => !error.response || error.response.status >= 500 || error.response.status === 409;
+
+const submitWithIdempotencyKey = async () => {
+  let key = sessionStorage.getItem(SUBMIT_KEY_STORAGE);
+  if (!key) {
+    key = newIdempotencyKey();
+    sessionStorage.setItem(SUBMIT_KEY_STORAGE, key);
+  }
+
+  for (let attempt = 1; ; attempt += 1) {
+    try {
+      const response = await api.post('/student/submit', null, {
+        skipErrorRedirect: true,
+        headers: { 'Idempotency-Key': key },
+      });
+      sessionStorage.removeItem(SUBMIT_KEY_STORAGE);
+      return response;
+    } catch (error) {
+      if (!isRetryable(error)) {
+        sessionStorage.removeItem(SUBMIT_KEY_STORAGE);
+        throw error;
+      }
+      if (attempt >= SUBMIT_ATTEMPTS) throw error;
+      await new Promise((resolve) => setTimeout(resolve, 1000 * attempt));
+    }
+  }
+};
 
 export const studentApi = {
   login: (email, password) => api.post('/student/login', { email, password }),
@@ -6,6 +48,10 @@ export const studentApi = {
   // Test code entry and queue
   enterTestCode: (testCode) => api.post('/student/enter-test-code', { testCode }),
   checkQueueStatus: () => api.get('/student/queue-status'),
+  // Push-based queue status (SSE); EventSource cannot send headers, so the token goes in the query string
+  openQueueEvents: () => new EventSource(
+    `${API_BASE_URL}/student/queue-events?token=${encodeURIComponent(localStorage.getItem('accessToken') || '')}`
+  ),
   startTest: () => api.post('/student/start-test'),
   leaveQueue: () => api.post('/student/leave-queue'),
   // Legacy endpoints
@@ -13,11 +59,21 @@ export const studentApi = {
   // Test data endpoints with skipErrorRedirect to prevent 500 redirects during test sections
   getTest: () => api.get('/student/test', { skipErrorRedirect: true }),
   getAttempt: () => api.get('/student/attempt', { skipErrorRedirect: true }),
+  // Timer sync: server time, deadline and remaining seconds only
+  getClock: () => api.get('/student/clock', { skipErrorRedirect: true }),
   // Save answer endpoints with skipErrorRedirect to prevent 500 redirects during test
   saveReadingAnswers: (answers) => api.post('/student/answers/reading', { answers }, { skipErrorRedirect: true }),
   saveListeningAnswers: (answers) => api.post('/student/answers/listening', { answers }, { skipErrorRedirect: true }),
+  // Delta-sync: only changed answers (null clears one) with a per-section revision that grows every batch
+  syncReadingAnswers: (revision, changes) => api.post('/student/answers/reading', { revision, changes }, { skipErrorRedirect: true }),
+  syncListeningAnswers: (revision, changes) => api.post('/student/answers/listening', { revision, changes }, { skipErrorRedirect: true }),
+  // One autosave for every section: { listening, reading, writing: { 1: {...}, 2: {...} } }, acknowledged per section
+  saveAnswers: (payload) => api.post('/student/answers', payload, { skipErrorRedirect: true }),
   saveWriting: (content) => api.post('/student/answers/writing', { content }, { skipErrorRedirect: true }),
   saveWritingTask: (taskNumber, content) => api.post('/student/answers/writing-task', { task_number: taskNumber, content }, { skipErrorRedirect: true }),
+  // Writing drafts: patch (see utils/textPatch.js) against the last acknowledged version; 409 means resend the full text
+  saveWritingTaskPatch: (taskNumber, baseVersion, patch) => api.post('/student/answers/writing-task', { task_number: taskNumber, base_version: baseVersion, patch }, { skipErrorRedirect: true }),
+  getWritingDraft: (taskNumber, params = {}) => api.get(`/student/answers/writing-task/${taskNumber}`, { params, skipErrorRedirect: true }),
   saveHighlights: (highlights) => api.post('/student/highlights', { highlights }, { skipErrorRedirect: true }),
   // Speaking section endpoints
   getSpeakingQuestions: () => api.get('/student/speaking/questions', { skipErrorRedirect: true }),
@@ -36,7 +92,13 @@ export const studentApi = {
     });
   },
   transcribeAndGradeSpeaking: () => api.post('/student/speaking/transcribe-grade', {}, { skipErrorRedirect: true }),
-  submitTest: () => api.post('/student/submit'),
+  // Retried with the same Idempotency-Key, so a lost response never submits (and grades) twice
+  submitTest: () => submitWithIdempotencyKey(),
+  getGradingJob: (jobId) => api.get(`/grading/jobs/${jobId}`, { skipErrorRedirect: true }),
+  // Streamed AI grade of one writing task (scores, then feedback); needs the ASGI server
+  openWritingFeedbackEvents: (testId, taskNumber) => new EventSource(
+    `${API_BASE_URL}/grading/tests/${testId}/writing/${taskNumber}/events?token=${encodeURIComponent(localStorage.getItem('accessToken') || '')}`
+  ),
   getProfile: () => api.get('/student/profile'),
   updateProfile: (data) => api.put('/student/profile', data),
   getStats: () => api.get('/student/stats'),
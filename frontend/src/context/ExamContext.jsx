@@ -1,4 +1,6 @@
 import { createContext, useContext, useState, useCallback, useEffect } from 'react';
+import { readingSync, listeningSync } from '../utils/answerSync';
+import { resetWritingDrafts } from '../utils/writingDrafts';
 
 const ExamContext = createContext(null);
 
@@ -140,6 +142,9 @@ export const ExamProvider = ({ children }) => {
     setStudentName({ firstName: '', lastName: '' });
     // Increment audio reset key to force audio component remount
     setAudioResetKey(prev => prev + 1);
+    readingSync.reset();
+    listeningSync.reset();
+    resetWritingDrafts();
     // Clear sessionStorage
     try {
       sessionStorage.removeItem('examState');
@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useState, useRef } from 'react';
 import { useParams, useNavigate, Outlet } from 'react-router-dom';
 import { studentApi } from '../../api/studentApi';
 import { useAuth } from '../../context/AuthContext';
@@ -11,15 +11,21 @@ import Modal from '../../components/Modal';
 import Button from '../../components/Button';
 import { Maximize, ShieldAlert } from 'lucide-react';
 import { useAntiCheat } from '../../hooks/useAntiCheat';
+import { autosaveAll } from '../../utils/autosave';
+
+// Every section's unsaved changes go out together this often
+const AUTOSAVE_INTERVAL_MS = 30000;
 
 const ExamPage = () => {
   const { key } = useParams();
   const { user } = useAuth();
-  const { setExamData, setTimeRemaining, timeRemaining } = useExam();
+  const { setExamData, setTimeRemaining, timeRemaining, answers } = useExam();
   const navigate = useNavigate();
   const [test, setTest] = useState(null);
   const [loading, setLoading] = useState(true);
   const [sectionProgress, setSectionProgress] = useState(0);
+  const answersRef = useRef(answers);
+  answersRef.current = answers;
 
   // Anti-cheating hook
   const { isFullScreen, enterFullscreen, hasLeftWindow } = useAntiCheat(true);
@@ -32,6 +38,15 @@ const ExamPage = () => {
     loadTest();
   }, []);
 
+  useEffect(() => {
+    // One combined save for listening, reading and both writing tasks
+    const autoSaveInterval = setInterval(() => {
+      const writing = answersRef.current.writing || {};
+      autosaveAll({ 1: writing.task1, 2: writing.task2 }).catch(console.error);
+    }, AUTOSAVE_INTERVAL_MS);
+    return () => clearInterval(autoSaveInterval);
+  }, []);
+
   const loadTest = async () => {
     try {
       const response = await studentApi.getTest();
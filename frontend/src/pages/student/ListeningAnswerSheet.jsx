@@ -1,12 +1,12 @@
 import { useEffect, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { studentApi } from '../../api/studentApi';
 import { useExam } from '../../context/ExamContext';
 import Card from '../../components/Card';
 import Button from '../../components/Button';
 import Timer from '../../components/Timer';
 import Loader from '../../components/Loader';
 import { showToast } from '../../components/Toast';
+import { listeningSync } from '../../utils/answerSync';
 
 const ListeningAnswerSheet = () => {
   const { key } = useParams();
@@ -21,7 +21,8 @@ const ListeningAnswerSheet = () => {
 
   const handleAnswerChange = (questionId, value) => {
     updateAnswer('listening', questionId, value.toUpperCase());
-    studentApi.saveListeningAnswers({ ...answers.listening, [questionId]: value.toUpperCase() }).catch(console.error);
+    listeningSync.record(questionId, value.toUpperCase());
+    listeningSync.flush().catch(console.error);
   };
 
   const handleTimeout = () => {
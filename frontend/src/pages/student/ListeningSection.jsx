@@ -11,6 +11,7 @@ import { Clock, Headphones, Eraser } from 'lucide-react';
 import { useExam } from '../../context/ExamContext';
 import QuestionRenderer from '../../components/QuestionRenderer';
 import { useDebounce } from '../../hooks/useDebounce';
+import { listeningSync } from '../../utils/answerSync';
 
 const ListeningSection = () => {
   const navigate = useNavigate();
@@ -55,17 +56,6 @@ const ListeningSection = () => {
     }
   }, [answers.listening]);
 
-  useEffect(() => {
-    // Auto-save answers every 30 seconds
-    const autoSaveInterval = setInterval(() => {
-      if (Object.keys(listeningAnswers).length > 0) {
-        studentApi.saveListeningAnswers(listeningAnswers).catch(console.error);
-      }
-    }, 30000);
-
-    return () => clearInterval(autoSaveInterval);
-  }, [listeningAnswers]);
-
   useEffect(() => {
     // Review time countdown
     if (isReviewPhase && reviewTime > 0) {
@@ -87,6 +77,7 @@ const ListeningSection = () => {
     try {
       const response = await studentApi.getTest();
       setTestData(response.data);
+      listeningSync.setAttempt(response.data.id);
 
       // Load existing answers
       if (response.data.responses) {
@@ -122,17 +113,16 @@ const ListeningSection = () => {
     }
   }, []);
 
-  const debouncedSave = useDebounce((answers) => {
-    studentApi.saveListeningAnswers(answers).catch(console.error);
+  // Sends only the questions changed since the last acknowledged batch
+  const debouncedSave = useDebounce(() => {
+    listeningSync.flush().catch(console.error);
   }, 1000);
 
   const handleAnswerChange = useCallback((questionNum, value) => {
-    setListeningAnswers(prev => {
-      const newAnswers = { ...prev, [questionNum]: value };
-      debouncedSave(newAnswers);
-      return newAnswers;
-    });
+    setListeningAnswers(prev => ({ ...prev, [questionNum]: value }));
     updateAnswer('listening', questionNum, value);
+    listeningSync.record(questionNum, value);
+    debouncedSave();
   }, [updateAnswer, debouncedSave]);
 
 
@@ -140,9 +130,7 @@ const ListeningSection = () => {
   const handleReviewTimeout = async () => {
     // Save all answers one last time
     try {
-      if (Object.keys(listeningAnswers).length > 0) {
-        await studentApi.saveListeningAnswers(listeningAnswers);
-      }
+      await listeningSync.flush();
     } catch (error) {
       console.error('Failed to save listening answers:', error);
       // Continue to navigate even if save fails
@@ -209,9 +197,7 @@ const ListeningSection = () => {
             {process.env.NODE_ENV === 'development' && (
               <button
                 onClick={async () => {
-                  if (Object.keys(listeningAnswers).length > 0) {
-                    await studentApi.saveListeningAnswers(listeningAnswers);
-                  }
+                  await listeningSync.flush();
                   navigate('../reading');
                 }}
                 className="px-4 py-2 text-sm font-medium text-white bg-purple-600 hover:bg-purple-700 rounded-lg transition-colors"
@@ -1,12 +1,12 @@
 import { useEffect, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { studentApi } from '../../api/studentApi';
 import { useExam } from '../../context/ExamContext';
 import Card from '../../components/Card';
 import Button from '../../components/Button';
 import Timer from '../../components/Timer';
 import Loader from '../../components/Loader';
 import { showToast } from '../../components/Toast';
+import { readingSync } from '../../utils/answerSync';
 
 const ReadingAnswerSheet = () => {
   const { key } = useParams();
@@ -21,7 +21,8 @@ const ReadingAnswerSheet = () => {
 
   const handleAnswerChange = (questionId, value) => {
     updateAnswer('reading', questionId, value.toUpperCase());
-    studentApi.saveReadingAnswers({ ...answers.reading, [questionId]: value.toUpperCase() }).catch(console.error);
+    readingSync.record(questionId, value.toUpperCase());
+    readingSync.flush().catch(console.error);
   };
 
   const handleTimeout = () => {
@@ -10,6 +10,7 @@ import { showToast } from '../../components/Toast';
 import { Clock, BookOpen, ChevronRight, ChevronLeft } from 'lucide-react';
 import { useExam } from '../../context/ExamContext';
 import { useDebounce } from '../../hooks/useDebounce';
+import { readingSync } from '../../utils/answerSync';
 
 const ReadingSection = () => {
   const navigate = useNavigate();
@@ -37,15 +38,6 @@ const ReadingSection = () => {
     }
   }, [answers.reading]);
 
-  useEffect(() => {
-    const autoSaveInterval = setInterval(() => {
-      if (Object.keys(readingAnswers).length > 0) {
-        studentApi.saveReadingAnswers(readingAnswers).catch(console.error);
-      }
-    }, 30000);
-    return () => clearInterval(autoSaveInterval);
-  }, [readingAnswers]);
-
   useEffect(() => {
     if (timeRemaining > 0) {
       const timer = setInterval(() => {
@@ -65,6 +57,7 @@ const ReadingSection = () => {
     try {
       const response = await studentApi.getTest();
       setTestData(response.data);
+      readingSync.setAttempt(response.data.id);
       if (response.data.responses) {
         // Only load backend answers if we don't have local answers (or merge them)
         // For now, let's trust backend if local is empty, or merge carefully
@@ -92,24 +85,24 @@ const ReadingSection = () => {
     }
   };
 
-  const debouncedSave = useDebounce((answers) => {
-    studentApi.saveReadingAnswers(answers).catch(console.error);
+  // Sends only the questions changed since the last acknowledged batch
+  const debouncedSave = useDebounce(() => {
+    readingSync.flush().catch(console.error);
   }, 1000);
 
   const handleAnswerChange = (questionNum, value) => {
     const newAnswers = { ...readingAnswers, [questionNum]: value };
     setReadingAnswers(newAnswers);
     updateAnswer('reading', questionNum, value);
-    debouncedSave(newAnswers);
+    readingSync.record(questionNum, value);
+    debouncedSave();
   };
 
 
 
   const handleTimeout = async () => {
     try {
-      if (Object.keys(readingAnswers).length > 0) {
-        await studentApi.saveReadingAnswers(readingAnswers);
-      }
+      await readingSync.flush();
     } catch (error) {
       console.error('Failed to save reading answers:', error);
       // Continue to navigate even if save fails
@@ -183,7 +176,7 @@ const ReadingSection = () => {
             <button
               onClick={async () => {
                 if (window.confirm('Are you sure you want to finish Reading and move to Writing? You cannot return.')) {
-                  await studentApi.saveReadingAnswers(readingAnswers);
+                  await readingSync.flush();
                   navigate('../writing');
                 }
               }}
@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { studentApi } from '../../api/studentApi';
 import Card from '../../components/Card';
@@ -16,19 +16,85 @@ const Results = () => {
   const [expandedAttemptId, setExpandedAttemptId] = useState(null);
   const [expandedSections, setExpandedSections] = useState({});
   const [showDetailedFeedback, setShowDetailedFeedback] = useState({});
+  const [liveWriting, setLiveWriting] = useState({});
+  const streamFailed = useRef(false);
 
   useEffect(() => {
     loadResults();
   }, []);
 
-  const loadResults = async () => {
+  // Writing of a just-submitted attempt is still being graded: stream each
+  // task's grade (band scores first, then the feedback) and reload once both
+  // are done. Poll instead when the stream is unavailable or fails.
+  useEffect(() => {
+    const attempt = attempts[0];
+    if (!attempt || attempt.status !== 'submitted') return;
+
+    let closed = false;
+    let pollTimer = null;
+    const streams = [];
+    const pending = new Set(
+      [1, 2].filter((task) => !attempt.result?.[`writing_task${task}_score`])
+    );
+
+    const poll = () => {
+      if (!closed && !pollTimer) pollTimer = setTimeout(() => loadResults(false), 5000);
+    };
+
+    if (pending.size === 0 || streamFailed.current || typeof window.EventSource !== 'function') {
+      poll();
+    } else {
+      pending.forEach((task) => {
+        const key = `${attempt.id}-task${task}`;
+        const update = (values) => setLiveWriting((prev) => ({
+          ...prev,
+          [key]: { ...prev[key], ...values(prev[key] || {}) }
+        }));
+        const events = studentApi.openWritingFeedbackEvents(attempt.id, task);
+        streams.push(events);
+
+        const finish = () => {
+          events.close();
+          pending.delete(task);
+          if (pending.size === 0) poll();
+        };
+
+        events.addEventListener('scores', (event) => {
+          const data = JSON.parse(event.data);
+          update(() => ({ score: data.task_score, feedback: '' }));
+        });
+        events.addEventListener('feedback', (event) => {
+          const { text } = JSON.parse(event.data);
+          update((current) => ({ feedback: (current.feedback || '') + text }));
+        });
+        events.addEventListener('result', (event) => {
+          const data = JSON.parse(event.data);
+          update(() => ({ score: data.task_score, feedback: data.detailed_feedback || data.feedback }));
+          finish();
+        });
+        // Also receives the server's 'error' event (grading failed)
+        events.onerror = () => {
+          streamFailed.current = true;
+          finish();
+        };
+      });
+    }
+
+    return () => {
+      closed = true;
+      streams.forEach((events) => events.close());
+      if (pollTimer) clearTimeout(pollTimer);
+    };
+  }, [attempts]);
+
+  const loadResults = async (expandFirst = true) => {
     try {
       const attemptsResponse = await studentApi.getAttempts();
       const attemptsData = attemptsResponse.data || [];
       setAttempts(attemptsData);
 
       // Auto-expand the first attempt
-      if (attemptsData.length > 0) {
+      if (expandFirst && attemptsData.length > 0) {
         setExpandedAttemptId(attemptsData[0].id);
       }
     } catch (error) {
@@ -320,8 +386,42 @@ const Results = () => {
                             </div>
                           )}
 
+                          {/* Writing being graded */}
+                          {attempt.status === 'submitted' && (
+                            <div className="bg-gray-50 dark:bg-gray-800 rounded-lg p-4">
+                              <div className="flex items-center gap-2">
+                                <h4 className="font-semibold text-gray-900 dark:text-white">
+                                  Writing
+                                </h4>
+                                <Loader size="sm" />
+                                <span className="text-sm text-gray-500 dark:text-gray-400">
+                                  Grading in progress...
+                                </span>
+                              </div>
+                              <div className="mt-4 space-y-4">
+                                {[1, 2].map((task) => {
+                                  const live = liveWriting[`${attempt.id}-task${task}`];
+                                  if (!live) return null;
+                                  return (
+                                    <div key={task} className={`border-l-4 ${task === 1 ? 'border-blue-500' : 'border-purple-500'} pl-4`}>
+                                      <h5 className="font-medium text-gray-900 dark:text-white mb-2">Task {task}</h5>
+                                      <p className="text-sm mb-2">
+                                        <strong>Score:</strong> {live.score?.toFixed(1) ?? '-'}
+                                      </p>
+                                      {live.feedback && (
+                                        <div className="prose dark:prose-invert max-w-none text-sm">
+                                          <ReactMarkdown>{live.feedback}</ReactMarkdown>
+                                        </div>
+                                      )}
+                                    </div>
+                                  );
+                                })}
+                              </div>
+                            </div>
+                          )}
+
                           {/* Writing Section */}
-                          {result.writing_breakdown && (
+                          {result.writing_breakdown && attempt.status !== 'submitted' && (
                             <div className="bg-gray-50 dark:bg-gray-800 rounded-lg p-4">
                               <div
                                 className="flex items-center justify-between cursor-pointer"
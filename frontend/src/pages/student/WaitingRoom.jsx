@@ -167,35 +167,78 @@ const WaitingRoom = ({ queueStatus, onStatusUpdate, onStartTest }) => {
     // Only check status if name has been collected
     if (!nameCollected) return;
 
+    let closed = false;
+    let interval = null;
+    let events = null;
+
+    const handleStatus = (data) => {
+      const newStatus = data.status;
+      setStatus(newStatus);
+      onStatusUpdate(data);
+
+      if (newStatus === 'timeout') {
+        showToast(
+          data.message ||
+          'Test did not start within 10 minutes. You have been removed from the queue.',
+          'error'
+        );
+        navigate('/student/dashboard', { replace: true });
+        return;
+      }
+
+      if (newStatus === 'started' || data.can_start) {
+        handleStartTest(false);
+      }
+    };
+
     const checkStatus = async () => {
       try {
         const response = await studentApi.checkQueueStatus();
-        const newStatus = response.data.status;
-        setStatus(newStatus);
-        onStatusUpdate(response.data);
-
-        if (newStatus === 'timeout') {
-          showToast(
-            response.data.message ||
-            'Test did not start within 10 minutes. You have been removed from the queue.',
-            'error'
-          );
-          navigate('/student/dashboard', { replace: true });
-          return;
-        }
-
-        if (newStatus === 'started' || response.data.can_start) {
-          handleStartTest(false);
-        }
+        if (!closed) handleStatus(response.data);
       } catch (error) {
         console.error('Failed to check queue status:', error);
       }
     };
 
-    const interval = setInterval(checkStatus, 2000);
-    checkStatus();
+    const startPolling = () => {
+      if (closed || interval) return;
+      interval = setInterval(checkStatus, 2000);
+      checkStatus();
+    };
 
-    return () => clearInterval(interval);
+    // Prefer the event stream (one connection, updates only on change); poll
+    // every 2s when it is unavailable (no EventSource, server without ASGI)
+    if (typeof window.EventSource === 'function') {
+      let failures = 0;
+      events = studentApi.openQueueEvents();
+      events.addEventListener('queue', (event) => {
+        failures = 0;
+        const data = JSON.parse(event.data);
+        handleStatus(data);
+        if (['started', 'timeout', 'left', 'none'].includes(data.status)) {
+          // The stream ends here; keep retrying the start by polling as before
+          events.close();
+          if (data.status === 'started') startPolling();
+        }
+      });
+      events.onerror = () => {
+        failures += 1;
+        // CLOSED: the server refused the stream (e.g. 501); otherwise the
+        // browser reconnects by itself unless it keeps failing
+        if (events.readyState === window.EventSource.CLOSED || failures >= 3) {
+          events.close();
+          startPolling();
+        }
+      };
+    } else {
+      startPolling();
+    }
+
+    return () => {
+      closed = true;
+      if (events) events.close();
+      if (interval) clearInterval(interval);
+    };
   }, [nameCollected, handleStartTest, navigate, onStatusUpdate]);
 
   useEffect(() => {
@@ -7,6 +7,7 @@ import Loader from '../../components/Loader';
 import { showToast } from '../../components/Toast';
 import { Clock, FileText, Edit } from 'lucide-react';
 import { useExam } from '../../context/ExamContext';
+import { loadWritingDraft, saveWritingDraft } from '../../utils/writingDrafts';
 import ReactQuill from 'react-quill';
 import 'react-quill/dist/quill.snow.css';
 import DOMPurify from 'dompurify';
@@ -50,20 +51,6 @@ const WritingSection = () => {
     };
   }, []);
 
-  // Create ref for saveWriting function
-  const saveWritingRef = useRef(null);
-
-  useEffect(() => {
-    // Auto-save every 30 seconds - use ref to avoid recreating interval
-    const autoSaveInterval = setInterval(() => {
-      if ((task1Content || task2Content) && saveWritingRef.current) {
-        saveWritingRef.current();
-      }
-    }, 30000);
-
-    return () => clearInterval(autoSaveInterval);
-  }, [task1Content, task2Content]); // Empty dependency array - interval created only once
-
   useEffect(() => {
     // Break time countdown
     if (isBreakPhase && breakTime > 0) {
@@ -103,19 +90,18 @@ const WritingSection = () => {
       const response = await studentApi.getTest();
       setTestData(response.data);
 
-      // Load existing writing responses
-      if (response.data.responses) {
-        const writingResponses = response.data.responses.filter(r => r.section === 'writing');
-        writingResponses.forEach(r => {
-          if (r.question_number === 1) {
-            setTask1Content(r.answer);
-            updateAnswer('writing', 'task1', r.answer);
-          } else if (r.question_number === 2) {
-            setTask2Content(r.answer);
-            updateAnswer('writing', 'task2', r.answer);
-          }
-        });
-      }
+      // Load saved drafts; their versions are the base for the next patches
+      const drafts = await Promise.all([loadWritingDraft(1), loadWritingDraft(2)]);
+      drafts.forEach(draft => {
+        if (!draft.version) return;
+        if (draft.task_number === 1) {
+          setTask1Content(draft.content);
+          updateAnswer('writing', 'task1', draft.content);
+        } else {
+          setTask2Content(draft.content);
+          updateAnswer('writing', 'task2', draft.content);
+        }
+      });
     } catch (error) {
       showToast('Failed to load test', 'error');
     } finally {
@@ -127,27 +113,24 @@ const WritingSection = () => {
     try {
       // Save Task 1
       if (task1Content) {
-        await studentApi.saveWritingTask(1, task1Content);
+        await saveWritingDraft(1, task1Content);
       }
       // Save Task 2
       if (task2Content) {
-        await studentApi.saveWritingTask(2, task2Content);
+        await saveWritingDraft(2, task2Content);
       }
     } catch (error) {
       console.error('Auto-save failed:', error);
     }
   };
 
-  // Update ref to point to saveWriting function
-  saveWritingRef.current = saveWriting;
-
   const handleTask1Change = (value) => {
     setTask1Content(value);
     updateAnswer('writing', 'task1', value);
     // Debounced save using ref
     if (task1TimeoutRef.current) clearTimeout(task1TimeoutRef.current);
     task1TimeoutRef.current = setTimeout(() => {
-      studentApi.saveWritingTask(1, value).catch(console.error);
+      saveWritingDraft(1, value).catch(console.error);
     }, 2000);
   };
 
@@ -157,7 +140,7 @@ const WritingSection = () => {
     // Debounced save using ref
     if (task2TimeoutRef.current) clearTimeout(task2TimeoutRef.current);
     task2TimeoutRef.current = setTimeout(() => {
-      studentApi.saveWritingTask(2, value).catch(console.error);
+      saveWritingDraft(2, value).catch(console.error);
     }, 2000);
   };
 
@@ -0,0 +1,112 @@
+import { studentApi } from '../api/studentApi';
+
+// Delta-sync of reading/listening answers: only changed questions are sent,
+// with a per-section revision that grows with every batch (the backend applies
+// each revision once and answers 409 with its revision to an older one).
+// Changes stay pending until a batch carrying them is acknowledged. The state
+// lives in sessionStorage, so a reload neither loses nor reuses a revision.
+
+const STORAGE_PREFIX = 'answerSync:';
+
+const sameValue = (a, b) => JSON.stringify(a) === JSON.stringify(b);
+
+export const createAnswerSync = (section, send) => {
+  const storageKey = `${STORAGE_PREFIX}${section}`;
+  let state = { attemptId: null, revision: 0, pending: {} };
+  try {
+    const saved = sessionStorage.getItem(storageKey);
+    if (saved) state = JSON.parse(saved);
+  } catch (error) {
+    console.error(`Failed to load ${section} sync state:`, error);
+  }
+  let inFlight = null;
+
+  const persist = () => {
+    try {
+      sessionStorage.setItem(storageKey, JSON.stringify(state));
+    } catch (error) {
+      console.error(`Failed to save ${section} sync state:`, error);
+    }
+  };
+
+  const sync = {
+    // Revisions and pending changes belong to one attempt
+    setAttempt: (attemptId) => {
+      if (state.attemptId !== attemptId) {
+        state = { attemptId, revision: 0, pending: {} };
+        persist();
+      }
+    },
+
+    // A new or restarted attempt starts without pending changes
+    reset: () => {
+      state = { attemptId: null, revision: 0, pending: {} };
+      persist();
+    },
+
+    // Empty answers are sent as null, which clears the question
+    record: (questionNum, value) => {
+      state.pending[questionNum] = value === '' || value === undefined ? null : value;
+      persist();
+    },
+
+    hasPending: () => Object.keys(state.pending).length > 0,
+
+    // Next batch to send, or null if nothing is pending or a batch is in flight.
+    // Every batch must be closed with finish().
+    begin: () => {
+      if (inFlight || !sync.hasPending()) return null;
+      let done;
+      inFlight = new Promise((resolve) => { done = resolve; });
+      inFlight.done = done;
+      return { revision: state.revision + 1, changes: { ...state.pending } };
+    },
+
+    // ack: { status: 'saved' | 'duplicate' | 'stale', revision } or null if the request failed
+    finish: (batch, ack) => {
+      if (ack?.status === 'saved' || ack?.status === 'duplicate') {
+        state.revision = Math.max(state.revision, ack.revision);
+        Object.entries(batch.changes).forEach(([questionNum, value]) => {
+          // Questions changed again while the batch was in flight stay pending
+          if (questionNum in state.pending && sameValue(state.pending[questionNum], value)) {
+            delete state.pending[questionNum];
+          }
+        });
+      } else if (ack?.status === 'stale') {
+        // The next batch goes above the server's revision
+        state.revision = Math.max(state.revision, ack.revision);
+      }
+      persist();
+      const { done } = inFlight;
+      inFlight = null;
+      done();
+    },
+
+    // Send pending changes through the section's own endpoint
+    flush: async () => {
+      for (let round = 0; round < 2; round += 1) {
+        while (inFlight) await inFlight;
+        const batch = sync.begin();
+        if (!batch) return;
+
+        let ack;
+        try {
+          const response = await send(batch.revision, batch.changes);
+          ack = { status: response.data.applied ? 'saved' : 'duplicate', revision: response.data.revision };
+        } catch (error) {
+          if (error.response?.status !== 409) {
+            sync.finish(batch, null);
+            throw error;
+          }
+          ack = { status: 'stale', revision: error.response.data.revision };
+        }
+        sync.finish(batch, ack);
+        if (ack.status !== 'stale') return;
+      }
+    },
+  };
+  return sync;
+};
+
+export const readingSync = createAnswerSync('reading', studentApi.syncReadingAnswers);
+export const listeningSync = createAnswerSync('listening', studentApi.syncListeningAnswers);
@@ -0,0 +1,36 @@
+import { studentApi } from '../api/studentApi';
+import { readingSync, listeningSync } from './answerSync';
+import { writingDraftsToSave, settleWritingDraft } from './writingDrafts';
+
+const SECTION_SYNCS = { reading: readingSync, listening: listeningSync };
+
+// Periodic autosave: every section's pending changes in one request
+// (POST /student/answers), acknowledged per section. writingTexts maps task
+// numbers to the current text.
+export const autosaveAll = async (writingTexts) => {
+  const payload = {};
+  const batches = {};
+  Object.entries(SECTION_SYNCS).forEach(([section, sync]) => {
+    const batch = sync.begin();
+    if (batch) {
+      batches[section] = batch;
+      payload[section] = batch;
+    }
+  });
+  const writing = writingDraftsToSave(writingTexts);
+  if (Object.keys(writing).length > 0) payload.writing = writing;
+  if (Object.keys(payload).length === 0) return;
+
+  let acks = {};
+  try {
+    const response = await studentApi.saveAnswers(payload);
+    acks = response.data.sections || {};
+  } finally {
+    Object.entries(batches).forEach(([section, batch]) => {
+      SECTION_SYNCS[section].finish(batch, acks[section] || null);
+    });
+    Object.keys(writing).forEach((taskNumber) => {
+      settleWritingDraft(taskNumber, writingTexts[taskNumber], acks.writing?.[taskNumber]);
+    });
+  }
+};
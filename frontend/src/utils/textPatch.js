@@ -0,0 +1,48 @@
+// Patches for writing drafts, in the format the backend applies
+// (student_portal/writing_drafts.py): a positive number keeps that many
+// characters, a negative one deletes that many, a string is inserted and the
+// rest of the text is kept. Lengths count code points, like Python strings.
+
+export const makePatch = (oldText, newText) => {
+  const oldChars = Array.from(oldText || '');
+  const newChars = Array.from(newText || '');
+
+  let prefix = 0;
+  while (prefix < oldChars.length && prefix < newChars.length && oldChars[prefix] === newChars[prefix]) {
+    prefix += 1;
+  }
+  let suffix = 0;
+  const maxSuffix = Math.min(oldChars.length, newChars.length) - prefix;
+  while (
+    suffix < maxSuffix &&
+    oldChars[oldChars.length - 1 - suffix] === newChars[newChars.length - 1 - suffix]
+  ) {
+    suffix += 1;
+  }
+
+  const patch = [];
+  if (prefix) patch.push(prefix);
+  const deleted = oldChars.length - suffix - prefix;
+  if (deleted) patch.push(-deleted);
+  const inserted = newChars.slice(prefix, newChars.length - suffix).join('');
+  if (inserted) patch.push(inserted);
+  return patch;
+};
+
+export const applyPatch = (text, patch) => {
+  const chars = Array.from(text || '');
+  const parts = [];
+  let position = 0;
+  patch.forEach((op) => {
+    if (typeof op === 'string') {
+      parts.push(op);
+    } else if (op > 0) {
+      parts.push(chars.slice(position, position + op).join(''));
+      position += op;
+    } else {
+      position -= op;
+    }
+  });
+  parts.push(chars.slice(position).join(''));
+  return parts.join('');
+};
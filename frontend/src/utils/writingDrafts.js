@@ -0,0 +1,73 @@
+import { studentApi } from '../api/studentApi';
+import { makePatch } from './textPatch';
+
+// Last version of each writing task the server acknowledged: { version, text }.
+// Saves send a patch against it; without one (or after a 409) the full text.
+// text is null when the server has a version this page has not seen.
+let acknowledged = {};
+
+export const resetWritingDrafts = () => {
+  acknowledged = {};
+};
+
+export const loadWritingDraft = async (taskNumber) => {
+  const response = await studentApi.getWritingDraft(taskNumber);
+  const { version, content } = response.data;
+  acknowledged[taskNumber] = { version, text: content };
+  return response.data;
+};
+
+export const acknowledgeWritingDraft = (taskNumber, version, text) => {
+  // Responses can arrive out of order; keep the newest version.
+  const current = acknowledged[taskNumber];
+  if (!current || version >= current.version) {
+    acknowledged[taskNumber] = { version, text };
+  }
+};
+
+// The draft to send for a task: { base_version, patch }, { content } or null if unchanged.
+export const writingDraftPayload = (taskNumber, text) => {
+  const base = acknowledged[taskNumber];
+  if (!base || !base.version || base.text === null) return { content: text };
+  if (base.text === text) return null;
+  return { base_version: base.version, patch: makePatch(base.text, text) };
+};
+
+// Drafts of the tasks loaded on this page that changed since their last save
+export const writingDraftsToSave = (texts) => {
+  const drafts = {};
+  Object.entries(texts).forEach(([taskNumber, text]) => {
+    if (!(taskNumber in acknowledged) || typeof text !== 'string') return;
+    const draft = writingDraftPayload(taskNumber, text);
+    if (draft) drafts[taskNumber] = draft;
+  });
+  return drafts;
+};
+
+// ack: a task's entry from the combined autosave, or undefined if it failed
+export const settleWritingDraft = (taskNumber, text, ack) => {
+  if (ack?.status === 'saved') {
+    acknowledgeWritingDraft(taskNumber, ack.version, text);
+  } else if (ack?.status === 'stale') {
+    acknowledged[taskNumber] = { version: ack.version, text: null };
+  }
+};
+
+export const saveWritingDraft = async (taskNumber, text) => {
+  const draft = writingDraftPayload(taskNumber, text);
+  if (!draft) return;
+
+  let response = null;
+  if (draft.patch) {
+    try {
+      response = await studentApi.saveWritingTaskPatch(taskNumber, draft.base_version, draft.patch);
+    } catch (error) {
+      // 409: the patch's base is no longer the latest version
+      if (error.response?.status !== 409) throw error;
+    }
+  }
+  if (!response) {
+    response = await studentApi.saveWritingTask(taskNumber, text);
+  }
+  acknowledgeWritingDraft(taskNumber, response.data.version, text);
+};